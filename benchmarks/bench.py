@@ -0,0 +1,331 @@
+"""
+Benchmarks der Import-, Berechnungs- und Exportstufen auf einer (synthetischen) Kampagne.
+
+Jede Stufe läuft in einem eigenen Prozess, damit der Spitzenwert des Arbeitsspeichers (peak RSS)
+pro Stufe gemessen wird und Importe/Caches anderer Stufen das Ergebnis nicht beeinflussen.
+Pro Stufe werden Wall- und CPU-Zeit, Anzahl Einheiten, Durchsatz und peak RSS berichtet.
+Die Ergebnisse können als Baseline (JSON) gespeichert und bei späteren Läufen verglichen werden.
+
+Beispiel:
+    python -m benchmarks.bench --visuren 500 --baseline-schreiben
+    python -m benchmarks.bench --visuren 500                       # Vergleich mit der Baseline
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+## Standardpfad der Baseline
+BASELINE = Path(__file__).with_name("baseline.json")
+
+## Registrierte Stufen: Name -> (Funktion, Einheit)
+STUFEN = {}
+
+def stufe(name:str, einheit:str):
+    """
+    Registriert eine Benchmark-Stufe. Die Funktion erhält die Umgebung (dict) und liefert
+    eine Funktion ohne Argumente, die gemessen wird und die Anzahl verarbeiteter Einheiten zurückgibt.
+    Die Vorbereitung (z.B. Import der Eingangsdaten) ausserhalb dieser Funktion wird nicht gemessen.
+    """
+
+    def registrieren(funktion):
+        STUFEN[name] = (funktion, einheit)
+        return funktion
+    return registrieren
+
+
+## <----------------------------------------------------------------------------------->
+## Umgebung einer Stufe (wird im Kindprozess aufgebaut)
+
+def _umgebung(base_path:str, fix:str, instr:str, optionen:dict):
+    from utils.auto import visuren_finden
+
+    visuren = visuren_finden(Path(base_path))
+    return {"base_path": Path(base_path),
+            "fix": fix,
+            "instr": instr,
+            "visuren": visuren,
+            "dateien": [f for v in visuren for f in (v.csv_A2B, v.csv_B2A)],
+            **optionen}
+
+
+def _ergebnisse(env:dict, n:int):
+    """
+    Berechnet die Ergebnisse der ersten `n` Visuren (Vorbereitung der Export-Stufen).
+    """
+
+    from utils.auto import auswertung_kampagne
+
+    return list(auswertung_kampagne(env["base_path"], env["instr"], env["fix"],
+                                    exportieren=False, visuren=env["visuren"][:n]))
+## <----------------------------------------------------------------------------------->
+
+
+## <----------------------------------------------------------------------------------->
+## Stufen
+
+@stufe("import_csv", "Dateien")
+def _import_csv(env):
+    from utils.imports import import_csv
+
+    return lambda: sum(import_csv(f) is not None for f in env["dateien"])
+
+
+@stufe("import_csv_fast", "Dateien")
+def _import_csv_fast(env):
+    from utils.imports import import_csv_fast
+
+    return lambda: sum(import_csv_fast(f) is not None for f in env["dateien"])
+
+
+@stufe("import_fix", "Aufrufe")
+def _import_fix(env):
+    from utils.imports import import_fix
+
+    return lambda: sum(import_fix(env["fix"]) is not None for _ in range(20))
+
+
+@stufe("master_thb", "Visuren")
+def _master_thb(env):
+    from utils.auto import instr_parameter
+    from utils.calculate import master_thb
+    from utils.imports import import_csv, import_fix, import_instr
+
+    df_instr = import_instr(env["instr"])
+    df_aprox = import_fix(env["fix"])
+    eingaben = []
+    for v in env["visuren"]:
+        signal_A, offset_A, signal_B, offset_B = instr_parameter(df_instr, v)
+        eingaben.append((import_csv(v.csv_A2B), import_csv(v.csv_B2A), df_aprox, signal_A, signal_B, offset_A, offset_B))
+
+    def messen():
+        for e in eingaben:
+            master_thb(*e)
+        return len(eingaben)
+    return messen
+
+
+@stufe("master_thb_batch", "Visuren")
+def _master_thb_batch(env):
+    import pandas as pd
+
+    from utils.auto import instr_parameter
+    from utils.calculate import master_thb_batch, visuren_stapeln
+    from utils.fixpunkte import FixpunktRegister
+    from utils.imports import import_csv_fast, import_instr
+
+    df_instr = import_instr(env["instr"])
+    register = FixpunktRegister.aus_datei(env["fix"])
+    messungen = {v.visur: (import_csv_fast(v.csv_A2B), import_csv_fast(v.csv_B2A)) for v in env["visuren"]}
+    df_param = pd.DataFrame([[v.visur] + instr_parameter(df_instr, v) for v in env["visuren"]],
+                            columns=["ID", "signal_A", "offset_A", "signal_B", "offset_B"])
+
+    def messen():
+        master_thb_batch(visuren_stapeln(messungen), register, df_param)
+        return len(messungen)
+    return messen
+
+
+def _export_stufe(name:str):
+    def vorbereiten(env):
+        from utils.exports import EXPORTER, ExportKontext
+
+        if name == "pdf":
+            import weasyprint  # noqa: F401  (fehlende Systembibliotheken -> Stufe wird übersprungen)
+
+        ergebnisse = _ergebnisse(env, env["export_visuren"])
+
+        def messen():
+            for e in ergebnisse:
+                EXPORTER[name](ExportKontext.aus_ergebnis(e, [name]))
+            return len(ergebnisse)
+        return messen
+    return vorbereiten
+
+for _name in ("txt", "csv", "md", "png", "pdf"):
+    stufe(f"export_{_name}", "Visuren")(_export_stufe(_name))
+
+
+@stufe("auto_auswertung2025", "Visuren")
+def _auto_auswertung2025(env):
+    from utils.auto import auto_auswertung2025
+
+    n = min(env["flow_visuren"], len(env["visuren"]))
+
+    def messen():
+        for i in range(n):
+            auto_auswertung2025(i, env["base_path"], env["instr"], env["fix"])
+        return n
+    return messen
+
+
+@stufe("auswertung_kampagne", "Visuren")
+def _auswertung_kampagne(env):
+    from utils.auto import auswertung_kampagne
+
+    def messen():
+        return len(auswertung_kampagne(env["base_path"], env["instr"], env["fix"], formate=("txt", "csv")))
+    return messen
+## <----------------------------------------------------------------------------------->
+
+
+def _ausfuehren(name:str, base_path:str, fix:str, instr:str, optionen:dict):
+    """
+    Führt eine Stufe im Kindprozess aus: Vorbereitung, ein Aufwärmlauf, danach `laeufe` gemessene Läufe.
+    """
+
+    funktion, einheit = STUFEN[name]
+
+    try:
+        messen = funktion(_umgebung(base_path, fix, instr, optionen))
+    except Exception as e:
+        return {"einheit": einheit, "übersprungen": f"{type(e).__name__}: {e}"}
+
+    messen()
+
+    wall, cpu = [], []
+    for _ in range(optionen["laeufe"]):
+        t0, c0 = time.perf_counter(), time.process_time()
+        n = messen()
+        wall.append(time.perf_counter() - t0)
+        cpu.append(time.process_time() - c0)
+
+    sekunden = statistics.median(wall)
+    return {"einheit": einheit,
+            "n": n,
+            "wall_s": sekunden,
+            "wall_min_s": min(wall),
+            "cpu_s": statistics.median(cpu),
+            "s_pro_einheit": sekunden / n if n else None,
+            "durchsatz": n / sekunden if sekunden else None,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def benchmark(base_path, fix:str, instr:str, stufen:list=None, laeufe:int=3,
+              export_visuren:int=5, flow_visuren:int=3):
+    """
+    Misst die gewählten Stufen auf der Kampagne in `base_path`, jede Stufe in einem eigenen Prozess.
+
+    Rückgabe:
+    ---------
+    dict
+        Bericht mit Metadaten ("meta") und den Messwerten pro Stufe ("stufen").
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    optionen = {"laeufe": laeufe, "export_visuren": export_visuren, "flow_visuren": flow_visuren}
+    bericht = {"meta": {"datum": datetime.now().isoformat(timespec="seconds"),
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "pandas": pd.__version__,
+                        "plattform": platform.platform(),
+                        "base_path": str(base_path),
+                        **optionen},
+               "stufen": {}}
+
+    for name in (stufen or list(STUFEN)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            bericht["stufen"][name] = pool.submit(_ausfuehren, name, str(base_path), str(fix), str(instr), optionen).result()
+
+    return bericht
+
+
+def vergleichen(bericht:dict, baseline:dict):
+    """
+    Vergleicht die Zeit pro Einheit mit der Baseline.
+
+    Rückgabe:
+    ---------
+    dict
+        {Stufe: Verhältnis aktuell/Baseline}; Stufen ohne Vergleichswert fehlen.
+    """
+
+    verhaeltnis = {}
+    for name, werte in bericht["stufen"].items():
+        alt = baseline.get("stufen", {}).get(name, {}).get("s_pro_einheit")
+        neu = werte.get("s_pro_einheit")
+        if alt and neu:
+            verhaeltnis[name] = neu / alt
+    return verhaeltnis
+
+
+def ausgeben(bericht:dict, verhaeltnis:dict=None, toleranz:float=0.25):
+    verhaeltnis = verhaeltnis or {}
+    print(f"{'Stufe':<22}{'n':>7}{'Wall [s]':>11}{'CPU [s]':>10}{'Durchsatz':>18}{'RSS [MB]':>10}{'Baseline':>10}")
+    for name, w in bericht["stufen"].items():
+        if "übersprungen" in w:
+            print(f"{name:<22} übersprungen ({w['übersprungen'][:80]})")
+            continue
+        vergleich = ""
+        if name in verhaeltnis:
+            vergleich = f"{verhaeltnis[name]:.2f}x" + (" !" if verhaeltnis[name] > 1 + toleranz else "")
+        durchsatz = f"{w['durchsatz']:.1f} {w['einheit']}/s"
+        print(f"{name:<22}{w['n']:>7}{w['wall_s']:>11.3f}{w['cpu_s']:>10.3f}{durchsatz:>18}"
+              f"{w['peak_rss_mb']:>10.0f}{vergleich:>10}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.bench",
+                                description="Benchmarks der THB-Auswertung (Import, Berechnung, Export).")
+    p.add_argument("--ordner", type=Path, default=None,
+                   help="Bestehende Kampagne (mit Naeherungskoord.txt und InstrHoehe.csv); sonst synthetisch")
+    p.add_argument("--visuren", type=int, default=200, help="Anzahl synthetischer Visuren (Standard: 200)")
+    p.add_argument("--saetze", type=int, default=3, help="Sätze pro Visur (Standard: 3)")
+    p.add_argument("--wiederholungen", type=int, default=3, help="Messungen pro Satz und Lage (Standard: 3)")
+    p.add_argument("--laeufe", type=int, default=3, help="Gemessene Läufe pro Stufe (Standard: 3)")
+    p.add_argument("--export-visuren", type=int, default=5, help="Visuren pro Export-Stufe (Standard: 5)")
+    p.add_argument("--flow-visuren", type=int, default=3, help="Visuren für auto_auswertung2025 (Standard: 3)")
+    p.add_argument("--stufen", nargs="+", choices=list(STUFEN), default=None, help="Nur diese Stufen messen")
+    p.add_argument("--baseline", type=Path, default=BASELINE, help="Baseline-Datei (JSON)")
+    p.add_argument("--baseline-schreiben", action="store_true", help="Ergebnis als neue Baseline speichern")
+    p.add_argument("--toleranz", type=float, default=0.25, help="Erlaubte Verlangsamung gegenüber der Baseline (Standard: 0.25)")
+    p.add_argument("--bericht", type=Path, default=None, help="Bericht zusätzlich als JSON speichern")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="thb_bench_") as tmp:
+        if args.ordner is None:
+            from benchmarks.synthetisch import kampagne_erzeugen
+            base_path, fix, instr = kampagne_erzeugen(tmp, args.visuren, args.saetze, args.wiederholungen)
+        else:
+            base_path, fix, instr = args.ordner, args.ordner / "Naeherungskoord.txt", args.ordner / "InstrHoehe.csv"
+
+        bericht = benchmark(base_path, fix, instr, args.stufen, args.laeufe, args.export_visuren, args.flow_visuren)
+        if args.ordner is None:
+            bericht["meta"].update(visuren=args.visuren, saetze=args.saetze, wiederholungen=args.wiederholungen)
+
+    verhaeltnis = {}
+    if args.baseline.exists() and not args.baseline_schreiben:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            verhaeltnis = vergleichen(bericht, json.load(f))
+
+    ausgeben(bericht, verhaeltnis, args.toleranz)
+
+    if args.bericht is not None:
+        with open(args.bericht, "w", encoding="utf-8") as f:
+            json.dump(bericht, f, indent=2, ensure_ascii=False)
+
+    if args.baseline_schreiben:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(bericht, f, indent=2, ensure_ascii=False)
+        print(f"Baseline gespeichert: {args.baseline}")
+
+    regressionen = [name for name, r in verhaeltnis.items() if r > 1 + args.toleranz]
+    if regressionen:
+        print(f"Langsamer als die Baseline (> {args.toleranz:.0%}): {', '.join(regressionen)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Präzisionstest der Kernfunktionen `korr_kippachse`, `delta_h` und `refraktion` gegen eine Referenz
+mit hoher Genauigkeit (mpmath, Standard 50 Stellen).
+
+Verglichen werden die bisherigen Formeln (Kosinussatz und arccos, Winkelsummen in Radiant) und die
+aktuellen Kernfunktionen aus `utils.calculate` auf zufälligen Geometrien (Distanzen bis einige km,
+Offsets des Prismamounts, Zenitwinkel um 100 gon). Berichtet wird der grösste Fehler pro Grösse;
+mit `--grenzen` endet der Lauf mit Exit-Code 1, wenn eine aktuelle Kernfunktion die Grenze überschreitet.
+
+Beispiel:
+    python -m benchmarks.praezision --anzahl 2000 --grenzen
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+## Grenzen für die aktuellen Kernfunktionen (Distanz und Höhendifferenz in m, Winkel in gon, k ohne Einheit)
+GRENZEN = {"dist_korr": 1e-11, "v_korr": 1e-12, "delta_h": 1e-11, "k": 1e-9}
+
+
+## <----------------------------------------------------------------------------------->
+## Bisherige Formeln (float64)
+
+def kippachse_bisher(d, o, v):
+    z = v * np.pi / 200
+    dist = np.sqrt(o**2 + d**2 - (2*o*d) * np.cos(z))
+    beta = np.arccos((d**2 + dist**2 - o**2) / (2 * d * dist))
+    return dist, (z + beta) * 200 / np.pi
+
+
+def delta_h_bisher(d, v_ab, v_ba, hoehen):
+    z_ab, z_ba = v_ab * np.pi / 200, v_ba * np.pi / 200
+    return np.abs(0.5 * (d * (np.sin(np.pi/2 - z_ab) - np.sin(np.pi/2 - z_ba)) + hoehen))
+
+
+def refraktion_bisher(d, v_ab, v_ba):
+    z_ab, z_ba = v_ab * np.pi / 200, v_ba * np.pi / 200
+    return 1 - ((z_ab + z_ba - np.pi) * 6_370_000 / (d * np.sin(z_ab)))
+
+## <----------------------------------------------------------------------------------->
+
+
+## <----------------------------------------------------------------------------------->
+## Referenz mit mpmath (Eingaben exakt als float64 übernommen)
+
+def _referenz(d, o, v, v_ba, hoehen, stellen:int):
+    import mpmath as mp
+
+    mp.mp.dps = stellen
+    rho = mp.pi / 200
+
+    dist, v_korr, dh, k = [], [], [], []
+    for di, oi, vi, vbi, hi in zip(d, o, v, v_ba, hoehen):
+        di, oi, vi, vbi, hi = (mp.mpf(float(x)) for x in (di, oi, vi, vbi, hi))
+        z = vi * rho
+
+        c = mp.sqrt(oi**2 + di**2 - 2*oi*di*mp.cos(z))
+        beta = mp.acos((di**2 + c**2 - oi**2) / (2 * di * c))
+        dist.append(c)
+        v_korr.append(vi + beta / rho)
+
+        dh.append(abs(mp.mpf("0.5") * (di * (mp.cos(vi * rho) - mp.cos(vbi * rho)) + hi)))
+        k.append(1 - (vi * rho + vbi * rho - mp.pi) * 6_370_000 / (di * mp.sin(vi * rho)))
+
+    return {name: np.array([float(x) for x in werte]) for name, werte in
+            (("dist_korr", dist), ("v_korr", v_korr), ("delta_h", dh), ("k", k))}
+
+## <----------------------------------------------------------------------------------->
+
+
+def geometrien(anzahl:int, seed:int=0):
+    """
+    Zufällige Eingaben: Distanz 5 m bis 3 km (logarithmisch verteilt), Offset 0.05-0.3 m,
+    Zenitwinkel 85-115 gon, Gegenrichtung mit Erdkrümmung und Refraktion (k = 0.13).
+    """
+
+    rng = np.random.default_rng(seed)
+    d = np.exp(rng.uniform(np.log(5), np.log(3000), anzahl))
+    o = rng.uniform(0.05, 0.3, anzahl)
+    v = rng.uniform(85, 115, anzahl)
+    v_ba = 200 - v + d * (1 - 0.13) / 6_370_000 * 200 / np.pi
+    hoehen = rng.uniform(-0.5, 0.5, anzahl)
+    return d, o, v, v_ba, hoehen
+
+
+def vergleichen(anzahl:int=1000, seed:int=0, stellen:int=50):
+    """
+    Grösster absoluter Fehler der bisherigen Formeln und der aktuellen Kernfunktionen.
+
+    Rückgabe:
+    ---------
+    dict
+        {Grösse: {"bisher": float, "aktuell": float}}
+    """
+
+    from utils.calculate import delta_h, korr_kippachse, refraktion
+
+    d, o, v, v_ba, hoehen = geometrien(anzahl, seed)
+    ref = _referenz(d, o, v, v_ba, hoehen, stellen)
+
+    bisher = dict(zip(("dist_korr", "v_korr"), kippachse_bisher(d, o, v)))
+    bisher["delta_h"] = delta_h_bisher(d, v, v_ba, hoehen)
+    bisher["k"] = refraktion_bisher(d, v, v_ba)
+
+    aktuell = dict(zip(("dist_korr", "v_korr"), korr_kippachse(d, o, v)))
+    aktuell["delta_h"] = delta_h(d, v, v_ba, hoehen, 0.0, 0.0, 0.0)
+    aktuell["k"] = refraktion(d, v, v_ba)
+
+    return {name: {"bisher": float(np.nanmax(np.abs(bisher[name] - ref[name]))),
+                   "aktuell": float(np.nanmax(np.abs(aktuell[name] - ref[name])))}
+            for name in ref}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="python -m benchmarks.praezision",
+                                description="Vergleicht die Kernfunktionen mit einer mpmath-Referenz.")
+    p.add_argument("--anzahl", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--stellen", type=int, default=50, help="Dezimalstellen der Referenz")
+    p.add_argument("--grenzen", action="store_true", help="Exit-Code 1, falls eine Grenze aus GRENZEN überschritten wird")
+    args = p.parse_args()
+
+    try:
+        import mpmath  # noqa: F401
+    except ImportError:
+        sys.exit("Der Präzisionstest benötigt mpmath (pip install mpmath).")
+
+    fehler = vergleichen(args.anzahl, args.seed, args.stellen)
+
+    print(f"{'Grösse':<12} {'bisher':>12} {'aktuell':>12} {'Grenze':>10}")
+    verletzt = False
+    for name, f in fehler.items():
+        ok = f["aktuell"] <= GRENZEN[name]
+        verletzt |= not ok
+        print(f"{name:<12} {f['bisher']:>12.3e} {f['aktuell']:>12.3e} {GRENZEN[name]:>10.0e}{'' if ok else '  !'}")
+
+    sys.exit(1 if args.grenzen and verletzt else 0)
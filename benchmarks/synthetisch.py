@@ -0,0 +1,185 @@
+"""
+Generator für synthetische THB-Kampagnen im Format der Leica-Exporte (52 Spalten, cp1252, ";").
+
+Erzeugt pro Visur einen Ordner "Visur_<A>-<B>" mit den beiden Messdateien "THB-<A>-<B>.csv" und
+"THB-<B>-<A>.csv" (PunktNr-Schema "1003-1009-1-1.1": Standpunkt-Zielpunkt-Satz-Lage.Wiederholung),
+dazu die Datei der Näherungskoordinaten und die InstrHoehe-Datei. Die Winkel und Distanzen werden aus
+der Geometrie der Punkte inkl. Erdkrümmung, Refraktion und Messrauschen berechnet, sodass
+`master_thb` plausible Höhendifferenzen liefert.
+
+Beispiel:
+    python -m benchmarks.synthetisch /tmp/thb_synth --visuren 1000 --saetze 3
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+## Spalten der Leica-Exporte (wie test_data/THB_data)
+SPALTEN = ["Station", "Station (R)", "Station (H)", "Station (oH)", "PunktNr", "Rechtswert", "Hochwert",
+           "orth. Höhe", "Längengrad ", "Breitengrad", "ell. Höhe", "Code", "Codebeschreibung", "Codegruppe",
+           "Lage", "Punktklasse", "Herkunft", "Datum", "Uhrzeit", "Hz-Winkel", "V-Winkel", "Schrägdistanz",
+           "Horizontaldistanz", "Höhendifferenz", "Prisma", "Prismenkonstante", "EDM Typ", "EDM Mode", "ATR",
+           "Exz. Quer", "Exz. Längs", "Exz. Höhe", "Instrumentenhöhe", "Reflektorhöhe", "Antennenhöhe",
+           "indiv PPM", "Geom PPM", "Atmos PPM", "Temperatur", "Luftdruck", "Total PPM", "KQ 3D", "KQ 2D",
+           "KQ 1D", "GDOP", "PDOP", "HDOP", "VDOP", "TDOP", "Mountpoint", "Autolinie", "Bildname"]
+
+ERDRADIUS = 6_370_000.0
+RHO = 200 / np.pi
+
+
+def punkte_erzeugen(n_punkte:int, rng:np.random.Generator, start:int=1000):
+    """
+    Erzeugt Näherungskoordinaten für `n_punkte` Punkte entlang eines Zuges (Abstände 0.5-2.5 km).
+
+    Rückgabe:
+    ---------
+    dict
+        {PktNr: (E, N, H, Geoid, Xi, Eta)}
+    """
+
+    schritt = rng.uniform(500, 2500, n_punkte)
+    richtung = rng.uniform(0, 2 * np.pi, n_punkte)
+    E = 2_600_000 + np.cumsum(schritt * np.sin(richtung))
+    N = 1_200_000 + np.cumsum(schritt * np.cos(richtung))
+    H = np.clip(1500 + np.cumsum(rng.normal(0, 150, n_punkte)), 300, 4000)
+
+    return {str(start + i): (E[i], N[i], H[i], rng.uniform(2.3, 2.8), rng.normal(0, 2), rng.normal(0, 2))
+            for i in range(n_punkte)}
+
+
+def _messzeilen(A:str, B:str, pA, pB, instr:float, reflektor:float, saetze:int, wiederholungen:int,
+                zeit:datetime, rng:np.random.Generator, k:float=0.13):
+    """
+    Liefert die Zeilen einer Messdatei von Standpunkt A nach Zielpunkt B (REF-Zeile und Messungen).
+    """
+
+    dE, dN = pB[0] - pA[0], pB[1] - pA[1]
+    s = np.hypot(dE, dN)
+    dh = (pB[2] + reflektor) - (pA[2] + instr)
+    hz = (np.arctan2(dE, dN) * RHO) % 400
+    z = (np.pi / 2 - np.arctan2(dh, s) + s * (1 - k) / (2 * ERDRADIUS)) * RHO
+    d = np.hypot(s, dh)
+    ppm = 64.8
+
+    station = [A, "0", "0", "0"]
+    leer = ["---"] * 6
+    zeilen = [["---"] * 4 + [A, "0", "0", "0"] + ["---"] * 7 + ["REF", "---", zeit.strftime("%d.%m.%Y"), zeit.strftime("%H:%M:%S")]
+              + ["---"] * 22 + ["0", "0", "0"] + ["---"] * 8]
+
+    for satz in range(1, saetze + 1):
+        for lage in (1, 2):
+            for wdh in range(1, wiederholungen + 1):
+                zeit += timedelta(seconds=int(rng.integers(15, 40)))
+                v = z + rng.normal(0, 0.0003)
+                h = hz + rng.normal(0, 0.0003)
+                if lage == 2:
+                    v = 400 - v
+                    h = (h + 200) % 400
+                ds = (d + rng.normal(0, 0.001)) / (1 + ppm * 1e-6)
+
+                zeilen.append(station
+                              + [f"{A}-{B}-{satz}-{lage}.{wdh}", f"{dE:.4f}", f"{dN:.4f}", f"{dh:.4f}"]
+                              + leer
+                              + [str(lage), "MESS", "TPS", zeit.strftime("%d.%m.%Y"), zeit.strftime("%H:%M:%S"),
+                                 f"{h:.5f}", f"{v:.5f}", f"{ds:.4f}", f"{s:.4f}", f"{dh:.4f}",
+                                 "Leica Circ Prism", "0", "standard", "reflector", "ATR off", "---", "---", "---",
+                                 f"{instr:.4f}", f"{reflektor:.4f}", "---", "0", "0", f"{ppm}", "7.5", "787.1",
+                                 f"{ppm}", "0.014", "0.011", "0.008"]
+                              + ["---"] * 8)
+
+    return zeilen, zeit
+
+
+def _schreiben(pfad:Path, zeilen:list):
+    with open(pfad, "w", encoding="cp1252", newline="\r\n") as f:
+        f.write(";".join(SPALTEN) + "\n")
+        for z in zeilen:
+            f.write(";".join(z) + "\n")
+
+
+def kampagne_erzeugen(ziel,
+                      n_visuren:int=100,
+                      saetze:int=3,
+                      wiederholungen:int=3,
+                      seed:int=0):
+    """
+    Schreibt eine synthetische Kampagne mit `n_visuren` Visuren in den Ordner `ziel`.
+
+    Parameter:
+    ----------
+    ziel : str or pathlib.Path
+        Zielordner; enthält danach die Visurordner sowie "Naeherungskoord.txt" und "InstrHoehe.csv".
+    n_visuren : int, optional (Standard: 100)
+        Anzahl Visuren (Zug aus n_visuren + 1 Punkten).
+    saetze : int, optional (Standard: 3)
+        Anzahl Sätze pro Visur; grosse Werte erzeugen lange Messsessions.
+    wiederholungen : int, optional (Standard: 3)
+        Anzahl Messungen pro Satz und Lage.
+    seed : int, optional (Standard: 0)
+        Startwert des Zufallsgenerators (gleiche Parameter -> gleiche Dateien).
+
+    Rückgabe:
+    ---------
+    tuple
+        (Basisordner, Pfad der Näherungskoordinaten, Pfad der InstrHoehe-Datei)
+    """
+
+    rng = np.random.default_rng(seed)
+    ziel = Path(ziel)
+    ziel.mkdir(parents=True, exist_ok=True)
+
+    punkte = punkte_erzeugen(n_visuren + 1, rng)
+    nummern = list(punkte)
+
+    ## Näherungskoordinaten
+    fix_path = ziel / "Naeherungskoord.txt"
+    with open(fix_path, "w", encoding="utf-8") as f:
+        f.write("PktNr;E-Koord;N-Koord;Hoehe;Geoid;Xi;Eta\n")
+        for nr, (E, N, H, geoid, xi, eta) in punkte.items():
+            f.write(f"{nr};{E:.4f};{N:.4f};{H:.4f};{geoid:.4f};{xi:.1f};{eta:.1f}\n")
+
+    ## Visuren und Instrumentenparameter
+    instr_zeilen = ["Nr;ID;signal_A;offset_A;signal_B;offset_B"]
+    zeit = datetime(2025, 9, 8, 7, 30)
+
+    for i in range(n_visuren):
+        A, B = nummern[i], nummern[i + 1]
+        visur = f"Visur_{A}-{B}"
+        signal_A, signal_B = rng.uniform(1.5, 2.1, 2)
+        offset_A = offset_B = 0.2844
+        instr_zeilen.append(f"{i};{visur};{signal_A:.4f};{offset_A};{signal_B:.4f};{offset_B}")
+
+        ordner = ziel / visur
+        ordner.mkdir(exist_ok=True)
+
+        ## Gegenseitig gleichzeitige Messung: beide Richtungen mit derselben Startzeit
+        zeilen_AB, ende_AB = _messzeilen(A, B, punkte[A], punkte[B], signal_A - offset_A, signal_B,
+                                         saetze, wiederholungen, zeit, rng)
+        zeilen_BA, ende_BA = _messzeilen(B, A, punkte[B], punkte[A], signal_B - offset_B, signal_A,
+                                         saetze, wiederholungen, zeit, rng)
+        _schreiben(ordner / f"THB-{A}-{B}.csv", zeilen_AB)
+        _schreiben(ordner / f"THB-{B}-{A}.csv", zeilen_BA)
+        zeit = max(ende_AB, ende_BA) + timedelta(minutes=10)
+
+    instr_path = ziel / "InstrHoehe.csv"
+    with open(instr_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(instr_zeilen) + "\n")
+
+    return ziel, fix_path, instr_path
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="python -m benchmarks.synthetisch",
+                                description="Erzeugt eine synthetische THB-Kampagne.")
+    p.add_argument("ziel", type=Path)
+    p.add_argument("--visuren", type=int, default=100)
+    p.add_argument("--saetze", type=int, default=3)
+    p.add_argument("--wiederholungen", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    base, fix, instr = kampagne_erzeugen(args.ziel, args.visuren, args.saetze, args.wiederholungen, args.seed)
+    print(f"{args.visuren} Visuren in {base}\n  Näherungskoordinaten: {fix}\n  Instrumentenhöhen: {instr}")
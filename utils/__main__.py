@@ -0,0 +1,207 @@
+"""
+Kommandozeile für die automatische Auswertung einer Kampagne ohne Jupyter-Notebook.
+
+Beispiel:
+    python -m utils /daten/THB_2025 --fix Naeherungskoord.txt --instr InstrHoehe.csv --jobs 4 --formate csv pdf
+"""
+
+import argparse
+import sys
+from fnmatch import fnmatch
+from pathlib import Path
+
+from utils.ausreisser import KEINE, METHODEN
+from utils.auto import FORMATE, auswertung_kampagne, visuren_finden
+from utils.epochen import Epochenspeicher
+from utils.fixpunkte import FixpunktRegister
+from utils.imports import import_fix, import_instr
+from utils.unsicherheit import JACOBI, MONTECARLO
+from utils.validierung import FEHLER, AbbruchFehler, visur_pruefen
+from utils.watch import ueberwachen
+
+
+def parser():
+    p = argparse.ArgumentParser(prog="python -m utils",
+                                description="Trigonometrische Höhenbestimmung: Auswertung aller Visuren einer Kampagne.")
+    p.add_argument("base_path", type=Path,
+                   help="Basisordner mit einem Unterordner pro Visur")
+    p.add_argument("--fix", required=True,
+                   help="Datei mit den Näherungskoordinaten")
+    p.add_argument("--instr", required=True,
+                   help="CSV-Datei mit den Instrumenten- und Signalhöhen")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Anzahl Prozesse (Standard: 1)")
+    p.add_argument("-f", "--formate", nargs="+", choices=FORMATE, default=list(FORMATE),
+                   help="Zu schreibende Dateien pro Visur (Standard: alle)")
+    p.add_argument("-v", "--visur", action="append", default=None, metavar="ID",
+                   help="Nur diese Visur(en) auswerten; ID oder Muster wie 'Visur_10*' (mehrfach möglich)")
+    p.add_argument("--cache-dir", default=None,
+                   help="Ordner für den Import-Cache")
+    p.add_argument("--kampagnen-pdf", action="store_true",
+                   help="Zusätzlich ein gemeinsames PDF aller Visuren in _all-data schreiben")
+    p.add_argument("--bericht", action="store_true",
+                   help="Laufzeiten pro Stufe und Visur messen und als Laufbericht.json in _all-data schreiben")
+    p.add_argument("--profil", choices=("cprofile", "pyinstrument"), default=None,
+                   help="Zusätzlich ein Profil des Laufes in _all-data schreiben (schliesst --bericht ein)")
+    p.add_argument("--fail-fast", action="store_true",
+                   help="Bei der ersten ungültigen Visur bzw. dem ersten fehlgeschlagenen Export abbrechen")
+    p.add_argument("--unsicherheit", choices=(JACOBI, MONTECARLO), default=JACOBI,
+                   help="Fortpflanzung der a-priori-Genauigkeiten für die Präanalyse (Standard: jacobi)")
+    p.add_argument("--ausreisser", choices=METHODEN, default=KEINE,
+                   help="Ausreissererkennung pro Visur; verworfene Messungen zählen nicht zu den Kennwerten "
+                        "(Standard: keine)")
+    p.add_argument("--epochen", type=Path, default=None, metavar="ORDNER",
+                   help="Ergebnisse als neue Epochen im Epochenspeicher ablegen und die Trends pro Visur ausgeben")
+    p.add_argument("-w", "--watch", action="store_true",
+                   help="Basisordner überwachen und neue oder geänderte Visuren laufend inkrementell auswerten "
+                        "(bis Ctrl+C; nicht kombinierbar mit --visur, --bericht, --profil und --dry-run)")
+    p.add_argument("--intervall", type=float, default=2.0,
+                   help="Mit --watch: Abfrageintervall in Sekunden (Standard: 2)")
+    p.add_argument("--entprellen", type=float, default=3.0,
+                   help="Mit --watch: Ruhezeit nach der letzten Dateiänderung in Sekunden, bevor ausgewertet wird "
+                        "(Standard: 3)")
+    p.add_argument("-n", "--dry-run", action="store_true",
+                   help="Nur gefundene Visuren validieren und auflisten, nichts berechnen")
+    return p
+
+
+def visuren_auswaehlen(ordner:list, muster:list):
+    """
+    Filtert die gefundenen Visuren nach ID oder Muster (fnmatch); None behält alle.
+    """
+
+    if not muster:
+        return ordner
+    return [v for v in ordner if any(fnmatch(v.visur, m) for m in muster)]
+
+
+def trockenlauf(ordner:list, InstrHoehe:str, fix:str):
+    """
+    Listet die Visuren mit Messdateien auf und validiert ihre Eingaben (siehe `utils.validierung.visur_pruefen`).
+
+    Rückgabe:
+    ---------
+    int
+        Anzahl ungültiger Visuren.
+    """
+
+    df_instr = import_instr(InstrHoehe, strikt=True)
+    register = FixpunktRegister(import_fix(fix, strikt=True))
+    ungueltig = 0
+
+    for v in ordner:
+        pruefung = visur_pruefen(v, df_instr, register)
+
+        ungueltig += not pruefung.gueltig
+        status = "ok" if pruefung.gueltig else "ungültig"
+        print(f"{v.index:>3}  {v.visur:<24} {Path(v.csv_A2B).name} | {Path(v.csv_B2A).name}  [{status}]")
+        befunde_ausgeben(pruefung.befunde)
+
+    print(f"{len(ordner)} Visur(en) gefunden, {ungueltig} ungültig.")
+    return ungueltig
+
+
+def befunde_ausgeben(befunde:list):
+    for b in befunde:
+        print(f"       {'FEHLER ' if b.schwere == FEHLER else 'Warnung'} {b}")
+
+
+def epochen_ablegen(speicher:Epochenspeicher, kampagne):
+    """
+    Legt die Kampagne im Epochenspeicher ab und gibt die Trends der ausgewerteten Visuren aus.
+    """
+
+    neu = speicher.anhaengen(kampagne)
+    print(f"{len(neu)} neue Epoche(n) in {speicher.pfad} abgelegt.")
+
+    visuren = [e.visur for e in kampagne if e.fehler is None]
+    trends = speicher.trends(visuren=visuren)
+    for visur, t in trends[trends["Epochen"] >= 2].iterrows():
+        print(f"{visur:<24} {t['Epochen']:>3} Epochen  Änderung {t['Änderung [mm]']:+.2f} mm  "
+              f"Rate {t['Rate [mm/Jahr]']:+.2f} mm/Jahr (± {t['Std Rate [mm/Jahr]']:.2f})")
+
+
+def main(argv=None):
+    p = parser()
+    args = p.parse_args(argv)
+
+    if args.watch:
+        nicht_unterstuetzt = [name for name, gesetzt in (("--visur", args.visur), ("--bericht", args.bericht),
+                                                         ("--profil", args.profil), ("--dry-run", args.dry_run))
+                              if gesetzt]
+        if nicht_unterstuetzt:
+            p.error(f"--watch ist nicht kombinierbar mit {', '.join(nicht_unterstuetzt)}")
+
+    if not args.base_path.is_dir():
+        print(f"Fehler: Basisordner {args.base_path} existiert nicht.", file=sys.stderr)
+        return 2
+
+    if args.watch:
+        ueberwachen(args.base_path, args.instr, args.fix,
+                    intervall=args.intervall,
+                    entprellen=args.entprellen,
+                    n_jobs=args.jobs,
+                    cache_dir=args.cache_dir,
+                    formate=tuple(args.formate),
+                    kampagnen_pdf=args.kampagnen_pdf,
+                    fail_fast=args.fail_fast,
+                    methode=args.unsicherheit,
+                    ausreisser=args.ausreisser,
+                    epochen=args.epochen)
+        return 0
+
+    ordner = visuren_auswaehlen(visuren_finden(args.base_path), args.visur)
+    if not ordner:
+        print("Keine Visuren gefunden.", file=sys.stderr)
+        return 1
+
+    if args.dry_run:
+        return 1 if trockenlauf(ordner, args.instr, args.fix) else 0
+
+    try:
+        kampagne = auswertung_kampagne(args.base_path, args.instr, args.fix,
+                                       n_jobs=args.jobs,
+                                       cache_dir=args.cache_dir,
+                                       visuren=ordner,
+                                       formate=tuple(args.formate),
+                                       kampagnen_pdf=args.kampagnen_pdf,
+                                       bericht=args.bericht,
+                                       profil=args.profil,
+                                       fail_fast=args.fail_fast,
+                                       methode=args.unsicherheit,
+                                       ausreisser=args.ausreisser)
+    except AbbruchFehler as e:
+        print("Abbruch (--fail-fast):", file=sys.stderr)
+        for b in e.befunde:
+            print(f"  {b}", file=sys.stderr)
+        return 1
+
+    ## Zusammenfassung
+    fehler = 0
+    for e in kampagne:
+        if e.fehler is not None:
+            fehler += 1
+            print(f"{e.visur:<24} FEHLER")
+        else:
+            dH = e.statistik.dH.alle
+            print(f"{e.visur:<24} n={dH.n:>3}  dH={dH.mittel} m ± {dH.std} m  (Median {dH.median} m)")
+        befunde_ausgeben(e.befunde)
+
+    befunde_ausgeben(kampagne.kampagnen_befunde)
+    print(f"{len(kampagne) - fehler} von {len(kampagne)} Visur(en) ausgewertet.")
+
+    if args.epochen is not None:
+        epochen_ablegen(Epochenspeicher(args.epochen), kampagne)
+
+    if kampagne.laufbericht is not None:
+        print(f"Laufbericht ({kampagne.laufbericht['dauer_s']:.2f} s) in {args.base_path / '_all-data'}:")
+        for name, s in kampagne.laufbericht["stufen"].items():
+            print(f"  {name:<18} {s['wall_s']:>8.3f} s  (CPU {s['cpu_s']:.3f} s, {s['zeilen']} Zeilen)")
+
+    ## Rückgabewert 1 auch bei Fehlern ohne fehlgeschlagene Berechnung (z.B. Export), für nächtliche Läufe
+    fehler += sum(b.schwere == FEHLER for b in kampagne.befunde)
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import numpy as np
+
+from utils.statistik import _gruppen, _median_sortiert
+
+## Verfahren der Ausreissererkennung ("keine" bzw. None schaltet die Erkennung ab)
+KEINE = "keine"
+IQR = "iqr"
+GRUBBS = "grubbs"
+ROBUST_Z = "robust_z"
+METHODEN = (KEINE, IQR, GRUBBS, ROBUST_Z)
+
+## Schwellenwerte: Faktor der 1.5*IQR-Regel, Signifikanzniveau des Grubbs-Tests (zweiseitig)
+## und Grenze des robusten z-Wertes 0.6745 * |x - Median| / MAD (Iglewicz & Hoaglin)
+IQR_FAKTOR = 1.5
+GRUBBS_ALPHA = 0.05
+Z_GRENZE = 3.5
+
+
+## <----------------------------------------------------------------------------------->
+## Gruppierte Verfahren (alle Gruppen in einem NumPy-Durchgang)
+
+def _sortiert(x, gruppe, n_gruppen:int):
+    ## Sortierung nach Gruppe und Wert, Gruppengrössen und Startpositionen
+    ordnung = np.lexsort((x, gruppe))
+    n = np.bincount(gruppe, minlength=n_gruppen)
+    return ordnung, n, np.cumsum(n) - n
+
+
+def _quantil_sortiert(xs, start, n, q:float):
+    ## Quantil mit linearer Interpolation (wie numpy.percentile und pandas.quantile)
+    if len(xs) == 0:
+        return np.full(len(n), np.nan)
+    pos = q * np.maximum(n - 1, 0)
+    unten = np.floor(pos).astype(np.int64)
+    oben = np.minimum(unten + 1, np.maximum(n - 1, 0))
+    i_unten = np.minimum(start + unten, len(xs) - 1)
+    i_oben = np.minimum(start + oben, len(xs) - 1)
+    werte = xs[i_unten] + (pos - unten) * (xs[i_oben] - xs[i_unten])
+    return np.where(n == 0, np.nan, werte)
+
+
+def iqr_gruppiert(x, gruppe, n_gruppen:int, faktor:float=IQR_FAKTOR):
+    """
+    Werte ausserhalb [Q1 - faktor*IQR, Q3 + faktor*IQR] ihrer Gruppe (wie `boxplot_beaut`).
+    """
+
+    ordnung, n, start = _sortiert(x, gruppe, n_gruppen)
+    xs = x[ordnung]
+    q1 = _quantil_sortiert(xs, start, n, 0.25)
+    q3 = _quantil_sortiert(xs, start, n, 0.75)
+    iqr = q3 - q1
+
+    return (x < (q1 - faktor * iqr)[gruppe]) | (x > (q3 + faktor * iqr)[gruppe])
+
+
+def robust_z_gruppiert(x, gruppe, n_gruppen:int, grenze:float=Z_GRENZE):
+    """
+    Werte mit robustem z-Wert 0.6745 * |x - Median| / MAD > `grenze` in ihrer Gruppe.
+    Gruppen mit MAD = 0 haben keine Ausreisser.
+    """
+
+    ordnung, n, start = _sortiert(x, gruppe, n_gruppen)
+    median = _median_sortiert(x[ordnung], start, n)
+
+    abw = np.abs(x - median[gruppe])
+    mad = _median_sortiert(abw[np.lexsort((abw, gruppe))], start, n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = 0.6745 * abw / mad[gruppe]
+    return (mad[gruppe] > 0) & (z > grenze)
+
+
+def grubbs_gruppiert(x, gruppe, n_gruppen:int, alpha:float=GRUBBS_ALPHA):
+    """
+    Iterativer zweiseitiger Grubbs-Test: pro Durchgang wird in jeder Gruppe der Wert mit der
+    grössten normierten Abweichung verworfen, falls diese den kritischen Wert überschreitet.
+    Alle Gruppen werden gemeinsam getestet; die Schleife läuft, bis keine Gruppe mehr verwirft.
+    """
+
+    from scipy import stats
+
+    verworfen = np.zeros(len(x), dtype=bool)
+    zeilen = np.arange(len(x))
+
+    while True:
+        aktiv = ~verworfen
+        g = gruppe[aktiv]
+        n = np.bincount(g, minlength=n_gruppen)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mittel = np.bincount(g, weights=x[aktiv], minlength=n_gruppen) / n
+            std = np.sqrt(np.bincount(g, weights=(x[aktiv] - mittel[g])**2, minlength=n_gruppen) / (n - 1))
+            G = np.abs(x[aktiv] - mittel[g]) / std[g]
+
+            ## Kritischer Wert (n - 1) / sqrt(n) * sqrt(t² / (n - 2 + t²)), t-Quantil zu alpha / (2n)
+            t = stats.t.isf(alpha / (2 * n), n - 2)
+            G_krit = (n - 1) / np.sqrt(n) * np.sqrt(t**2 / (n - 2 + t**2))
+
+        ## Pro Gruppe der Wert mit der grössten Abweichung (letzter nach Sortierung)
+        G = np.where(np.isnan(G), -np.inf, G)
+        ordnung = np.lexsort((G, g))
+        letzte = ordnung[np.r_[g[ordnung][1:] != g[ordnung][:-1], True]] if len(g) else ordnung
+        kandidat = letzte[(n[g[letzte]] >= 3) & (G[letzte] > G_krit[g[letzte]])]
+
+        if len(kandidat) == 0:
+            return verworfen
+        verworfen[zeilen[aktiv][kandidat]] = True
+
+## <----------------------------------------------------------------------------------->
+
+
+def ausreisser_markieren(df300,
+                         methode:str=IQR,
+                         spalte:str="Höhendiff. [m]",
+                         schluessel:list=("ID Visur",)):
+    """
+    Markiert Ausreisser der Höhendifferenz pro Visur, für alle Visuren in einem Durchgang.
+
+    Die markierten Messungen stehen in der Spalte "Verworfen" von `df300` und werden bei den
+    Kennwerten (siehe `utils.statistik.gruppen_statistik`) nicht berücksichtigt; die Grafiken
+    stellen sie rot dar.
+
+    Parameter:
+    ----------
+    df300 : pandas.DataFrame
+        Messergebnisse (siehe `master_thb` bzw. `master_thb_batch`).
+    methode : str, optional (Standard: "iqr")
+        "iqr" (1.5*IQR-Regel), "grubbs" (iterativer Grubbs-Test, alpha = 0.05), "robust_z"
+        (robuster z-Wert > 3.5) oder "keine" bzw. None.
+    spalte : str, optional (Standard: "Höhendiff. [m]")
+        Geprüfte Grösse.
+    schluessel : sequence of str, optional (Standard: ("ID Visur",))
+        Gruppierung; Spalten, die in `df300` fehlen, werden ignoriert (z.B. bei `master_thb`).
+
+    Rückgabe:
+    ---------
+    numpy.ndarray of bool
+        True für verworfene Messungen, in der Reihenfolge von `df300`.
+    """
+
+    if methode not in METHODEN + (None,):
+        raise ValueError(f"Unbekannte Methode '{methode}' (möglich: {', '.join(METHODEN)}).")
+
+    verworfen = np.zeros(len(df300), dtype=bool)
+    if methode in (None, KEINE) or len(df300) == 0:
+        return verworfen
+
+    gruppe, index = _gruppen(df300, [s for s in schluessel if s in df300.columns])
+    n_gruppen = 1 if index is None else len(index)
+
+    x = df300[spalte].to_numpy(dtype=float)
+    ok = ~np.isnan(x) & (gruppe >= 0)
+
+    verfahren = {IQR: iqr_gruppiert, GRUBBS: grubbs_gruppiert, ROBUST_Z: robust_z_gruppiert}[methode]
+    verworfen[ok] = verfahren(x[ok], gruppe[ok], n_gruppen)
+
+    return verworfen
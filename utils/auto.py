@@ -1,29 +1,140 @@
-from utils.imports import import_csv, import_fix
-from utils.calculate import master_thb
-from utils.exports import export_protocol, export2csv, export_protocol_md_pdf
-
+from utils.imports import import_csv, import_fix, import_instr
+from utils.calculate import master_thb, master_thb_batch, visuren_stapeln, infos_visur
+from utils.cache import cached_import
+from utils.fixpunkte import FixpunktRegister
+from utils.statistik import Statistik, kampagnen_statistik
+from utils.ausreisser import KEINE
+from utils.unsicherheit import JACOBI, Genauigkeiten
+from utils.validierung import AbbruchFehler, Befund, kampagne_pruefen, visur_pruefen
+from utils import laufzeit
+
+## Exporte (tabulate, markdown, weasyprint) und Grafiken (matplotlib, PIL) werden erst bei Bedarf
+## importiert, damit Worker-Prozesse und reine Berechnungen schnell starten.
+
+## Mögliche Exportformate pro Visur (siehe `export_visur`)
+FORMATE = ("txt", "csv", "md", "pdf", "png")
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-def auto_auswertung2025(index:int,
-                        base_path,
-                        InstrHoehe:str,
-                        fix:str
-                        ):
 
-    ## <----------------------------------------------------------------------------------->
-    ## Erstellung der Pfadliste zu den unterschiedlichen Daten (Props an ChatGPT)
-    # Basis-Pfad als Path-Objekt
-    csv_first = []
-    csv_second = []
-    parent_folders = []
-    folder_paths = []
+@dataclass
+class VisurOrdner:
+    """
+    Ordner einer Visur mit den beiden Messdateien (A-->B und B-->A).
+    """
+    index: int
+    visur: str
+    ordner: str
+    csv_A2B: str
+    csv_B2A: str
+
+
+@dataclass
+class VisurErgebnis:
+    """
+    Ergebnis der Auswertung einer Visur, im selben Aufbau wie die Rückgabe von `master_thb`.
+
+    Ist die Auswertung fehlgeschlagen, enthält `fehler` die Fehlermeldung und die Ergebnisfelder sind None.
+    `befunde` enthält die strukturierten Befunde der Validierung und des Exports
+    (siehe `utils.validierung.Befund`), auch Warnungen gültiger Visuren. `statistik` enthält
+    die Kennwerte als Datensatz (z.B. `statistik.dH.lage2.mittel` statt `infos_height[5]`).
+    """
+    visur: str
+    ordner: str
+    df300: pd.DataFrame = None
+    infos_vis: list = None
+    infos_height: list = None
+    infos_k: list = None
+    infos_sd: list = None
+    data: list = None
+    fehler: str = None
+    befunde: list = field(default_factory=list)
+    statistik: Statistik = None
+
+
+@dataclass
+class KampagnenErgebnis:
+    """
+    Sammlung der Ergebnisse aller Visuren einer Kampagne.
+
+    Attribute:
+    ----------
+    visuren : list of VisurErgebnis
+        Ergebnisse pro Visur, in der Reihenfolge der Ordner.
+    df300 : pandas.DataFrame
+        Messergebnisse aller Visuren in einer Tabelle.
+    df_stats : pandas.DataFrame
+        Statistische Kennwerte pro Visur (siehe `master_thb_batch`).
+    neu_berechnet : list of str
+        IDs der in diesem Lauf neu berechneten Visuren (bei inkrementeller Auswertung).
+    laufbericht : dict
+        Laufzeiten pro Stufe und Visur (siehe `utils.laufzeit`), falls aufgezeichnet.
+    kampagnen_befunde : list of Befund
+        Befunde, die keine einzelne Visur betreffen (z.B. ein fehlgeschlagenes Kampagnen-PDF).
+    """
+    visuren: list = field(default_factory=list)
+    df300: pd.DataFrame = None
+    df_stats: pd.DataFrame = None
+    neu_berechnet: list = field(default_factory=list)
+    laufbericht: dict = None
+    kampagnen_befunde: list = field(default_factory=list)
+
+    def __iter__(self):
+        return iter(self.visuren)
+
+    def __len__(self):
+        return len(self.visuren)
+
+    def __getitem__(self, visur):
+        if isinstance(visur, int):
+            return self.visuren[visur]
+        for ergebnis in self.visuren:
+            if ergebnis.visur == visur:
+                return ergebnis
+        raise KeyError(visur)
+
+    @property
+    def befunde(self):
+        """
+        Befunde aller Visuren und der Kampagne in einer Liste (siehe `utils.validierung.Befund`).
+        """
+        return [b for ergebnis in self.visuren for b in ergebnis.befunde] + self.kampagnen_befunde
+
+    @property
+    def statistik(self):
+        """
+        Kennwerte über alle Messungen der Kampagne, gesamt und pro Lage (siehe `utils.statistik`).
+        """
+        return None if self.df300 is None else kampagnen_statistik(self.df300)
+
+
+def visuren_finden(base_path):
+    """
+    Sucht einmalig alle Visurordner im Basisordner und die beiden Messdateien pro Visur.
+
+    Ordner mit weniger als zwei CSV-Dateien werden mit einer Warnung übersprungen,
+    der Ordner "_all-data" wird ignoriert.
+
+    Parameter:
+    ----------
+    base_path : pathlib.Path
+        Basisordner mit einem Unterordner pro Visur.
+
+    Rückgabe:
+    ---------
+    list of VisurOrdner
+        Gefundene Visuren, sortiert nach Ordnername. Der Index entspricht der Spalte "Nr" der InstrHoehe-Datei.
+    """
+
+    visuren = []
 
     # Iteriere über alle Unterordner
-    for folder in sorted([f for f in base_path.iterdir() if f.is_dir()]):
-        
+    for folder in sorted([f for f in Path(base_path).iterdir() if f.is_dir()]):
+
         ## Ignoriere den Ordner "_all-data"
         if folder.name == "_all-data":
             continue
@@ -31,39 +142,471 @@ def auto_auswertung2025(index:int,
         csv_files = sorted([f for f in folder.glob("*.csv")])
 
         if len(csv_files) >= 2:
-            csv_first.append(str(csv_files[0]))
-            csv_second.append(str(csv_files[1]))
-            parent_folders.append(folder.name)       # Ordnername
-            folder_paths.append(str(folder))         # Pfad des Ordners
+            visuren.append(VisurOrdner(index=len(visuren),
+                                       visur=folder.name,             # Ordnername
+                                       ordner=str(folder),            # Pfad des Ordners
+                                       csv_A2B=str(csv_files[0]),
+                                       csv_B2A=str(csv_files[1])))
         else:
             print(f"Warnung: Weniger als 2 CSV-Dateien in {folder.name}")
 
-    ## <----------------------------------------------------------------------------------->
-    ## Setze die Liste zum aktuellen index
-    mess1_A2B = csv_first[index]
-    mess2_B2A = csv_second[index]
+    return visuren
 
-    path_protokoll = folder_paths[index]
-    visurnummer = parent_folders[index]
-    ## <----------------------------------------------------------------------------------->
 
-    # ## Prüfung der Visurnummer und Ausgabe
-    # max_index = len(csv_first)-1
-    # print(f"Es wurden {max_index+1} Visuren gefunden. // Der Range der Indizies sind 0 bis {max_index}.")
-    # print(f"Verarbeite Visur: {visurnummer}")
+def instr_parameter(df_instr, visur:VisurOrdner):
+    """
+    Liefert die Instrumentenparameter einer Visur als Liste [Signalhöhe A, Offset A, Signalhöhe B, Offset B].
 
-    ## <----------------------------------------------------------------------------------->
-    ## Import der Instrumentenparameter und als Parameter setzen
-    df001 = pd.read_csv(InstrHoehe, delimiter=";", encoding="mbcs")
+    Gesucht wird über die ID der Visur (Ordnername), falls diese in der InstrHoehe-Datei
+    vorkommt, sonst über die Laufnummer "Nr".
+    """
 
-    df001_new = df001[df001["Nr"] == index]
+    df001_new = df_instr[df_instr["ID"] == visur.visur]
+    if df001_new.empty:
+        df001_new = df_instr[df_instr["Nr"] == visur.index]
 
     signalhoehe_A = df001_new["signal_A"].values[0]
     offset_A = df001_new["offset_A"].values[0]
     signalhoehe_B = df001_new["signal_B"].values[0]
     offset_B = df001_new["offset_B"].values[0]
 
-    data = [signalhoehe_A, offset_A, signalhoehe_B, offset_B]
+    return [signalhoehe_A, offset_A, signalhoehe_B, offset_B]
+
+
+def auswertung_kampagne(base_path,
+                        InstrHoehe:str,
+                        fix:str,
+                        exportieren:bool=True,
+                        n_jobs:int=1,
+                        cache_dir:str=None,
+                        visuren:list=None,
+                        formate:tuple=None,
+                        kampagnen_pdf:bool=False,
+                        bericht:bool=False,
+                        profil:str=None,
+                        fail_fast:bool=False,
+                        methode:str=JACOBI,
+                        ausreisser:str=KEINE,
+                        genauigkeiten:Genauigkeiten=None):
+    """
+    Wertet alle Visuren einer Kampagne in einem Durchgang aus.
+
+    Die Ordnersuche, die Instrumentenparameter und die Näherungskoordinaten werden nur einmal
+    geladen. Anschliessend werden alle Messdateien importiert und validiert (siehe
+    `utils.validierung.visur_pruefen`). Nur gültige Visuren werden gemeinsam mit `master_thb_batch`
+    berechnet und pro Visur exportiert (Protokoll, CSV, Markdown/PDF); ungültige erhalten ihre
+    Befunde in `VisurErgebnis.befunde` und die Fehlermeldung in `VisurErgebnis.fehler`.
+
+    Mit `n_jobs > 1` werden die Visuren stattdessen auf einen Prozesspool verteilt
+    (siehe `auswertung_kampagne_parallel`).
+
+    Parameter:
+    ----------
+    base_path : pathlib.Path
+        Basisordner mit einem Unterordner pro Visur.
+    InstrHoehe : str
+        Pfad zur Datei mit den Instrumentenparametern.
+    fix : str
+        Pfad zur Datei mit den Näherungskoordinaten.
+    exportieren : bool, optional (Standard: True)
+        Ob die Protokolle und CSV-Dateien pro Visur geschrieben werden.
+    n_jobs : int, optional (Standard: 1)
+        Anzahl Prozesse für die parallele Auswertung.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`); None liest alle Dateien neu ein.
+    visuren : list of VisurOrdner, optional (Standard: None)
+        Auszuwertende Visuren (z.B. eine Auswahl aus `visuren_finden`); None wertet alle aus.
+    formate : tuple of str, optional (Standard: None)
+        Zu schreibende Dateien pro Visur aus `FORMATE` ("txt", "csv", "md", "pdf", "png");
+        None schreibt alle (nur mit `exportieren`).
+    kampagnen_pdf : bool, optional (Standard: False)
+        Ob zusätzlich ein gemeinsames PDF aller Visuren in "_all-data" geschrieben wird
+        (siehe `export_kampagne_pdf`).
+    bericht : bool, optional (Standard: False)
+        Ob Wall-/CPU-Zeit und Zeilenzahl pro Stufe und Visur gemessen und als "Laufbericht.json"
+        in "_all-data" geschrieben werden (siehe `utils.laufzeit`).
+    profil : str, optional (Standard: None)
+        "cprofile" oder "pyinstrument" für ein zusätzliches Profil des Laufes in "_all-data"
+        (schliesst `bericht` ein).
+    fail_fast : bool, optional (Standard: False)
+        Bei der ersten ungültigen Visur (bzw. dem ersten fehlgeschlagenen Export) mit
+        `AbbruchFehler` abbrechen, bevor weiter gerechnet wird.
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung der a-priori-Genauigkeiten für die Präanalyse: "jacobi" (linear) oder
+        "montecarlo" (siehe `utils.unsicherheit`).
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung pro Visur: "iqr", "grubbs", "robust_z" oder "keine"
+        (siehe `utils.ausreisser`). Verworfene Messungen bleiben in `df300` (Spalte "Verworfen"),
+        zählen aber nicht zu den Kennwerten.
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten für die Präanalyse; None verwendet die Standardwerte.
+
+    Rückgabe:
+    ---------
+    KampagnenErgebnis
+        Ergebnisse aller Visuren.
+
+    Raises
+    ------
+    AbbruchFehler
+        Nur mit `fail_fast`, mit den Befunden der ersten fehlerhaften Visur.
+    """
+
+    if bericht or profil:
+        return _aufgezeichnet(auswertung_kampagne, profil, base_path, InstrHoehe, fix, exportieren, n_jobs,
+                              cache_dir, visuren, formate, kampagnen_pdf, False, None, fail_fast, methode,
+                              ausreisser, genauigkeiten)
+
+    if n_jobs > 1:
+        return auswertung_kampagne_parallel(base_path, InstrHoehe, fix, exportieren, n_jobs, cache_dir, visuren,
+                                            formate, kampagnen_pdf, fail_fast=fail_fast, methode=methode,
+                                            ausreisser=ausreisser, genauigkeiten=genauigkeiten)
+
+    ## <----------------------------------------------------------------------------------->
+    ## Einmalige Suche der Ordner und Import der Projektdaten
+    with laufzeit.stufe("suche") as m:
+        ordner = visuren_finden(base_path) if visuren is None else visuren
+        m.zeilen = len(ordner)
+    if not ordner:
+        return KampagnenErgebnis()
+
+    with laufzeit.stufe("import_projekt"):
+        df_instr = _importieren(InstrHoehe, import_instr, None)
+        df_aprox = FixpunktRegister(_importieren(fix, import_fix, cache_dir))
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Import und Validierung aller Messdaten und Instrumentenparameter
+    pruefungen = kampagne_pruefen(ordner, df_instr, df_aprox, cache_dir, fail_fast)
+    gueltig = {p.visur: p for p in pruefungen if p.gueltig}
+
+    for p in pruefungen:
+        if not p.gueltig:
+            print(f"Fehler bei der Auswertung von {p.visur}: {p.fehler}")
+
+    kampagne = KampagnenErgebnis()
+    if not gueltig:
+        kampagne.visuren = [VisurErgebnis(visur=v.visur, ordner=v.ordner, fehler=p.fehler, befunde=p.befunde)
+                            for v, p in zip(ordner, pruefungen)]
+        return kampagne
+
+    messungen = {visur: p.messungen for visur, p in gueltig.items()}
+    df_param = pd.DataFrame([[visur] + p.data for visur, p in gueltig.items()],
+                            columns=["ID", "signal_A", "offset_A", "signal_B", "offset_B"])
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Höhenberechnung aller gültigen Visuren in einem Durchgang
+    df300_all, df_stats = master_thb_batch(visuren_stapeln(messungen), df_aprox, df_param, methode,
+                                           genauigkeiten, ausreisser)
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Aufteilen pro Visur und Export
+    kampagne.df300, kampagne.df_stats = df300_all, df_stats
+    gruppen = dict(tuple(df300_all.groupby("ID Visur", sort=False)))
+
+    for v, pruefung in zip(ordner, pruefungen):
+        if not pruefung.gueltig:
+            kampagne.visuren.append(VisurErgebnis(visur=v.visur, ordner=v.ordner, fehler=pruefung.fehler,
+                                                  befunde=pruefung.befunde))
+            continue
+
+        df300_new = gruppen[v.visur].reset_index(drop=True)
+        infos_vis, infos_height, infos_k, infos_sd = infos_visur(df_stats, v.visur)
+
+        ergebnis = VisurErgebnis(visur=v.visur,
+                                 ordner=v.ordner,
+                                 df300=df300_new,
+                                 infos_vis=infos_vis,
+                                 infos_height=infos_height,
+                                 infos_k=infos_k,
+                                 infos_sd=infos_sd,
+                                 data=pruefung.data,
+                                 befunde=pruefung.befunde,
+                                 statistik=Statistik.aus_tabelle(df_stats, v.visur))
+
+        if exportieren:
+            export_visur(ergebnis, formate, strikt=fail_fast)
+
+        kampagne.visuren.append(ergebnis)
+    ## <----------------------------------------------------------------------------------->
+
+    if kampagnen_pdf:
+        _kampagnen_pdf(base_path, kampagne, fail_fast)
+
+    return kampagne
+
+
+def _aufgezeichnet(auswertung, profil:str, base_path, *args):
+    """
+    Führt `auswertung` mit aktivem Laufbericht aus und schreibt diesen nach "_all-data".
+    """
+
+    with laufzeit.aufzeichnen(profil) as lauf:
+        kampagne = auswertung(base_path, *args)
+
+    kampagne.laufbericht = lauf.speichern(Path(base_path) / "_all-data")
+    return kampagne
+
+
+def _importieren(file_path:str, importer, cache_dir:str):
+    """
+    Importiert eine Projektdatei (über den Cache); Fehler werden weitergereicht, da ohne
+    Näherungskoordinaten bzw. Instrumentenparameter keine Visur ausgewertet werden kann.
+    """
+
+    if cache_dir is None:
+        return importer(file_path, strikt=True)
+    return cached_import(file_path, importer, cache_dir, strikt=True)
+
+
+## Daten der Worker-Prozesse (werden einmal pro Prozess im Initializer geladen)
+_worker_daten = {}
+
+def _worker_init(InstrHoehe:str, fix:str, cache_dir:str):
+    _worker_daten["df_instr"] = _importieren(InstrHoehe, import_instr, None)
+    _worker_daten["df_aprox"] = FixpunktRegister(_importieren(fix, import_fix, cache_dir))
+    _worker_daten["cache_dir"] = cache_dir
+
+
+def _worker_visur(v:VisurOrdner, exportieren:bool, formate:tuple=None, messen:bool=False, strikt:bool=False,
+                  methode:str=JACOBI, ausreisser:str=KEINE, genauigkeiten:Genauigkeiten=None):
+    """
+    Wertet eine Visur im Worker aus. Mit `messen` werden die Laufzeiten im Worker aufgezeichnet
+    und als Liste von `laufzeit.Messung` mit zurückgegeben (sonst eine leere Liste).
+    """
+
+    if not messen:
+        return *_visur_auswerten(v, exportieren, formate, strikt, methode, ausreisser, genauigkeiten), []
+
+    with laufzeit.aufzeichnen() as lauf, laufzeit.visur(v.visur):
+        ergebnis, df_stats = _visur_auswerten(v, exportieren, formate, strikt, methode, ausreisser, genauigkeiten)
+    return ergebnis, df_stats, lauf.messungen
+
+
+def _visur_auswerten(v:VisurOrdner, exportieren:bool, formate:tuple=None, strikt:bool=False,
+                     methode:str=JACOBI, ausreisser:str=KEINE, genauigkeiten:Genauigkeiten=None):
+    ## Validierung vor der Berechnung; ungültige Visuren werden nicht gerechnet
+    pruefung = visur_pruefen(v, _worker_daten["df_instr"], _worker_daten["df_aprox"], _worker_daten["cache_dir"])
+    if not pruefung.gueltig:
+        return VisurErgebnis(visur=v.visur, ordner=v.ordner, fehler=pruefung.fehler, befunde=pruefung.befunde), None
+
+    try:
+        data = pruefung.data
+        df_param = pd.DataFrame([[v.visur] + data],
+                                columns=["ID", "signal_A", "offset_A", "signal_B", "offset_B"])
+
+        messungen = {v.visur: pruefung.messungen}
+        df300_new, df_stats = master_thb_batch(visuren_stapeln(messungen), _worker_daten["df_aprox"], df_param,
+                                               methode, genauigkeiten, ausreisser)
+        infos_vis, infos_height, infos_k, infos_sd = infos_visur(df_stats, v.visur)
+
+        ergebnis = VisurErgebnis(visur=v.visur,
+                                 ordner=v.ordner,
+                                 df300=df300_new,
+                                 infos_vis=infos_vis,
+                                 infos_height=infos_height,
+                                 infos_k=infos_k,
+                                 infos_sd=infos_sd,
+                                 data=data,
+                                 befunde=pruefung.befunde,
+                                 statistik=Statistik.aus_tabelle(df_stats, v.visur))
+
+        if exportieren:
+            export_visur(ergebnis, formate, strikt=strikt)
+
+        return ergebnis, df_stats
+
+    except AbbruchFehler:
+        raise
+    except Exception as e:
+        return VisurErgebnis(visur=v.visur, ordner=v.ordner, fehler=f"{type(e).__name__}: {e}",
+                             befunde=pruefung.befunde), None
+
+
+def auswertung_kampagne_parallel(base_path,
+                                 InstrHoehe:str,
+                                 fix:str,
+                                 exportieren:bool=True,
+                                 n_jobs:int=None,
+                                 cache_dir:str=None,
+                                 visuren:list=None,
+                                 formate:tuple=None,
+                                 kampagnen_pdf:bool=False,
+                                 bericht:bool=False,
+                                 profil:str=None,
+                                 fail_fast:bool=False,
+                                 methode:str=JACOBI,
+                                 ausreisser:str=KEINE,
+                                 genauigkeiten:Genauigkeiten=None):
+    """
+    Wertet alle Visuren einer Kampagne parallel in einem Prozesspool aus.
+
+    Jeder Worker lädt die Näherungskoordinaten und Instrumentenparameter einmal beim Start.
+    Pro Visur laufen Import mit Validierung, Berechnung und Export im Worker. Die Ergebnisse werden
+    in der Reihenfolge der Ordner gesammelt; ein Fehler in einer Visur bricht die übrigen nicht ab,
+    sondern wird in den Feldern `fehler` und `befunde` des jeweiligen `VisurErgebnis` festgehalten.
+
+    Parameter:
+    ----------
+    base_path : pathlib.Path
+        Basisordner mit einem Unterordner pro Visur.
+    InstrHoehe : str
+        Pfad zur Datei mit den Instrumentenparametern.
+    fix : str
+        Pfad zur Datei mit den Näherungskoordinaten.
+    exportieren : bool, optional (Standard: True)
+        Ob die Protokolle und CSV-Dateien pro Visur geschrieben werden.
+    n_jobs : int, optional (Standard: None)
+        Anzahl Worker-Prozesse; None verwendet die Anzahl CPUs.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`); None liest alle Dateien neu ein.
+    visuren : list of VisurOrdner, optional (Standard: None)
+        Auszuwertende Visuren (z.B. eine Auswahl aus `visuren_finden`); None wertet alle aus.
+    formate : tuple of str, optional (Standard: None)
+        Zu schreibende Dateien pro Visur aus `FORMATE` ("txt", "csv", "md", "pdf", "png");
+        None schreibt alle (nur mit `exportieren`).
+    kampagnen_pdf : bool, optional (Standard: False)
+        Ob zusätzlich ein gemeinsames PDF aller Visuren in "_all-data" geschrieben wird
+        (siehe `export_kampagne_pdf`).
+    bericht : bool, optional (Standard: False)
+        Ob die Laufzeiten pro Stufe und Visur aufgezeichnet werden (siehe `auswertung_kampagne`).
+        Die Worker messen ihre Stufen selbst, der Bericht wird im Hauptprozess zusammengeführt.
+    profil : str, optional (Standard: None)
+        "cprofile" oder "pyinstrument"; profiliert nur den Hauptprozess.
+    fail_fast : bool, optional (Standard: False)
+        Beim ersten fehlerhaften Ergebnis die noch nicht gestarteten Visuren abbrechen und
+        `AbbruchFehler` auslösen.
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung für die Präanalyse (siehe `auswertung_kampagne`). Die Monte-Carlo-Stichproben
+        hängen nur von der ID der Visur ab, die Ergebnisse entsprechen also der seriellen Auswertung.
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung (siehe `auswertung_kampagne`).
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten für die Präanalyse (siehe `auswertung_kampagne`).
+
+    Rückgabe:
+    ---------
+    KampagnenErgebnis
+        Ergebnisse aller Visuren.
+    """
+
+    if bericht or profil:
+        return _aufgezeichnet(auswertung_kampagne_parallel, profil, base_path, InstrHoehe, fix, exportieren,
+                              n_jobs, cache_dir, visuren, formate, kampagnen_pdf, False, None, fail_fast, methode,
+                              ausreisser, genauigkeiten)
+
+    with laufzeit.stufe("suche") as m:
+        ordner = visuren_finden(base_path) if visuren is None else visuren
+        m.zeilen = len(ordner)
+    messen = laufzeit.aktiv()
+
+    with ProcessPoolExecutor(max_workers=n_jobs,
+                             initializer=_worker_init,
+                             initargs=(InstrHoehe, fix, cache_dir)) as pool:
+        futures = [pool.submit(_worker_visur, v, exportieren, formate, messen, fail_fast, methode, ausreisser,
+                               genauigkeiten) for v in ordner]
+
+        kampagne = KampagnenErgebnis()
+        stats = []
+        for v, future in zip(ordner, futures):
+            try:
+                ergebnis, df_stats, messungen = future.result()
+                laufzeit.uebernehmen(messungen)
+            except AbbruchFehler:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as e:
+                ergebnis, df_stats = VisurErgebnis(visur=v.visur, ordner=v.ordner, fehler=f"{type(e).__name__}: {e}"), None
+
+            if ergebnis.fehler:
+                if fail_fast:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise AbbruchFehler(ergebnis.befunde or [Befund(v.visur, "berechnung", ergebnis.fehler)])
+                print(f"Fehler bei der Auswertung von {v.visur}: {ergebnis.fehler}")
+            else:
+                stats.append(df_stats)
+
+            kampagne.visuren.append(ergebnis)
+
+    if stats:
+        kampagne.df300 = pd.concat([e.df300 for e in kampagne if e.fehler is None], ignore_index=True)
+        kampagne.df_stats = pd.concat(stats)
+
+    if kampagnen_pdf:
+        _kampagnen_pdf(base_path, kampagne, fail_fast)
+
+    return kampagne
+
+
+def _kampagnen_pdf(base_path, kampagne:KampagnenErgebnis, fail_fast:bool=False):
+    """
+    Schreibt das Kampagnen-PDF nach "_all-data". Ein Fehler wird als Befund "export_kampagnen_pdf"
+    in `kampagne.kampagnen_befunde` festgehalten; mit `fail_fast` wird `AbbruchFehler` ausgelöst.
+    """
+
+    from utils.exports import export_kampagne_pdf
+
+    ordner = Path(base_path) / "_all-data"
+    try:
+        ordner.mkdir(exist_ok=True)
+        with laufzeit.stufe("kampagnen_pdf", len(kampagne)):
+            return export_kampagne_pdf(kampagne, str(ordner), strikt=True)
+    except Exception as e:
+        befund = Befund("Kampagne", "export_kampagnen_pdf",
+                        f"Fehler beim Exportieren des Kampagnenprotokolls: {e}", datei=str(ordner))
+        print(befund.meldung)
+        if fail_fast:
+            raise AbbruchFehler([befund])
+        kampagne.kampagnen_befunde.append(befund)
+        return None
+
+
+def export_visur(ergebnis:VisurErgebnis, formate:tuple=None, strikt:bool=False):
+    """
+    Exportiert die Dateien einer ausgewerteten Visur in deren Ordner.
+
+    Mögliche Formate (`FORMATE`): "txt" (Protokoll), "csv" (Messwerte), "md" (Protokoll als Markdown),
+    "pdf" (Protokoll als PDF) und "png" (Boxplot und Scatterplot als Bilddateien). Ohne "png" werden
+    die Grafiken im PDF als Vektorgrafik eingebettet. None exportiert alle Formate.
+    Die Formate werden über die Exporter-Registry geschrieben (siehe `utils.exports.exportieren`);
+    gemeinsame Daten wie Markdown-Protokoll und Grafiken werden dabei nur einmal erstellt.
+    Fehlgeschlagene Formate werden als Befund in `ergebnis.befunde` ergänzt; mit `strikt` wird
+    stattdessen `AbbruchFehler` ausgelöst.
+    """
+
+    from utils.exports import ExportKontext, exportieren
+
+    kontext = ExportKontext.aus_ergebnis(ergebnis, FORMATE if formate is None else formate)
+    try:
+        exportieren(kontext, strikt=strikt)
+    finally:
+        ergebnis.befunde.extend(kontext.befunde)
+
+def auto_auswertung2025(index:int,
+                        base_path,
+                        InstrHoehe:str,
+                        fix:str
+                        ):
+
+    from utils.exports import export_protocol, export2csv, export_protocol_md_pdf
+
+    ## <----------------------------------------------------------------------------------->
+    ## Erstellung der Pfadliste zu den unterschiedlichen Daten und setzen des aktuellen index
+    visur = visuren_finden(base_path)[index]
+
+    mess1_A2B = visur.csv_A2B
+    mess2_B2A = visur.csv_B2A
+
+    path_protokoll = visur.ordner
+    visurnummer = visur.visur
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Import der Instrumentenparameter und als Parameter setzen
+    data = instr_parameter(import_instr(InstrHoehe), visur)
+    signalhoehe_A, offset_A, signalhoehe_B, offset_B = data
     ## <----------------------------------------------------------------------------------->
 
     # string_ausgabe = f"""
@@ -154,24 +697,45 @@ def img_paths(base_path):
     return imgs_scatter, imgs_boxplot
 
 
-import matplotlib.pyplot as plt
+def save_image_grid(image_paths, output_path, cols=4, figsize_per_image=(4,4), dpi=100, n_threads=None):
+    """
+    Setzt die Grafiken aller Visuren zu einem Rasterbild zusammen (siehe `utils.bildraster.bildraster`).
+
+    Die Kachelgrösse entspricht `figsize_per_image` (in Zoll) bei `dpi`; die Bilder werden
+    parallel dekodiert und direkt als uint8-Puffer eingefügt, ohne Matplotlib-Figur.
+    Neben Dateipfaden sind auch Bytes oder Figuren als Einträge möglich.
+    """
+
+    from utils.bildraster import bildraster
+
+    kachel = (round(figsize_per_image[0] * dpi), round(figsize_per_image[1] * dpi))
+    return bildraster(image_paths, output_path, cols=cols, kachel=kachel, n_threads=n_threads)
+
+
+def bildraster_kampagne(kampagne:KampagnenErgebnis, file_path, cols=4, dpi=100):
+    """
+    Erstellt die Rasterbilder aller Boxplots und Scatterplots einer Kampagne direkt aus den
+    Figuren des Renderers, ohne die Einzelbilder als Dateien zu lesen.
 
-def save_image_grid(image_paths, output_path, cols=4, figsize_per_image=(4,4)):
-    n = len(image_paths)
-    rows = (n + cols - 1) // cols
+    Rückgabe:
+    ---------
+    tuple
+        Pfade der Rasterbilder (Scatterplot, Boxplot).
+    """
 
-    fig, axs = plt.subplots(rows, cols, figsize=(figsize_per_image[0]*cols, figsize_per_image[1]*rows))
-    axs = axs.flatten()
+    from utils.bildraster import bildraster
+    from utils.render import renderer
 
-    for ax in axs[n:]:
-        fig.delaxes(ax)
+    plot = renderer()
+    ergebnisse = [e for e in kampagne if e.fehler is None]
 
-    for i, img_path in enumerate(image_paths):
-        img = plt.imread(str(img_path))
-        axs[i].imshow(img)
-        axs[i].axis('off')  # Keine Achsen anzeigen
+    scatter_path = Path(file_path) / "Scatter_Winkelstreuung.png"
+    boxplot_path = Path(file_path) / "Boxplot_Höhendifferenz.png"
 
-    plt.tight_layout()
-    fig.savefig(output_path, bbox_inches='tight')
-    plt.close(fig)
+    ## Die Figuren werden wiederverwendet, daher als Generator: jede wird gerastert, bevor die nächste entsteht
+    bildraster((plot.scatterplot(e.df300, e.visur) for e in ergebnisse), scatter_path,
+               cols=cols, kachel=(8 * dpi, 8 * dpi), anzahl=len(ergebnisse))
+    bildraster((plot.boxplot(e.df300, e.visur) for e in ergebnisse), boxplot_path,
+               cols=cols, kachel=(4 * dpi, 8 * dpi), anzahl=len(ergebnisse))
 
+    return scatter_path, boxplot_path
@@ -0,0 +1,247 @@
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+## Hintergrundfarbe der Rasterbilder (wie die Figuren der Plots)
+WEISS = (255, 255, 255)
+
+## Rand um Figuren beim Rastern (Vorgabe von savefig)
+PAD_ZOLL = 0.1
+
+
+## <----------------------------------------------------------------------------------->
+## Laden der Einzelbilder
+
+def _oeffnen(bild):
+    """
+    Öffnet ein Einzelbild als PIL-Bild. Bytes und Dateipfade werden (verzögert) dekodiert.
+    """
+
+    if isinstance(bild, Image.Image):
+        return bild
+    if isinstance(bild, np.ndarray):
+        if bild.dtype != np.uint8:
+            bild = (np.clip(bild, 0, 1) * 255 + 0.5).astype(np.uint8)
+        return Image.fromarray(bild)
+    if isinstance(bild, (bytes, bytearray, memoryview)):
+        return Image.open(BytesIO(bild))
+    if hasattr(bild, "read"):
+        return Image.open(bild)
+    return Image.open(str(bild))
+
+
+def _figur_zoll(fig):
+    """
+    Grösse einer Figur in Zoll wie bei `savefig(bbox_inches="tight")`, also inklusive Tabellen und
+    Beschriftungen ausserhalb der Figurfläche (z.B. Kennwerttabellen unter dem Boxplot).
+    """
+
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+    rand = 2 * PAD_ZOLL
+    return bbox.width + rand, bbox.height + rand
+
+
+def _figur_rastern(fig, kachel):
+    """
+    Rastert eine Matplotlib-Figur mit `bbox_inches="tight"` als PNG-Bytes, bei gegebener Kachelgrösse
+    mit passender Auflösung. Muss im Hauptthread laufen (Matplotlib ist nicht threadsicher).
+    """
+
+    breite, hoehe = _figur_zoll(fig)
+    dpi = fig.dpi if kachel is None else min(kachel[0] / breite, kachel[1] / hoehe)
+
+    puffer = BytesIO()
+    fig.savefig(puffer, format="png", dpi=dpi, bbox_inches="tight", pad_inches=PAD_ZOLL,
+                pil_kwargs={"compress_level": 1})
+    return puffer.getvalue()
+
+
+def _kachel(img, kachel):
+    """
+    Bringt ein Einzelbild auf RGB (Transparenz auf weissem Hintergrund) und verkleinert es
+    seitenverhältnistreu auf die Kachelgrösse. Läuft in den Threads des Dekodierpools.
+    """
+
+    with img:
+        if kachel is not None:
+            img.draft("RGB", kachel)
+            img.thumbnail(kachel, Image.Resampling.LANCZOS)
+
+        if img.mode in ("RGBA", "LA", "P", "PA"):
+            img = img.convert("RGBA")
+            rgb = Image.new("RGB", img.size, WEISS)
+            rgb.paste(img, mask=img.getchannel("A"))
+        else:
+            rgb = img.convert("RGB")
+
+        return np.asarray(rgb)
+
+
+def _groesse(bild):
+    if hasattr(bild, "get_size_inches"):
+        return tuple(int(round(x * bild.dpi)) for x in _figur_zoll(bild))
+    with _oeffnen(bild) as img:
+        return img.size
+## <----------------------------------------------------------------------------------->
+
+
+## <----------------------------------------------------------------------------------->
+## Schreiben des Rasterbildes als PNG in Streifen
+
+class _PngStreifen:
+    """
+    Schreibt ein RGB-PNG zeilenstreifenweise, ohne das Gesamtbild im Speicher zu halten.
+    Die Zeilen werden mit dem Filter "Sub" vorbereitet und fortlaufend komprimiert.
+    """
+
+    def __init__(self, f, breite:int, hoehe:int, kompression:int=6):
+        self.f = f
+        self.breite = breite
+        self.z = zlib.compressobj(kompression)
+        f.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", breite, hoehe, 8, 2, 0, 0, 0))
+
+    def _chunk(self, typ:bytes, daten:bytes):
+        self.f.write(struct.pack(">I", len(daten)))
+        self.f.write(typ)
+        self.f.write(daten)
+        self.f.write(struct.pack(">I", zlib.crc32(daten, zlib.crc32(typ)) & 0xFFFFFFFF))
+
+    def schreiben(self, streifen:np.ndarray):
+        zeilen = streifen.reshape(streifen.shape[0], -1)
+        roh = np.empty((zeilen.shape[0], zeilen.shape[1] + 1), dtype=np.uint8)
+        roh[:, 0] = 1                                   # Filter "Sub"
+        roh[:, 1:4] = zeilen[:, :3]
+        np.subtract(zeilen[:, 3:], zeilen[:, :-3], out=roh[:, 4:])
+
+        daten = self.z.compress(roh.tobytes())
+        if daten:
+            self._chunk(b"IDAT", daten)
+
+    def schliessen(self):
+        self._chunk(b"IDAT", self.z.flush())
+        self._chunk(b"IEND", b"")
+## <----------------------------------------------------------------------------------->
+
+
+def bildraster(bilder,
+               output_path,
+               cols:int=4,
+               kachel:tuple=None,
+               abstand:int=0,
+               anzahl:int=None,
+               n_threads:int=None):
+    """
+    Setzt mehrere Bilder zu einem Rasterbild zusammen (uint8-Puffer, ohne Matplotlib-Figur).
+
+    Die Einzelbilder werden zeilenweise in einem Threadpool dekodiert und auf die Kachelgrösse
+    verkleinert; es sind höchstens zwei Bildzeilen gleichzeitig im Speicher. PNG-Dateien werden
+    streifenweise geschrieben, sodass der Speicherbedarf unabhängig von der Anzahl Visuren bleibt.
+    Andere Dateiformate werden über PIL als Gesamtbild gespeichert.
+
+    Parameter:
+    ----------
+    bilder : iterable
+        Einzelbilder als Dateipfade, Bytes (z.B. `renderer().als_bytes(...)`), Dateiobjekte,
+        uint8/float-Arrays, PIL-Bilder oder Matplotlib-Figuren. Figuren werden wie beim Speichern
+        mit `bbox_inches="tight"` gerastert (inkl. Tabellen unter den Achsen), bevor das nächste
+        Element angefordert wird (Generatoren, die eine Figur wiederverwenden, sind daher möglich).
+    output_path : str or pathlib.Path
+        Zieldatei des Rasterbildes.
+    cols : int, optional (Standard: 4)
+        Anzahl Spalten.
+    kachel : tuple, optional (Standard: None)
+        Grösse einer Kachel (Breite, Höhe) in Pixel; die Bilder werden seitenverhältnistreu
+        eingepasst. None verwendet die native Auflösung (grösstes Einzelbild).
+    abstand : int, optional (Standard: 0)
+        Abstand zwischen den Kacheln in Pixel.
+    anzahl : int, optional (Standard: None)
+        Anzahl Bilder, falls `bilder` keine Länge hat (z.B. Generator).
+    n_threads : int, optional (Standard: None)
+        Anzahl Threads zum Dekodieren; None verwendet die Vorgabe von ThreadPoolExecutor.
+
+    Rückgabe:
+    ---------
+    pathlib.Path or None
+        Pfad des Rasterbildes, None wenn keine Bilder übergeben wurden.
+    """
+
+    ## <----------------------------------------------------------------------------------->
+    ## Grösse des Rasters bestimmen
+    if kachel is None:
+        if not hasattr(bilder, "__len__"):
+            raise ValueError("Ohne Kachelgrösse muss `bilder` eine Liste sein (keine Generatoren).")
+        bilder = list(bilder)
+        groessen = [_groesse(b) for b in bilder]
+        if groessen:
+            kachel = (max(g[0] for g in groessen), max(g[1] for g in groessen))
+        nativ = True
+    else:
+        kachel = (int(kachel[0]), int(kachel[1]))
+        nativ = False
+
+    n = len(bilder) if anzahl is None else anzahl
+    if n == 0:
+        return None
+
+    spalten = min(n, cols)
+    zeilen = (n + cols - 1) // cols
+    breite = spalten * kachel[0] + (spalten - 1) * abstand
+    hoehe = zeilen * kachel[1] + (zeilen - 1) * abstand
+    ## <----------------------------------------------------------------------------------->
+
+    output_path = Path(output_path)
+    png = output_path.suffix.lower() == ".png"
+    gesamt = None if png else np.full((hoehe, breite, 3), 255, dtype=np.uint8)
+
+    with ThreadPoolExecutor(max_workers=n_threads) as pool, open(output_path, "wb") if png else BytesIO() as f:
+        schreiber = _PngStreifen(f, breite, hoehe) if png else None
+
+        ## Dekodieren mit begrenztem Vorlauf (höchstens zwei Bildzeilen)
+        quelle = iter(bilder)
+        offen = deque()
+
+        def nachladen():
+            while len(offen) < 2 * cols:
+                try:
+                    bild = next(quelle)
+                except StopIteration:
+                    return
+                if hasattr(bild, "canvas"):
+                    bild = _figur_rastern(bild, None if nativ else kachel)
+                offen.append(pool.submit(_kachel, _oeffnen(bild), None if nativ else kachel))
+
+        for zeile in range(zeilen):
+            nachladen()
+            streifen = np.full((kachel[1], breite, 3), 255, dtype=np.uint8)
+
+            for spalte in range(min(cols, n - zeile * cols)):
+                img = offen.popleft().result()
+                h, w = img.shape[:2]
+
+                ## Bild in der Kachel zentrieren (wie imshow mit gleichem Seitenverhältnis)
+                y0 = (kachel[1] - h) // 2
+                x0 = spalte * (kachel[0] + abstand) + (kachel[0] - w) // 2
+                streifen[y0:y0 + h, x0:x0 + w] = img
+
+            if png:
+                schreiber.schreiben(streifen)
+                if abstand and zeile < zeilen - 1:
+                    schreiber.schreiben(np.full((abstand, breite, 3), 255, dtype=np.uint8))
+            else:
+                y = zeile * (kachel[1] + abstand)
+                gesamt[y:y + kachel[1]] = streifen
+
+        if png:
+            schreiber.schliessen()
+
+    if not png:
+        Image.fromarray(gesamt).save(output_path)
+
+    return output_path
@@ -0,0 +1,146 @@
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from utils.imports import IMPORT_VERSION
+
+## Parquet benötigt pyarrow, ohne pyarrow wird auf pickle ausgewichen
+_PARQUET = importlib.util.find_spec("pyarrow") is not None
+_ENDUNG = ".parquet" if _PARQUET else ".pkl"
+
+## Standardordner neben den Quelldateien und maximale Grösse des Caches
+CACHE_ORDNER = ".thb_cache"
+CACHE_MAX_BYTES = 512 * 1024**2
+
+
+def cache_key(file_path:str, importer):
+    """
+    Bildet den Cache-Schlüssel einer Quelldatei aus Pfad, Grösse, Änderungszeit und Importer-Version.
+
+    Parameters
+    ----------
+    file_path : str
+        Pfad zur Quelldatei.
+    importer : callable
+        Importfunktion, z.B. `import_csv_fast` oder `import_fix`.
+
+    Returns
+    -------
+    str
+        SHA1-Hash als Hex-String.
+    """
+
+    stat = os.stat(file_path)
+    name = f"{importer.__module__}.{importer.__qualname__}"
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{name}|{IMPORT_VERSION}"
+
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def cached_import(file_path:str,
+                  importer,
+                  cache_dir:str=None,
+                  max_bytes:int=CACHE_MAX_BYTES,
+                  strikt:bool=False):
+    """
+    Importiert eine Datei über `importer` und speichert das bereinigte DataFrame spaltenorientiert zwischen.
+
+    Bei einem Treffer wird die Quelldatei nicht mehr geparst, sondern das DataFrame direkt aus dem
+    Cache gelesen (Parquet, ohne pyarrow pickle). Ändert sich die Quelldatei (Grösse, Änderungszeit)
+    oder die Importer-Version (`IMPORT_VERSION`), entsteht ein neuer Schlüssel. Übersteigt der Cache
+    `max_bytes`, werden die am längsten nicht verwendeten Einträge gelöscht (LRU).
+
+    Parameters
+    ----------
+    file_path : str
+        Pfad zur Quelldatei.
+    importer : callable
+        Importfunktion, die ein DataFrame oder None zurückgibt.
+    cache_dir : str, optional
+        Cache-Ordner. Standard ist der Ordner ".thb_cache" neben der Quelldatei.
+    max_bytes : int, optional
+        Maximale Grösse des Cache-Ordners in Bytes.
+    strikt : bool, optional
+        `importer` mit `strikt=True` aufrufen, sodass Importfehler weitergereicht werden statt
+        ausgegeben und als None zurückgegeben (siehe `import_csv`).
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        Ergebnis von `importer`; None wird nicht zwischengespeichert.
+    """
+
+    if cache_dir is None:
+        cache_dir = Path(file_path).parent / CACHE_ORDNER
+    cache_dir = Path(cache_dir)
+
+    cache_file = cache_dir / (cache_key(file_path, importer) + _ENDUNG)
+
+    ## Treffer: Zeitstempel aktualisieren (für LRU) und einlesen
+    if cache_file.exists():
+        try:
+            df = _lesen(cache_file)
+            os.utime(cache_file)
+            return df
+        except Exception as e:
+            print(f"Warnung: Cache-Eintrag {cache_file.name} unlesbar, wird neu erstellt: {e}")
+
+    df = importer(file_path, strikt=True) if strikt else importer(file_path)
+    if df is None:
+        return None
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        ## Zuerst in eine temporäre Datei schreiben, damit parallele Läufe keine halben Dateien lesen
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        _schreiben(df, tmp_file)
+        os.replace(tmp_file, cache_file)
+
+        cache_aufraeumen(cache_dir, max_bytes)
+
+    except Exception as e:
+        print(f"Warnung: Cache konnte nicht geschrieben werden: {e}")
+
+    return df
+
+
+def cache_aufraeumen(cache_dir:str, max_bytes:int=CACHE_MAX_BYTES):
+    """
+    Löscht die am längsten nicht verwendeten Cache-Einträge, bis der Ordner höchstens `max_bytes` gross ist.
+    """
+
+    eintraege = []
+    for f in Path(cache_dir).glob("*" + _ENDUNG):
+        try:
+            stat = f.stat()
+            eintraege.append((stat.st_mtime_ns, stat.st_size, f))
+        except FileNotFoundError:
+            continue
+
+    total = sum(size for _, size, _ in eintraege)
+
+    for _, size, f in sorted(eintraege):
+        if total <= max_bytes:
+            break
+        try:
+            f.unlink()
+            total -= size
+        except FileNotFoundError:
+            continue
+
+
+def _schreiben(df, path:Path):
+    if _PARQUET:
+        df.to_parquet(path, engine="pyarrow")
+    else:
+        df.to_pickle(path)
+
+
+def _lesen(path:Path):
+    if _PARQUET:
+        return pd.read_parquet(path, engine="pyarrow")
+    return pd.read_pickle(path)
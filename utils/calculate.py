@@ -1,6 +1,17 @@
 import numpy as np
 import pandas as pd
 
+from utils.fixpunkte import als_register
+from utils.imports import messzeitpunkte
+from utils.laufzeit import Stoppuhr
+from utils.ausreisser import KEINE, ausreisser_markieren
+from utils.statistik import GROESSEN, KENNWERTE, VERWORFEN, Statistik, gruppen_statistik, lagen_spalten, visur_statistik
+from utils.unsicherheit import JACOBI, Genauigkeiten, eingaben_aus_messungen, praeanalyse
+
+## Version der Berechnung; bei Änderungen an den Ergebnissen von master_thb/master_thb_batch erhöhen
+## (macht die Zwischenergebnisse der inkrementellen Auswertung ungültig)
+BERECHNUNG_VERSION = 1
+
 ## << ----------------------------------------------------------------------------------- >>
 ## << ----------------------------------------------------------------------------------- >>
 
@@ -58,14 +69,18 @@ def master_thb(df100,
                signal_A:float, 
                signal_B:float, 
                offset_A:float, 
-               offset_B:float):
+               offset_B:float,
+               methode:str=JACOBI,
+               genauigkeiten:Genauigkeiten=None,
+               ausreisser:str=KEINE):
     """
     Führt die vollständige trigonometrische Höhenbestimmung zwischen zwei Punkten durch.
 
     Die Funktion verarbeitet zwei Messdatensätze (df100, df200) sowie Näherungskoordinaten (df_aprox),
     korrigiert Lotabweichungen und Kippachse, berechnet mittlere Schrägdistanz, Höhendifferenz
     und Refraktionskoeffizient und erstellt ein bereinigtes DataFrame mit den Ergebnissen.
-    Zusätzlich werden Präanalysekomponenten für eine Genauigkeitsschätzung ermittelt.
+    Zusätzlich wird die Genauigkeit der Höhendifferenz aus den a-priori-Genauigkeiten der Messungen
+    geschätzt (Präanalyse, siehe `utils.unsicherheit`).
 
     Verarbeitungsschritte:
     ---------------------
@@ -78,7 +93,8 @@ def master_thb(df100,
     7. Berechnung der Höhendifferenz zwischen den Punkten.
     8. Berechnung der Refraktionskoeffizienten.
     9. Rundung, Spaltenbereinigung und Umbenennung für die Ausgabe.
-    10. Berechnung von Präanalysekomponenten zur Genauigkeitsschätzung.
+    10. Markieren der Ausreisser, die in den Kennwerten nicht berücksichtigt werden.
+    11. Fortpflanzung der a-priori-Genauigkeiten (Präanalyse) mit den mittleren Messwerten pro Richtung.
 
     Parameter:
     ----------
@@ -86,7 +102,7 @@ def master_thb(df100,
         Messdatensatz der ersten Messreihe (Spalten u.a. 'Standpkt', 'Zielpkt', 'V-Winkel', 'Ds', 'Lage').
     df200 : pandas.DataFrame
         Messdatensatz der zweiten Messreihe.
-    df_aprox : pandas.DataFrame
+    df_aprox : pandas.DataFrame or FixpunktRegister
         Näherungskoordinaten der Messpunkte (Spalten 'PktNr', 'Xi', 'Eta', 'Hoehe').
     signal_A : float
         Signalhöhe an Station A [m].
@@ -96,6 +112,13 @@ def master_thb(df100,
         Instrumentenoffset an Station A [m].
     offset_B : float
         Instrumentenoffset an Station B [m].
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung für die Präanalyse: "jacobi" (linear) oder "montecarlo".
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten der Eingangsgrössen; None verwendet die Standardwerte.
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung: "iqr", "grubbs", "robust_z" oder "keine"
+        (siehe `utils.ausreisser.ausreisser_markieren`).
 
     Rückgabe:
     ---------
@@ -103,9 +126,11 @@ def master_thb(df100,
         Bereinigtes DataFrame mit den Spalten:
         ['ID Visur', 'ID Messung', 'Lage', "d' (schräg) A-->B [m]", "d' (schräg) B-->A [m]",
          "d' (mittel, schräg) [m]", 'V-Winkel A-->B [gon]', 'V-Winkel B-->A [gon]',
-         'Höhendiff. [m]', 'Refraktionskoeff. k'].
+         'Höhendiff. [m]', 'Refraktionskoeff. k', 'Zeitpunkt', 'Verworfen'].
+        'Zeitpunkt' ist der Messzeitpunkt A-->B (siehe `messzeitpunkte`).
     infos_vis : list
-        [Startpunkt, Endpunkt, Genauigkeit Präanalyse, Präanalyse-Komponenten [d_komp, z_komp, k_komp, i_komp, s_komp]]
+        [Startpunkt, Endpunkt, Genauigkeit Präanalyse, Präanalyse-Komponenten [d_komp, z_komp, k_komp, i_komp, s_komp, l_komp]]
+        (alle in mm, l_komp: Lotabweichung).
     infos_height : list
         Statistische Kennwerte der Höhendifferenz: [delta_h_aprox, mean_delta_h, std_delta_h,
         mean_delta_h_lage1, std_delta_h_lage1, mean_delta_h_lage2, std_delta_h_lage2].
@@ -120,21 +145,24 @@ def master_thb(df100,
 
     ### Filtern der Messdaten
     ## <-----------------------------------------------------------------------------------> 
+    uhr = Stoppuhr()
+    fix = als_register(df_aprox)
+
     ## Filtern des Start und Endpunktes aus den ersten Messdaten
     start100 = df100["Standpkt"].values[0]
     end100 = df100["Zielpkt"].values[0]
-    df100_start = df_aprox[df_aprox["PktNr"] == start100]
-    df100_target = df_aprox[(df_aprox["PktNr"] == end100)]
 
     ## Filtern des Start und Endpunktes aus den zweiten Messdaten
     start200 = df200["Standpkt"].values[0]
     end200 = df200["Zielpkt"].values[0]
-    df200_start = df_aprox[(df_aprox["PktNr"] == start200)]
-    df200_target = df_aprox[(df_aprox["PktNr"] == end200)]
+
+    ## Positionen im Fixpunktregister (ein Hash-Lookup für alle vier Punkte)
+    i100_start, i100_target, i200_start, i200_target = fix.index([start100, end100, start200, end200])
 
     ## Bestimmung des Azimutes für die jeweiligen Messfiles
-    azi100 = azi_aprox(df100_start, df100_target)
-    azi200 = azi_aprox(df200_start, df200_target)
+    azi100 = azimut(fix.E[i100_start], fix.N[i100_start], fix.E[i100_target], fix.N[i100_target])
+    azi200 = azimut(fix.E[i200_start], fix.N[i200_start], fix.E[i200_target], fix.N[i200_target])
+    uhr.runde("zuordnung", len(df100) + len(df200))
     ## <-----------------------------------------------------------------------------------> 
 
 
@@ -148,14 +176,26 @@ def master_thb(df100,
     ### Korrektur der Lotabweichung
     ## <----------------------------------------------------------------------------------->
     ## Auswahl der Lotkorekturen aus den Näherungskoordinaten
-    xi_100 = df100_start["Xi"].values[0]
-    eta_100 = df100_start["Eta"].values[0]
+    xi_100 = fix.Xi[i100_start]
+    eta_100 = fix.Eta[i100_start]
 
-    xi_200 = df200_start["Xi"].values[0]
-    eta_200 = df200_start["Eta"].values[0]
+    xi_200 = fix.Xi[i200_start]
+    eta_200 = fix.Eta[i200_start]
 
     df100["V-Winkel_korr"] = korr_lotabw(xi_100, eta_100, azi100, df100["V-Winkel"].values)
     df200["V-Winkel_korr"] = korr_lotabw(xi_200, eta_200, azi200, df200["V-Winkel"].values)
+    uhr.runde("lotabweichung", len(df100) + len(df200))
+
+    ## Nominelle Eingangsgrössen der Präanalyse (Mittel pro Richtung, vor der Kippachskorrektur)
+    visuren, eingaben = eingaben_aus_messungen(
+        "Visur", np.repeat([True, False], [len(df100), len(df200)]),
+        np.concatenate([df100["Ds"].values, df200["Ds"].values]),
+        np.concatenate([df100["V-Winkel"].values, df200["V-Winkel"].values]),
+        np.repeat([xi_100, xi_200], [len(df100), len(df200)]),
+        np.repeat([eta_100, eta_200], [len(df100), len(df200)]),
+        np.repeat([azi100, azi200], [len(df100), len(df200)]),
+        pd.DataFrame({"ID": ["Visur"], "signal_A": [signal_A], "offset_A": [offset_A],
+                      "signal_B": [signal_B], "offset_B": [offset_B]}))
     ## <----------------------------------------------------------------------------------->
 
 
@@ -164,11 +204,15 @@ def master_thb(df100,
     df100["Ds_Korrigiert"] , df100["V-Winkel_Korrigiert"] = korr_kippachse(df100["Ds"].values, offset_B, df100["V-Winkel_korr"].values)
     df200["Ds_Korrigiert"] , df200["V-Winkel_Korrigiert"] = korr_kippachse(df200["Ds"].values, offset_A, df200["V-Winkel_korr"].values)
 
+    df100["Zeitpunkt"] = messzeitpunkte(df100)
+    df200["Zeitpunkt"] = messzeitpunkte(df200)
+
     col2drop = ["Datum", "Uhrzeit", "Standpkt", "Zielpkt", 
                 "V-Winkel", "V-Winkel_korr", "Ds", "Hz-Winkel"]
 
     df100 = df100.drop(col2drop, axis=1, errors="ignore")
     df200 = df200.drop(col2drop, axis=1, errors="ignore")
+    uhr.runde("kippachse", len(df100) + len(df200))
     ## <----------------------------------------------------------------------------------->
 
 
@@ -176,11 +220,13 @@ def master_thb(df100,
     ## <----------------------------------------------------------------------------------->
     df100 = df100.rename(columns={"Ds_Korrigiert" : "Ds-A2B",
                                   "V-Winkel_Korrigiert" : "V-Winkel-A2B",
-                                  "Lage" : "Lage-A2B"})
+                                  "Lage" : "Lage-A2B",
+                                  "Zeitpunkt" : "Zeitpunkt-A2B"})
     
     df200 = df200.rename(columns={"Ds_Korrigiert" : "Ds-B2A",
                                   "V-Winkel_Korrigiert" : "V-Winkel-B2A",
-                                  "Lage" : "Lage-B2A"})
+                                  "Lage" : "Lage-B2A",
+                                  "Zeitpunkt" : "Zeitpunkt-B2A"})
 
     df300 = pd.merge(df100, df200, on="ID", how="outer")
 
@@ -190,7 +236,10 @@ def master_thb(df100,
                              df300["Lage-A2B"],
                              "FEHLER")
 
-    df300 = df300.loc[:, ["ID", "Lage", "Ds-A2B", "Ds-B2A", "Ds-Mittel", "V-Winkel-A2B", "V-Winkel-B2A"]]
+    df300["Zeitpunkt"] = df300["Zeitpunkt-A2B"].fillna(df300["Zeitpunkt-B2A"])
+
+    df300 = df300.loc[:, ["ID", "Lage", "Ds-A2B", "Ds-B2A", "Ds-Mittel", "V-Winkel-A2B", "V-Winkel-B2A", "Zeitpunkt"]]
+    uhr.runde("zusammenfuehren", len(df300))
     ## <----------------------------------------------------------------------------------->
 
 
@@ -215,22 +264,15 @@ def master_thb(df100,
     df300["k"] = refraktion(df300["Ds-Mittel"].values,
                             df300["V-Winkel-A2B"].values,
                             df300["V-Winkel-B2A"].values)
+    uhr.runde("hoehe_refraktion", len(df300))
     ## <----------------------------------------------------------------------------------->
 
 
     ### Vorbereiten des df für die Ausgabe
     ## <----------------------------------------------------------------------------------->
 
-    # Werte für Präanalyse / vor Spaltenlöschung
-    dist_h_m = df300["Ds-A2B"].values[0] * np.sin(df300["V-Winkel-A2B"].values[0] * rho())
-    dist_s_mm = df300["Ds-A2B"].values[0] * 1000
-
-    d_komp = np.cos(df300["V-Winkel-A2B"].values[0] * rho()) * (0.6 + (dist_s_mm/1000000))
-    z_komp = (np.sin(df300["V-Winkel-A2B"].values[0] * rho()) * dist_s_mm) * (0.15/1000)/200*np.pi
-    ## k-komponente kann bei gleichzeitig gegenseiteger Messung vernachlässigt werden
-    k_komp = (-1 * ( (dist_h_m)**2 / (2 * 6_370_000) ) * 0.06 ) * 1000
-    i_komp = 1
-    s_komp = 1
+    # Präanalyse (k-Komponente wird bei gleichzeitig gegenseitiger Messung vernachlässigt)
+    df_prae = praeanalyse(visuren, eingaben, methode, genauigkeiten)
 
 
     # col2drop = ["V-Winkel-A2B", "V-Winkel-B2A"]
@@ -260,45 +302,21 @@ def master_thb(df100,
                           "V-Winkel A-->B [gon]", 
                           "V-Winkel B-->A [gon]",
                           "Höhendiff. [m]",
-                          "Refraktionskoeff. k"]]
+                          "Refraktionskoeff. k",
+                          "Zeitpunkt"]]
 
     ## Statistiken
     pktNr_A = start100
     pktNr_B = end100
-    delta_h_aprox = round(np.abs(df100_target["Hoehe"].values[0] - df100_start["Hoehe"].values[0]),2)
-
-    mean_delta_h = round(df300["Höhendiff. [m]"].mean(), 4)
-    std_delta_h = round(df300["Höhendiff. [m]"].std(), 4)
-
-    df400 = df300[df300["Lage"] == "1"]
-    df500 = df300[df300["Lage"] == "2"]
-
-    mean_delta_h_lage1 = round(df400["Höhendiff. [m]"].mean(), 4)
-    std_delta_h_lage1 = round(df400["Höhendiff. [m]"].std(), 4)
+    delta_h_aprox = round(np.abs(fix.H[i100_target] - fix.H[i100_start]),2)
 
-    mean_delta_h_lage2 = round(df500["Höhendiff. [m]"].mean(), 4)
-    std_delta_h_lage2 = round(df500["Höhendiff. [m]"].std(), 4)
+    ## Ausreisser markieren; alle Kennwerte (gesamt, Lage 1, Lage 2) ohne die verworfenen Messungen
+    ## in einem gruppierten Durchgang, siehe utils.statistik
+    df300[VERWORFEN] = ausreisser_markieren(df300, ausreisser)
+    statistik = visur_statistik(df300, dH_naeherung=float(delta_h_aprox))
 
-    mean_k = round(df300["Refraktionskoeff. k"].mean(), 2)
-    std_k = round(df300["Refraktionskoeff. k"].std(), 2)
-
-    mean_k_lage1 = round(df400["Refraktionskoeff. k"].mean(), 2)
-    std_k_lage1 = round(df400["Refraktionskoeff. k"].std(), 2)
-
-    mean_k_lage2 = round(df500["Refraktionskoeff. k"].mean(), 2)
-    std_k_lage2 = round(df500["Refraktionskoeff. k"].std(), 2)
-
-    mean_sd = round(df300["d' (mittel, schräg) [m]"].mean(), 4)
-    std_sd = round(df300["d' (mittel, schräg) [m]"].std(), 4)
-
-    mean_sd_lage1 = round(df400["d' (mittel, schräg) [m]"].mean(), 4)
-    std_sd_lage1 = round(df400["d' (mittel, schräg) [m]"].std(), 4)
-
-    mean_sd_lage2 = round(df500["d' (mittel, schräg) [m]"].mean(), 4)
-    std_sd_lage2 = round(df500["d' (mittel, schräg) [m]"].std(), 4)
-
-    praeanalyse = round(np.sqrt(d_komp**2 + z_komp**2 + i_komp**2 + s_komp**2) / np.sqrt(2), 2)
-    praeanalyse_komp = [d_komp, z_komp, k_komp, i_komp, s_komp]
+    genauigkeit = float(df_prae["Praeanalyse"].iloc[0])
+    praeanalyse_komp = df_prae.iloc[0].drop("Praeanalyse").tolist()
 
     ## Letzte kontrolle des df
     visur = f"Visur_{start100}-{end100}"
@@ -314,37 +332,21 @@ def master_thb(df100,
                           "V-Winkel A-->B [gon]", 
                           "V-Winkel B-->A [gon]",
                           "Höhendiff. [m]",
-                          "Refraktionskoeff. k"]]
+                          "Refraktionskoeff. k",
+                          "Zeitpunkt",
+                          VERWORFEN]]
 
     ## Ausgabe
     infos_vis = [pktNr_A, 
                  pktNr_B,
-                 float(praeanalyse), 
+                 genauigkeit, 
                  praeanalyse_komp]
                  
-    infos_height = [float(delta_h_aprox),
-                   float(mean_delta_h), 
-                   float(std_delta_h), 
-                   float(mean_delta_h_lage1),
-                   float(std_delta_h_lage1),
-                   float(mean_delta_h_lage2),
-                   float(std_delta_h_lage2)]
-
-    infos_k = [float(mean_k), 
-               float(std_k),
-               float(mean_k_lage1),
-               float(std_k_lage1),
-               float(mean_k_lage2),
-               float(std_k_lage2)]
-
-    infos_sd = [float(mean_sd), 
-                float(std_sd),
-                float(mean_sd_lage1),
-                float(std_sd_lage1),
-                float(mean_sd_lage2),
-                float(std_sd_lage2)]
-
+    infos_height = statistik.infos_height
+    infos_k = statistik.infos_k
+    infos_sd = statistik.infos_sd
 
+    uhr.runde("statistik", len(df300))
     ## <----------------------------------------------------------------------------------->
 
     return df300, infos_vis, infos_height, infos_k, infos_sd
@@ -353,6 +355,280 @@ def master_thb(df100,
 ## << ----------------------------------------------------------------------------------- >>
 
 
+## Batchfunktion THB (alle Visuren einer Kampagne)
+def visuren_stapeln(visuren:dict):
+    """
+    Fasst die Messdaten mehrerer Visuren zu einer langen Tabelle für `master_thb_batch` zusammen.
+
+    Parameters
+    ----------
+    visuren : dict
+        Zuordnung {ID Visur: (df100, df200)} mit den importierten Messdaten (siehe `import_csv`)
+        der Messung A-->B (df100) und B-->A (df200).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Alle Messungen untereinander, ergänzt um die Spalten "ID Visur" und "Richtung" ("A2B" / "B2A").
+    """
+
+    frames = []
+    for visur, (df100, df200) in visuren.items():
+        frames.append(df100.assign(**{"ID Visur": visur, "Richtung": "A2B"}))
+        frames.append(df200.assign(**{"ID Visur": visur, "Richtung": "B2A"}))
+
+    return pd.concat(frames, ignore_index=True)
+
+## <----------------------------------------------------------------------------------->
+
+def master_thb_batch(df_mess,
+                     df_aprox,
+                     df_param,
+                     methode:str=JACOBI,
+                     genauigkeiten:Genauigkeiten=None,
+                     ausreisser:str=KEINE):
+    """
+    Führt die trigonometrische Höhenbestimmung für alle Visuren einer Kampagne in einem Durchgang durch.
+
+    Die Funktion entspricht fachlich `master_thb`, verarbeitet aber sämtliche Visuren als eine lange
+    Tabelle. Lotabweichung, Kippachse, Höhendifferenz und Refraktion werden je in einem einzigen
+    NumPy-Aufruf über alle Messungen gerechnet, die Statistiken pro Visur und Lage entstehen aus
+    einer einzigen gruppierten Reduktion.
+
+    Parameters
+    ----------
+    df_mess : pandas.DataFrame
+        Messdaten aller Visuren (siehe `visuren_stapeln`) mit den Spalten 'ID Visur', 'Richtung',
+        'Standpkt', 'Zielpkt', 'Lage', 'ID', 'V-Winkel' und 'Ds'.
+    df_aprox : pandas.DataFrame or FixpunktRegister
+        Näherungskoordinaten der Messpunkte (siehe `import_fix`).
+    df_param : pandas.DataFrame
+        Instrumentenparameter pro Visur mit den Spalten 'ID', 'signal_A', 'offset_A',
+        'signal_B' und 'offset_B' (Aufbau der InstrHoehe-Datei).
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung der a-priori-Genauigkeiten für die Präanalyse, "jacobi" oder "montecarlo"
+        (siehe `utils.unsicherheit.praeanalyse`).
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten der Eingangsgrössen; None verwendet die Standardwerte.
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung pro Visur ("iqr", "grubbs", "robust_z" oder "keine"),
+        in einem Durchgang über alle Visuren (siehe `utils.ausreisser.ausreisser_markieren`).
+
+    Returns
+    -------
+    df300 : pandas.DataFrame
+        Ergebnisse aller Visuren mit denselben Spalten wie bei `master_thb`, sortiert nach
+        'ID Visur' und 'ID Messung'. Die Spalte 'ID Visur' enthält den Schlüssel aus `df_mess`,
+        die Spalte 'Verworfen' markiert die Ausreisser, 'Zeitpunkt' enthält den Messzeitpunkt.
+    df_stats : pandas.DataFrame
+        Eine Zeile pro Visur (Index 'ID Visur') mit Start-/Endpunkt, Präanalyse und den
+        statistischen Kennwerten (ohne Ausreisser; deren Anzahl steht in 'Verworfen').
+        Mit `infos_visur` lassen sich daraus die Listen infos_vis, infos_height, infos_k und
+        infos_sd von `master_thb` erzeugen.
+    """
+
+
+    ### Zuordnung der Parameter und Näherungskoordinaten pro Messung
+    ## <----------------------------------------------------------------------------------->
+    uhr = Stoppuhr()
+    df = df_mess.reset_index(drop=True)
+    visur = df["ID Visur"].to_numpy()
+    a2b = (df["Richtung"] == "A2B").to_numpy()
+
+    param = df_param.set_index("ID").reindex(visur)
+    signal_A = param["signal_A"].to_numpy(dtype=float)
+    offset_A = param["offset_A"].to_numpy(dtype=float)
+    signal_B = param["signal_B"].to_numpy(dtype=float)
+    offset_B = param["offset_B"].to_numpy(dtype=float)
+
+    ## Der Prismamount sitzt jeweils auf der Zielstation
+    offset_ziel = np.where(a2b, offset_B, offset_A)
+
+    ## Bulk-Lookup im Fixpunktregister (unbekannte Punkte ergeben NaN)
+    fix = als_register(df_aprox)
+    i_start = fix.index(df["Standpkt"].to_numpy(), strikt=False)
+    i_target = fix.index(df["Zielpkt"].to_numpy(), strikt=False)
+    start = np.where((i_start >= 0)[:, None], fix.daten[i_start], np.nan)
+    target = np.where((i_target >= 0)[:, None], fix.daten[i_target], np.nan)
+
+    azi = azimut(start[:, 0], start[:, 1], target[:, 0], target[:, 1])
+    uhr.runde("zuordnung", len(df))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Korrekturen (2-lagige Messung, Lotabweichung, Kippachse)
+    ## <----------------------------------------------------------------------------------->
+    v_winkel = df["V-Winkel"].to_numpy(dtype=float)
+    v_winkel = np.where(df["Lage"].to_numpy() == "2", 400 - v_winkel, v_winkel)
+
+    ## Nominelle Eingangsgrössen der Präanalyse (Mittel pro Visur und Richtung, vor den Korrekturen)
+    visuren, eingaben = eingaben_aus_messungen(visur, a2b, df["Ds"].to_numpy(dtype=float), v_winkel,
+                                               start[:, 4], start[:, 5], azi, df_param)
+
+    v_winkel = korr_lotabw(start[:, 4], start[:, 5], azi, v_winkel)
+    uhr.runde("lotabweichung", len(df))
+
+    ## Ergebnisarrays einmal alloziert, die Kernfunktionen schreiben mit `out=` hinein
+    ds_korr, v_korr = np.empty(len(df)), np.empty(len(df))
+    korr_kippachse(df["Ds"].to_numpy(dtype=float), offset_ziel, v_winkel, out=(ds_korr, v_korr))
+    uhr.runde("kippachse", len(df))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Zusammenführen der gegenseitigen Messungen
+    ## <----------------------------------------------------------------------------------->
+    df_korr = pd.DataFrame({"ID Visur": visur,
+                            "ID": df["ID"].to_numpy(),
+                            "Lage": df["Lage"].to_numpy(),
+                            "Ds": ds_korr,
+                            "V-Winkel": v_korr,
+                            "Zeitpunkt": messzeitpunkte(df)})
+
+    df300 = pd.merge(df_korr[a2b], df_korr[~a2b], on=["ID Visur", "ID"], how="outer", suffixes=("-A2B", "-B2A"))
+
+    df300["Ds-Mittel"] = 0.5 * (df300["Ds-A2B"] + df300["Ds-B2A"])
+
+    df300["Lage"] = np.where(df300["Lage-A2B"] == df300["Lage-B2A"],
+                             df300["Lage-A2B"],
+                             "FEHLER")
+
+    ## Zeitpunkt der Messung A-->B (bzw. B-->A, falls diese fehlt)
+    df300["Zeitpunkt"] = df300["Zeitpunkt-A2B"].fillna(df300["Zeitpunkt-B2A"])
+    uhr.runde("zusammenfuehren", len(df300))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Höhendifferenz und Refraktion
+    ## <----------------------------------------------------------------------------------->
+    param = df_param.set_index("ID").reindex(df300["ID Visur"].to_numpy())
+    signal_A = param["signal_A"].to_numpy(dtype=float)
+    signal_B = param["signal_B"].to_numpy(dtype=float)
+    instrument_A = signal_A - param["offset_A"].to_numpy(dtype=float)
+    instrument_B = signal_B - param["offset_B"].to_numpy(dtype=float)
+
+    ds_mittel = df300["Ds-Mittel"].to_numpy()
+    v_a2b = df300["V-Winkel-A2B"].to_numpy()
+    v_b2a = df300["V-Winkel-B2A"].to_numpy()
+    hoehe, k = np.empty(len(df300)), np.empty(len(df300))
+
+    delta_h(ds_mittel, v_a2b, v_b2a, instrument_A, instrument_B, signal_A, signal_B, out=hoehe)
+    refraktion(ds_mittel, v_a2b, v_b2a, out=k)
+    df300["delta_H"] = hoehe
+    df300["k"] = k
+    uhr.runde("hoehe_refraktion", len(df300))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Präanalyse (Fortpflanzung der a-priori-Genauigkeiten pro Visur, siehe utils.unsicherheit)
+    ## <----------------------------------------------------------------------------------->
+    reihenfolge = pd.Index(df300["ID Visur"].drop_duplicates(), name="ID Visur")
+    df_stats = praeanalyse(visuren, eingaben, methode, genauigkeiten).reindex(reihenfolge)
+
+    ## Start- und Endpunkt aus der Messung A-->B
+    punkte = df[a2b].drop_duplicates("ID Visur").set_index("ID Visur")
+    df_stats["PktNr A"] = punkte["Standpkt"]
+    df_stats["PktNr B"] = punkte["Zielpkt"]
+
+    df_stats["dH Naeherung"] = np.round(np.abs(fix.werte("Hoehe", df_stats["PktNr B"].to_numpy()) -
+                                               fix.werte("Hoehe", df_stats["PktNr A"].to_numpy())), 2)
+    uhr.runde("praeanalyse", len(df_stats))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Vorbereiten des df für die Ausgabe
+    ## <----------------------------------------------------------------------------------->
+    df300 = df300.round({"Ds-A2B":4,
+                         "Ds-B2A":4,
+                         "Ds-Mittel":4,
+                         "V-Winkel-A2B":5,
+                         "V-Winkel-B2A":5,
+                         "delta_H":4,
+                         "k":2})
+
+    df300 = df300.rename(columns={"ID" : "ID Messung",
+                                  "Ds-A2B" : "d' (schräg) A-->B [m]",
+                                  "Ds-B2A" : "d' (schräg) B-->A [m]",
+                                  "Ds-Mittel" : "d' (mittel, schräg) [m]",
+                                  "V-Winkel-A2B" : "V-Winkel A-->B [gon]",
+                                  "V-Winkel-B2A" : "V-Winkel B-->A [gon]",
+                                  "delta_H" : "Höhendiff. [m]",
+                                  "k" : "Refraktionskoeff. k"})
+
+    df300 = df300.loc[:, ["ID Visur",
+                          "ID Messung",
+                          "Lage",
+                          "d' (schräg) A-->B [m]",
+                          "d' (schräg) B-->A [m]",
+                          "d' (mittel, schräg) [m]",
+                          "V-Winkel A-->B [gon]",
+                          "V-Winkel B-->A [gon]",
+                          "Höhendiff. [m]",
+                          "Refraktionskoeff. k",
+                          "Zeitpunkt"]]
+    uhr.runde("ausgabe", len(df300))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Ausreisser (pro Visur, in einem Durchgang über alle Visuren, siehe utils.ausreisser)
+    ## <----------------------------------------------------------------------------------->
+    df300[VERWORFEN] = ausreisser_markieren(df300, ausreisser)
+    uhr.runde("ausreisser", len(df300))
+    ## <----------------------------------------------------------------------------------->
+
+
+    ### Statistiken (ein gruppierter NumPy-Durchgang über Visur und Visur/Lage, siehe utils.statistik)
+    ## <----------------------------------------------------------------------------------->
+    alle, lagen = gruppen_statistik(df300, ebenen=(["ID Visur"], ["ID Visur", "Lage"]))
+    kennwerte = alle.join(lagen_spalten(lagen, alle.index))
+
+    ## Zuerst die Spalten im bisherigen Aufbau, danach Anzahl und robuste Kennwerte
+    spalten = [f"{name} {kennwert}{lage}" for name in GROESSEN
+               for lage in ["", " L1", " L2"] for kennwert in ["Mittel", "Std"]]
+    spalten += [f"{name} {kennwert}{lage}" for name in GROESSEN
+                for lage in ["", " L1", " L2"] for kennwert in KENNWERTE if kennwert not in ("Mittel", "Std")]
+    df_stats = df_stats.join(kennwerte[spalten])
+    df_stats[VERWORFEN] = df300.groupby("ID Visur", sort=False)[VERWORFEN].sum()
+
+    df300 = df300.reset_index(drop=True)
+    uhr.runde("statistik", len(df300))
+    ## <----------------------------------------------------------------------------------->
+
+    return df300, df_stats
+
+## <----------------------------------------------------------------------------------->
+
+def infos_visur(df_stats, visur:str):
+    """
+    Erzeugt aus der Statistiktabelle von `master_thb_batch` die Informationslisten einer Visur.
+
+    Parameters
+    ----------
+    df_stats : pandas.DataFrame
+        Statistiktabelle aus `master_thb_batch`.
+    visur : str
+        ID der Visur.
+
+    Returns
+    -------
+    tuple of list
+        (infos_vis, infos_height, infos_k, infos_sd) im selben Aufbau wie bei `master_thb`.
+        Die Kennwerte als Datensatz liefert `Statistik.aus_tabelle(df_stats, visur)`.
+    """
+
+    s = df_stats.loc[visur]
+    statistik = Statistik.aus_zeile(visur, s)
+
+    infos_vis = [s["PktNr A"],
+                 s["PktNr B"],
+                 float(s["Praeanalyse"]),
+                 [s["d_komp"], s["z_komp"], s["k_komp"], s["i_komp"], s["s_komp"], s["l_komp"]]]
+
+    return infos_vis, statistik.infos_height, statistik.infos_k, statistik.infos_sd
+
+## << ----------------------------------------------------------------------------------- >>
+## << ----------------------------------------------------------------------------------- >>
+
+
 ## SubFunctions THB
 ## <----------------------------------------------------------------------------------->
 
@@ -408,13 +684,14 @@ def korr_lotabw(xi: float, eta: float, azi: float, v_angle: float):
 
 ## <----------------------------------------------------------------------------------->
 
-def korr_kippachse(dist_ab: float, offset_b: float, v_angle_korr: float):
+def korr_kippachse(dist_ab: float, offset_b: float, v_angle_korr: float, out=None):
     """
     Korrigiert die Distanz und den Vertikalwinkel aufgrund einer Kippachse am Prismamount.
 
     Die Funktion berechnet die korrigierte Distanz `dist_korr` und den
     korrigierten Vertikalwinkel `v_angle_korr_korr`, wenn der Prismahalter
-    eine bestimmte Achse (Kippachse) hat. Dabei wird der Kosinussatz verwendet.
+    eine bestimmte Achse (Kippachse) hat. Das Dreieck aus gemessener Distanz, Offset und
+    korrigierter Distanz wird über die Komponenten des Offsets längs und quer zur Visur gelöst.
 
     Parameters
     ----------
@@ -424,6 +701,9 @@ def korr_kippachse(dist_ab: float, offset_b: float, v_angle_korr: float):
         Versatz des Prismamounts in Richtung der Kippachse (in Meter).
     v_angle_korr : float
         Vertikalwinkel nach vorheriger Lotabweichungskorrektur (in gon).
+    out : tuple of numpy.ndarray, optional
+        Vorallozierte Ergebnisarrays (dist_korr, v_angle_korr_korr) in der Form der Eingaben;
+        sie dürfen sich nicht mit den Eingaben überschneiden.
 
     Returns
     -------
@@ -434,27 +714,34 @@ def korr_kippachse(dist_ab: float, offset_b: float, v_angle_korr: float):
 
     Notes
     -----
-    - Winkel werden intern von gon in Radiant umgerechnet.
-    - Die Korrektur erfolgt über den Kosinussatz und die Berechnung des Winkels Beta.
-    - Das Ergebnis enthält die neue Distanz und den um Beta korrigierten Vertikalwinkel.
+    - Mathematisch gleich wie Kosinussatz und arccos, aber numerisch stabil:
+      dist_korr = hypot(d - o*cos(z), o*sin(z)) und beta = atan2(|o*sin(z)|, d - o*cos(z)).
+      Der arccos eines Verhältnisses nahe 1 verliert bei langen Visuren die Hälfte der Stellen.
+    - Beta wird in gon auf den Vertikalwinkel addiert (keine Hin- und Rückrechnung des Winkels).
+    - Die Rechnung läuft mit `out=` über die Ergebnisarrays und ein einziges Zwischenarray.
     """
 
-    ## Umwandlung der Winkel von gon in rad
-    v_angle_korr = gon2rad(v_angle_korr)
+    dist_korr, v_angle_korr_korr = _puffer(out, 2, dist_ab, offset_b, v_angle_korr)
+    laengs = np.empty_like(dist_korr)
 
-    # Berechnung der korrigierten Distanz aufgrund des speziellen Prismamounts (mit cosinussatz)
-    dist_korr = np.sqrt(offset_b**2 + dist_ab**2 - (2*offset_b*dist_ab) * np.cos(v_angle_korr)) 
+    ## Komponenten des Offsets längs (d - o*cos z) und quer (|o*sin z|) zur gemessenen Distanz
+    np.multiply(v_angle_korr, np.pi / 200, out=v_angle_korr_korr)
+    np.cos(v_angle_korr_korr, out=laengs)
+    np.multiply(laengs, offset_b, out=laengs)
+    np.subtract(dist_ab, laengs, out=laengs)
+    np.sin(v_angle_korr_korr, out=v_angle_korr_korr)
+    np.multiply(v_angle_korr_korr, offset_b, out=v_angle_korr_korr)
+    np.abs(v_angle_korr_korr, out=v_angle_korr_korr)
 
-    # Berechnung des Winkels Beta zwischen der gemessenen Distanz und der Korrekturdistanz
-    beta_ab = np.arccos((dist_ab**2 + dist_korr**2 - offset_b**2) / (2 * dist_ab * dist_korr)) 
+    # Korrigierte Distanz und Winkel Beta zwischen gemessener und korrigierter Distanz
+    np.hypot(laengs, v_angle_korr_korr, out=dist_korr)
+    np.arctan2(v_angle_korr_korr, laengs, out=v_angle_korr_korr)
 
-    # Korrektur des Vertikalwinkels um Beta
-    v_angle_korr_korr = v_angle_korr + beta_ab
-
-    ## Umwandlung Winkel von rad in gon
-    v_angle_korr_korr = rad2gon(v_angle_korr_korr)
+    # Korrektur des Vertikalwinkels um Beta (in gon)
+    np.multiply(v_angle_korr_korr, 200 / np.pi, out=v_angle_korr_korr)
+    np.add(v_angle_korr_korr, v_angle_korr, out=v_angle_korr_korr)
 
-    return [dist_korr, v_angle_korr_korr]
+    return [dist_korr[()], v_angle_korr_korr[()]]
 
 ## <----------------------------------------------------------------------------------->
 
@@ -464,7 +751,8 @@ def delta_h(mittel_dist:float,
             instr_height_a:float, 
             instr_height_b:float, 
             signal_height_a:float, 
-            signal_height_b:float):
+            signal_height_b:float,
+            out=None):
     """
     Berechnet die Höhendifferenz zwischen zwei Punkten aus doppelseitigen Vertikalwinkelmessungen.
 
@@ -488,6 +776,8 @@ def delta_h(mittel_dist:float,
         Signalhöhe am Punkt A (in Meter).
     signal_height_b : float
         Signalhöhe am Punkt B (in Meter).
+    out : numpy.ndarray, optional
+        Vorallozierter Ergebnisarray (darf sich nicht mit den Eingaben überschneiden).
 
     Returns
     -------
@@ -496,29 +786,41 @@ def delta_h(mittel_dist:float,
 
     Notes
     -----
-    - Die Vertikalwinkel werden intern von gon in Radiant umgerechnet.
     - Berechnung erfolgt gemäß der doppelseitigen Höhenbestimmung:
       delta_h = 0.5 * (mittel_dist * (sin(π/2 - v_angle_AB) - sin(π/2 - v_angle_BA))
                         + (instr_height_a - instr_height_b)
                         + (signal_height_a - signal_height_b))
+    - Die Höhenwinkel 100 gon - v werden in gon gebildet (exakte Subtraktion) und erst danach
+      in Radiant umgerechnet.
     - Ergebnis wird als positiver Wert (absolut) zurückgegeben.
     """
 
+    dh = _puffer(out, 1, mittel_dist, v_angle_korr_korr_ab, v_angle_korr_korr_ba)[0]
+    hilf = np.empty_like(dh)
 
-    ## Umwandlung der Winkel von gon in rad
-    v_angle_korr_korr_ab = gon2rad(v_angle_korr_korr_ab)
-    v_angle_korr_korr_ba = gon2rad(v_angle_korr_korr_ba)
+    # sin(Höhenwinkel A-->B) - sin(Höhenwinkel B-->A)
+    np.subtract(100, v_angle_korr_korr_ab, out=dh)
+    np.multiply(dh, np.pi / 200, out=dh)
+    np.sin(dh, out=dh)
+    np.subtract(100, v_angle_korr_korr_ba, out=hilf)
+    np.multiply(hilf, np.pi / 200, out=hilf)
+    np.sin(hilf, out=hilf)
+    np.subtract(dh, hilf, out=dh)
 
     # Berechnung der Höhendifferenz
-    delta_h = 0.5 * (mittel_dist * ( np.sin((np.pi/2)-v_angle_korr_korr_ab) - np.sin((np.pi/2)-v_angle_korr_korr_ba)) + (instr_height_a-instr_height_b) + (signal_height_a-signal_height_b))
+    np.multiply(dh, mittel_dist, out=dh)
+    np.add(dh, (instr_height_a-instr_height_b) + (signal_height_a-signal_height_b), out=dh)
+    np.multiply(dh, 0.5, out=dh)
+    np.abs(dh, out=dh)
 
-    return np.abs(delta_h)
+    return dh[()]
 
 ## <----------------------------------------------------------------------------------->
 
 def refraktion(mittel_dist:float, 
                v_angle_korr_korr_ab:float, 
-               v_angle_korr_korr_ba:float):
+               v_angle_korr_korr_ba:float,
+               out=None):
     """
     Berechnet den Refraktionskoeffizienten zwischen zwei Punkten auf Basis doppelseitiger Vertikalwinkelmessungen.
 
@@ -530,12 +832,12 @@ def refraktion(mittel_dist:float,
     ----------
     mittel_dist : float
         Mittlere Schrägdistanz zwischen den Punkten A und B (in Meter).
-    delta_h : float
-        Gemessene Höhendifferenz zwischen Punkt A und B (in Meter).
     v_angle_korr_korr_ab : float
         Vertikalwinkel von A nach B, bereits um Lotabweichung und Kippachse korrigiert (in gon).
     v_angle_korr_korr_ba : float
         Vertikalwinkel von B nach A, bereits um Lotabweichung und Kippachse korrigiert (in gon).
+    out : numpy.ndarray, optional
+        Vorallozierter Ergebnisarray (darf sich nicht mit den Eingaben überschneiden).
 
     Returns
     -------
@@ -544,20 +846,42 @@ def refraktion(mittel_dist:float,
 
     Notes
     -----
-    - Die Vertikalwinkel werden intern von gon in Radiant umgerechnet.
     - Berechnung erfolgt nach der Formel:
       k = 1 - ((v_angle_AB + v_angle_BA - π) * 6_370_000 / (mittel_dist * sin(v_angle_AB)))
       wobei 6_370_000 m als mittlerer Erdradius verwendet wird.
+    - Die kleine Differenz v_angle_AB + v_angle_BA - 200 gon wird als (v_AB - 100) + (v_BA - 100)
+      in gon gebildet (beide Subtraktionen exakt) und erst danach in Radiant umgerechnet,
+      statt zwei grosse Radiant-Werte und π voneinander abzuziehen.
     """
 
-    ## Umwandlung der Winkel von gon in rad
-    v_angle_korr_korr_ab = gon2rad(v_angle_korr_korr_ab)
-    v_angle_korr_korr_ba = gon2rad(v_angle_korr_korr_ba)
+    k = _puffer(out, 1, mittel_dist, v_angle_korr_korr_ab, v_angle_korr_korr_ba)[0]
+    nenner = np.empty_like(k)
+
+    # Summe der Zenitwinkel minus 200 gon (in rad, mal Erdradius)
+    np.subtract(v_angle_korr_korr_ab, 100, out=k)
+    np.subtract(v_angle_korr_korr_ba, 100, out=nenner)
+    np.add(k, nenner, out=k)
+    np.multiply(k, np.pi / 200 * 6_370_000, out=k)
+
+    # mittel_dist * sin(v_angle_AB)
+    np.multiply(v_angle_korr_korr_ab, np.pi / 200, out=nenner)
+    np.sin(nenner, out=nenner)
+    np.multiply(nenner, mittel_dist, out=nenner)
 
     # Berechnung des Refraktionskoeffizienten
-    k = 1 - ( (v_angle_korr_korr_ab + v_angle_korr_korr_ba - np.pi) * 6_370_000 / (mittel_dist * np.sin(v_angle_korr_korr_ab) )) 
+    np.divide(k, nenner, out=k)
+    np.subtract(1, k, out=k)
 
-    return k
+    return k[()]
+
+## <----------------------------------------------------------------------------------->
+
+def _puffer(out, anzahl:int, *eingaben):
+    ## Ergebnisarrays der Kernfunktionen: die übergebenen `out` oder neue in der Form der Eingaben
+    if out is not None:
+        return out if anzahl > 1 else (out,)
+    form = np.broadcast(*eingaben).shape
+    return tuple(np.empty(form) for _ in range(anzahl))
 
 ## <----------------------------------------------------------------------------------->
 
@@ -612,9 +936,31 @@ def azi_aprox(df_start, df_end):
     N2 = df_end['N-Koord'].values[0]
 
     ## Berechnung des Azimutes inklusive Fehlerbaehandlung
-    azi_prov = np.arctan2(E2 -E1, N2 - N1) / rho()
-    azimuth = np.where(azi_prov > 0, azi_prov, azi_prov + 400)
+    azimuth = azimut(E1, N1, E2, N2)
 
     return azimuth
 
+## <----------------------------------------------------------------------------------->
+
+def azimut(E1, N1, E2, N2):
+    """
+    Berechnet den Azimut von Punkt 1 nach Punkt 2 aus den Koordinaten (auch elementweise für Arrays).
+
+    Parameters
+    ----------
+    E1, N1 : float or numpy.ndarray
+        Koordinaten des Startpunkts.
+    E2, N2 : float or numpy.ndarray
+        Koordinaten des Endpunkts.
+
+    Returns
+    -------
+    numpy.ndarray
+        Azimut in gon (0–400 gon).
+    """
+
+    azi_prov = np.arctan2(E2 -E1, N2 - N1) / rho()
+
+    return np.where(azi_prov > 0, azi_prov, azi_prov + 400)
+
 ## <----------------------------------------------------------------------------------->
\ No newline at end of file
@@ -0,0 +1,383 @@
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+## Aufbau des Epochenspeichers: je ein Parquet-Datensatz für die Messungen und für die Zusammenfassungen
+## pro Visur, partitioniert nach dem Monat des Epochenbeginns ("monat=2025-09"). Jeder Lauf schreibt neue
+## Dateien, bestehende Dateien werden nie verändert (append-only).
+MESSUNGEN = "messungen"
+VISUREN = "visuren"
+PARTITION = "monat"
+
+## Schlüssel einer Epoche: Visur und Beginn der Messung (frühester Messzeitpunkt der Visur)
+SCHLUESSEL = ["ID Visur", "Zeitpunkt"]
+
+## Kritischer Wert für signifikante Verschiebungen (95 %, zweiseitig)
+KRITISCH = 1.96
+
+_TAGE_PRO_JAHR = 365.25
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Der Epochenspeicher benötigt pyarrow (pip install pyarrow).") from e
+    return pa, ds, pq
+
+
+def _zeit(wert):
+    return None if wert is None else pd.Timestamp(wert).as_unit("ns")
+
+
+class Epochenspeicher:
+    """
+    Spaltenorientierter Speicher für wiederholte Epochen derselben Visuren (Monitoring).
+
+    Eine Epoche ist die Auswertung einer Visur zu einem Messzeitpunkt; ihr Schlüssel ist
+    ("ID Visur", "Zeitpunkt") mit dem frühesten Messzeitpunkt der Visur (Spalte "Zeitpunkt" von
+    `master_thb_batch`). Gespeichert werden die Messungen (`df300`) und die Zusammenfassung pro Visur
+    (`df_stats`) als Parquet, nach Monat partitioniert und innerhalb der Dateien nach Visur und Zeit
+    sortiert. Bereichsabfragen lesen nur die betroffenen Monate und Spalten; keine CSV wird neu geparst.
+
+    Der Speicher wird nur ergänzt. Wird eine Epoche mit `ueberschreiben` erneut abgelegt, gilt bei
+    allen Abfragen der neueste Lauf (Spalte "Lauf").
+
+    Parameter:
+    ----------
+    pfad : str or pathlib.Path
+        Ordner des Speichers; wird beim ersten `anhaengen` angelegt.
+    """
+
+    def __init__(self, pfad):
+        self.pfad = Path(pfad)
+
+    def __repr__(self):
+        return f"Epochenspeicher('{self.pfad}')"
+
+    ## <----------------------------------------------------------------------------------->
+    ## Schreiben
+
+    def anhaengen(self, kampagne, ueberschreiben:bool=False):
+        """
+        Legt die ausgewerteten Visuren einer Kampagne als neue Epochen ab.
+
+        Parameter:
+        ----------
+        kampagne : KampagnenErgebnis
+            Ergebnis von `auswertung_kampagne` (benötigt `df300` mit der Spalte "Zeitpunkt" und `df_stats`).
+        ueberschreiben : bool, optional (Standard: False)
+            Bereits gespeicherte Epochen erneut ablegen (z.B. nach geänderter Ausreissererkennung);
+            sonst werden sie übersprungen.
+
+        Rückgabe:
+        ---------
+        list of tuple
+            Schlüssel (ID Visur, Zeitpunkt) der neu abgelegten Epochen.
+        """
+
+        _pyarrow()
+
+        if kampagne.df300 is None or kampagne.df_stats is None or len(kampagne.df300) == 0:
+            return []
+        if "Zeitpunkt" not in kampagne.df300.columns:
+            raise ValueError("df300 enthält keine Messzeitpunkte (Spalte 'Zeitpunkt'); Kampagne neu auswerten.")
+
+        ## <----------------------------------------------------------------------------------->
+        ## Epochen bestimmen: Beginn und Ende der Messung pro Visur
+        df300 = kampagne.df300
+        zeit = df300.groupby("ID Visur", sort=False)["Zeitpunkt"].agg(["min", "max"])
+
+        ohne_zeit = zeit.index[zeit["min"].isna()]
+        for visur in ohne_zeit:
+            print(f"Warnung: {visur} ohne gültige Messzeitpunkte, wird nicht gespeichert.")
+        zeit = zeit.drop(ohne_zeit)
+
+        if not ueberschreiben:
+            vorhanden = self.visuren(visuren=list(zeit.index), spalten=SCHLUESSEL)
+            vorhanden = set(zip(vorhanden["ID Visur"], vorhanden["Zeitpunkt"]))
+            doppelt = [visur for visur, beginn in zeit["min"].items() if (visur, beginn) in vorhanden]
+            if doppelt:
+                print(f"{len(doppelt)} Epoche(n) bereits gespeichert und übersprungen (siehe `ueberschreiben`).")
+            zeit = zeit.drop(doppelt)
+
+        if zeit.empty:
+            return []
+        ## <----------------------------------------------------------------------------------->
+
+        ## <----------------------------------------------------------------------------------->
+        ## Tabellen aufbauen
+        ausgewertet = pd.Timestamp(datetime.now()).as_unit("ns")
+        lauf = f"{ausgewertet:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+        df_visuren = kampagne.df_stats.loc[zeit.index].reset_index()
+        df_visuren.insert(1, "Zeitpunkt", zeit["min"].to_numpy())
+        df_visuren.insert(2, "Ende", zeit["max"].to_numpy())
+        df_visuren["Lauf"] = lauf
+        df_visuren["Ausgewertet"] = ausgewertet
+        df_visuren[PARTITION] = df_visuren["Zeitpunkt"].dt.strftime("%Y-%m")
+
+        df_mess = df300[df300["ID Visur"].isin(zeit.index)].copy()
+        df_mess["Epoche"] = zeit["min"].reindex(df_mess["ID Visur"]).to_numpy()
+        df_mess["Lauf"] = lauf
+        df_mess[PARTITION] = df_mess["Epoche"].dt.strftime("%Y-%m")
+        ## <----------------------------------------------------------------------------------->
+
+        ## Messungen zuerst: bricht der Lauf ab, fehlt nur die Zusammenfassung und die Epoche
+        ## gilt als nicht gespeichert
+        self._schreiben(MESSUNGEN, df_mess.sort_values(["ID Visur", "Zeitpunkt"]), lauf)
+        self._schreiben(VISUREN, df_visuren.sort_values(SCHLUESSEL), lauf)
+
+        return list(zip(zeit.index, zeit["min"]))
+
+    def _schreiben(self, name:str, df, lauf:str):
+        pa, _, pq = _pyarrow()
+
+        for monat, teil in df.groupby(PARTITION, sort=True):
+            ordner = self.pfad / name / f"{PARTITION}={monat}"
+            ordner.mkdir(parents=True, exist_ok=True)
+
+            ## Temporäre Datei mit "." beginnt und wird beim Lesen ignoriert
+            ziel = ordner / f"{lauf}.parquet"
+            tmp = ordner / f".{lauf}.parquet.tmp"
+            tabelle = pa.Table.from_pandas(teil.drop(columns=PARTITION), preserve_index=False)
+            pq.write_table(tabelle, tmp)
+            os.replace(tmp, ziel)
+
+    ## <----------------------------------------------------------------------------------->
+
+
+    ## <----------------------------------------------------------------------------------->
+    ## Abfragen
+
+    def _lesen(self, name:str, zeitspalte:str, visuren, von, bis, spalten):
+        pa, ds, _ = _pyarrow()
+
+        pfad = self.pfad / name
+        if not pfad.is_dir():
+            return None
+
+        partitionierung = ds.partitioning(pa.schema([(PARTITION, pa.string())]), flavor="hive")
+        datensatz = ds.dataset(pfad, format="parquet", partitioning=partitionierung)
+
+        ## Ältere Dateien können weniger Spalten haben (neue Kennwerte); Schemas vereinheitlichen
+        schemas = [f.physical_schema for f in datensatz.get_fragments()]
+        if not schemas:
+            return None
+        if any(not s.equals(schemas[0]) for s in schemas[1:]):
+            schema = pa.unify_schemas(schemas + [partitionierung.schema], promote_options="permissive")
+            datensatz = ds.dataset(pfad, format="parquet", partitioning=partitionierung, schema=schema)
+
+        ## Filter: Monatspartitionen werden anhand von `von`/`bis` gar nicht erst geöffnet
+        filter = None
+        bedingungen = []
+        von, bis = _zeit(von), _zeit(bis)
+        if visuren is not None:
+            bedingungen.append(ds.field("ID Visur").isin(list(visuren)))
+        if von is not None:
+            bedingungen += [ds.field(PARTITION) >= f"{von:%Y-%m}",
+                            ds.field(zeitspalte) >= pa.scalar(von.to_datetime64(), pa.timestamp("ns"))]
+        if bis is not None:
+            bedingungen += [ds.field(PARTITION) <= f"{bis:%Y-%m}",
+                            ds.field(zeitspalte) < pa.scalar(bis.to_datetime64(), pa.timestamp("ns"))]
+        for b in bedingungen:
+            filter = b if filter is None else filter & b
+
+        if spalten is not None:
+            spalten = list(dict.fromkeys(list(spalten) + ["ID Visur", zeitspalte, "Lauf"]))
+            spalten = [s for s in spalten if s in datensatz.schema.names]
+
+        df = datensatz.to_table(columns=spalten, filter=filter).to_pandas()
+        return df.drop(columns=PARTITION, errors="ignore")
+
+    @staticmethod
+    def _neuester_lauf(df, schluessel:list):
+        ## Bei mehrfach gespeicherten Epochen gilt der neueste Lauf
+        if df.empty:
+            return df
+        neuester = df.groupby(schluessel, sort=False)["Lauf"].transform("max")
+        return df[df["Lauf"] == neuester]
+
+    def visuren(self, visuren:list=None, von=None, bis=None, spalten:list=None):
+        """
+        Zusammenfassungen pro Visur und Epoche (Spalten von `df_stats` sowie "Zeitpunkt", "Ende",
+        "Lauf" und "Ausgewertet").
+
+        Parameter:
+        ----------
+        visuren : list of str, optional (Standard: None)
+            IDs der Visuren; None liefert alle.
+        von, bis : str or datetime, optional (Standard: None)
+            Halboffener Bereich [von, bis) des Epochenbeginns, z.B. "2025-09-01".
+        spalten : list of str, optional (Standard: None)
+            Zu lesende Spalten; die Schlüssel werden immer gelesen. None liest alle.
+
+        Rückgabe:
+        ---------
+        pandas.DataFrame
+            Eine Zeile pro Epoche, sortiert nach Visur und Zeitpunkt (leer, falls nichts gespeichert ist).
+        """
+
+        df = self._lesen(VISUREN, "Zeitpunkt", visuren, von, bis, spalten)
+        if df is None:
+            return pd.DataFrame(columns=SCHLUESSEL + (["Lauf"] if spalten is None else []))
+
+        df = self._neuester_lauf(df, SCHLUESSEL)
+        return df.sort_values(SCHLUESSEL).reset_index(drop=True)
+
+    def messungen(self, visuren:list=None, von=None, bis=None, spalten:list=None):
+        """
+        Einzelmessungen (Spalten von `df300` sowie "Epoche" und "Lauf").
+
+        Parameter:
+        ----------
+        visuren : list of str, optional (Standard: None)
+            IDs der Visuren; None liefert alle.
+        von, bis : str or datetime, optional (Standard: None)
+            Halboffener Bereich [von, bis) des Epochenbeginns (Spalte "Epoche"); eine Epoche wird
+            also immer vollständig geliefert.
+        spalten : list of str, optional (Standard: None)
+            Zu lesende Spalten; None liest alle.
+
+        Rückgabe:
+        ---------
+        pandas.DataFrame
+            Messungen sortiert nach Visur, Epoche und Messzeitpunkt.
+        """
+
+        df = self._lesen(MESSUNGEN, "Epoche", visuren, von, bis, spalten)
+        if df is None:
+            return pd.DataFrame(columns=["ID Visur", "Epoche", "Lauf"])
+
+        df = self._neuester_lauf(df, ["ID Visur", "Epoche"])
+        ordnung = ["ID Visur", "Epoche"] + (["Zeitpunkt"] if "Zeitpunkt" in df.columns else [])
+        return df.sort_values(ordnung).reset_index(drop=True)
+
+    ## <----------------------------------------------------------------------------------->
+
+
+    ## <----------------------------------------------------------------------------------->
+    ## Deformationsanalyse
+
+    def verschiebungen(self, visuren:list=None, von=None, bis=None, groesse:str="dH"):
+        """
+        Änderung der mittleren Höhendifferenz jeder Epoche gegenüber der ersten Epoche im Bereich.
+
+        Die Standardabweichung der Verschiebung folgt aus den Standardabweichungen der Mittelwerte
+        beider Epochen (Std / sqrt(n)); "Signifikant" markiert |Verschiebung| > 1.96 * Std.
+
+        Parameter:
+        ----------
+        visuren : list of str, optional (Standard: None)
+            IDs der Visuren; None wertet alle aus.
+        von, bis : str or datetime, optional (Standard: None)
+            Bereich des Epochenbeginns (siehe `visuren`); die erste Epoche im Bereich ist die Nullmessung.
+        groesse : str, optional (Standard: "dH")
+            Grösse in m aus `utils.statistik.GROESSEN` ("dH" oder "sd").
+
+        Rückgabe:
+        ---------
+        pandas.DataFrame
+            Spalten "ID Visur", "Zeitpunkt", "Mittel", "Verschiebung [mm]", "Std Verschiebung [mm]"
+            und "Signifikant", eine Zeile pro Epoche.
+        """
+
+        df = self.visuren(visuren, von, bis, spalten=[f"{groesse} Mittel", f"{groesse} Std", f"{groesse} n"])
+        if df.empty:
+            return pd.DataFrame(columns=["ID Visur", "Zeitpunkt", "Mittel", "Verschiebung [mm]",
+                                         "Std Verschiebung [mm]", "Signifikant"])
+
+        mittel = df[f"{groesse} Mittel"].to_numpy(dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std_mittel = df[f"{groesse} Std"].to_numpy(dtype=float) / np.sqrt(df[f"{groesse} n"].to_numpy(dtype=float))
+
+        ## Nullmessung: erste Epoche jeder Visur (df ist nach Visur und Zeitpunkt sortiert)
+        erste = df.groupby("ID Visur", sort=False).cumcount().to_numpy() == 0
+        bezug = np.flatnonzero(erste)[np.cumsum(erste) - 1]
+
+        verschiebung = (mittel - mittel[bezug]) * 1000
+        std = np.hypot(std_mittel, std_mittel[bezug]) * 1000
+        std[erste] = 0.0
+
+        return pd.DataFrame({"ID Visur": df["ID Visur"].to_numpy(),
+                             "Zeitpunkt": df["Zeitpunkt"].to_numpy(),
+                             "Mittel": mittel,
+                             "Verschiebung [mm]": np.round(verschiebung, 2),
+                             "Std Verschiebung [mm]": np.round(std, 2),
+                             "Signifikant": np.abs(verschiebung) > KRITISCH * std})
+
+    def trends(self, visuren:list=None, von=None, bis=None, groesse:str="dH", kennwert:str="Mittel"):
+        """
+        Linearer Trend pro Visur über alle Epochen im Bereich (Ausgleichsgerade nach der Zeit).
+
+        Alle Visuren werden in einem gruppierten NumPy-Durchgang ausgeglichen. Die Standardabweichung
+        der Rate folgt aus den Residuen und ist erst ab drei Epochen definiert.
+
+        Parameter:
+        ----------
+        visuren : list of str, optional (Standard: None)
+            IDs der Visuren; None wertet alle aus.
+        von, bis : str or datetime, optional (Standard: None)
+            Bereich des Epochenbeginns (siehe `visuren`).
+        groesse : str, optional (Standard: "dH")
+            Grösse in m aus `utils.statistik.GROESSEN` ("dH" oder "sd").
+        kennwert : str, optional (Standard: "Mittel")
+            Kennwert pro Epoche, z.B. "Mittel" oder "Median" (siehe `utils.statistik.KENNWERTE`).
+
+        Rückgabe:
+        ---------
+        pandas.DataFrame
+            Index "ID Visur" mit den Spalten "Epochen", "Erste Epoche", "Letzte Epoche", "Erster Wert",
+            "Letzter Wert", "Änderung [mm]", "Rate [mm/Jahr]" und "Std Rate [mm/Jahr]".
+        """
+
+        spalte = f"{groesse} {kennwert}"
+        df = self.visuren(visuren, von, bis, spalten=[spalte])
+        spalten = ["Epochen", "Erste Epoche", "Letzte Epoche", "Erster Wert", "Letzter Wert",
+                   "Änderung [mm]", "Rate [mm/Jahr]", "Std Rate [mm/Jahr]"]
+        if df.empty:
+            return pd.DataFrame(columns=spalten, index=pd.Index([], name="ID Visur"))
+
+        df = df[df[spalte].notna()]
+        codes, index = pd.factorize(df["ID Visur"], sort=False)
+        n_gruppen = len(index)
+
+        ## Zeit in Jahren seit der ersten gespeicherten Epoche (vermeidet grosse Zahlen im Ausgleich)
+        zeit = df["Zeitpunkt"].to_numpy(dtype="datetime64[ns]")
+        t = (zeit - zeit.min()) / np.timedelta64(1, "D") / _TAGE_PRO_JAHR
+        y = df[spalte].to_numpy(dtype=float)
+
+        n = np.bincount(codes, minlength=n_gruppen)
+        t_mittel = np.bincount(codes, weights=t, minlength=n_gruppen) / n
+        y_mittel = np.bincount(codes, weights=y, minlength=n_gruppen) / n
+        dt = t - t_mittel[codes]
+        dy = y - y_mittel[codes]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stt = np.bincount(codes, weights=dt**2, minlength=n_gruppen)
+            rate = np.bincount(codes, weights=dt * dy, minlength=n_gruppen) / stt
+            rest = dy - rate[codes] * dt
+            std_rate = np.sqrt(np.bincount(codes, weights=rest**2, minlength=n_gruppen) / (n - 2) / stt)
+        std_rate[n < 3] = np.nan
+
+        ## Erste und letzte Epoche pro Visur (df ist nach Visur und Zeitpunkt sortiert)
+        gruppe = df.groupby(codes, sort=True)
+        erste, letzte = gruppe.head(1), gruppe.tail(1)
+
+        return pd.DataFrame({"Epochen": n,
+                             "Erste Epoche": erste["Zeitpunkt"].to_numpy(),
+                             "Letzte Epoche": letzte["Zeitpunkt"].to_numpy(),
+                             "Erster Wert": erste[spalte].to_numpy(),
+                             "Letzter Wert": letzte[spalte].to_numpy(),
+                             "Änderung [mm]": np.round((letzte[spalte].to_numpy() - erste[spalte].to_numpy()) * 1000, 2),
+                             "Rate [mm/Jahr]": np.round(rate * 1000, 2) + 0.0,
+                             "Std Rate [mm/Jahr]": np.round(std_rate * 1000, 2)},
+                            index=pd.Index(index, name="ID Visur"))
+
+    ## <----------------------------------------------------------------------------------->
@@ -1,16 +1,22 @@
-import tabulate as tl
 from datetime import datetime
+import base64
 import os
 
 from pathlib import Path
-import markdown
-from weasyprint import HTML
+from functools import cached_property, lru_cache
 
-from utils.plots import boxplot_beaut, scatterplot_vwinkel
+from utils import laufzeit
+from utils.statistik import VERWORFEN
+
+## tabulate, markdown, weasyprint und die Plots (matplotlib) werden erst beim ersten Export geladen,
+## damit Berechnung und Import ohne diese Pakete und ohne deren Ladezeit auskommen.
 
 def path_to_file_url(path):
     return "file:///" + str(path.resolve()).replace("\\", "/")
 
+def bytes_to_data_url(daten:bytes, mime:str):
+    return f"data:{mime};base64," + base64.b64encode(daten).decode("ascii")
+
 def export_protocol(df300_new,
                     infos_vis:list, 
                     infos_height:list, 
@@ -54,8 +60,425 @@ def export_protocol(df300_new,
         Das Protokoll wird als Textdatei gespeichert; es erfolgt keine Rückgabe.
     """
 
+    _txt(ExportKontext(df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data))
+
+def export2csv(df300_new,
+               infos_vis:list, 
+               infos_height:list, 
+               infos_k:list, 
+               infos_sd:list, 
+               visur:str, 
+               file_path:str, 
+               data:list):
+    """
+    Exportiert ein DataFrame zusammen mit einem einleitenden Header-Text als CSV-Datei.
+
+    Die CSV-Datei enthält:
+    - Header-Zeile mit Visur-ID und Auswertungsdatum/-zeit
+    - Messergebnisse aus df300_new ohne Indexspalte, Semikolon-getrennt
+    - Bestehende Dateien mit gleichem Namen werden überschrieben
+
+    Parameter:
+    ----------
+    df300_new : pandas.DataFrame
+        DataFrame mit den Messergebnissen.
+    infos_vis : list
+        Liste mit zusätzlichen Informationen zur Auswertung.
+    infos_height : list
+        Statistische Kennwerte der Höhendifferenz.
+    infos_k : list
+        Statistische Kennwerte der Refraktionskoeffizienten.
+    infos_sd : list
+        Statistische Kennwerte der mittleren Schrägdistanz.
+    visur : str
+        Identifikationsstring der Visur; wird auch für die Dateibenennung verwendet.
+    file_path : str
+        Pfad zum Verzeichnis, in dem die CSV-Datei gespeichert wird.
+    data : list
+        Messparameter: [Signalhöhe A, Offset A, Signalhöhe B, Offset B].
+
+    Rückgabe:
+    ---------
+    None
+        Die CSV-Datei wird auf der Festplatte gespeichert; es erfolgt keine Rückgabe.
+    """
+
+    _csv(ExportKontext(df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data))
+
+## <----------------------------------------------------------------------------------->
+## Gemeinsame Bausteine der Markdown/PDF-Protokolle
+
+## Stylesheet aller PDF-Protokolle. Die Fusszeile links übernimmt den Dokumentnamen aus dem
+## Element ".dokument" (string-set), damit dasselbe Stylesheet für alle Visuren gilt.
+PROTOKOLL_CSS = """
+@page {
+    size: A4 landscape;
+    margin: 20mm;
+    @bottom-left {
+        content: string(dokument);
+        font-size: 8pt;
+    }
+    @bottom-right {
+        content: "Seite " counter(page) " / " counter(pages);
+        font-size: 8pt;
+    }
+}
+body {
+    font-family: Arial, sans-serif;
+    font-size: 10pt;
+    line-height: 1.4;
+}
+table {
+    border-collapse: collapse;
+    font-size: 8pt; 
+}
+th, td {
+    padding: 4px 6px;
+    border: 1px solid #333;
+    text-align: center;
+}
+th {
+    background-color: #f2f2f2;
+}
+.dokument {
+    string-set: dokument content();
+    height: 0;
+    overflow: hidden;
+}
+.visur {
+    page-break-before: always;
+}
+"""
+
+@lru_cache(maxsize=1)
+def protokoll_stylesheet():
+    """
+    Liefert das von WeasyPrint geparste Stylesheet der Protokolle (wird nur einmal pro Prozess erstellt).
+    """
+
+    from weasyprint import CSS
+    return CSS(string=PROTOKOLL_CSS)
+
+
+def verworfene_ids(df300_new):
+    """
+    IDs der als Ausreisser verworfenen Messungen (Spalte "Verworfen") als Text, "keine" ohne Ausreisser.
+    """
+
+    if VERWORFEN not in df300_new.columns:
+        return "keine"
+    ids = df300_new.loc[df300_new[VERWORFEN].to_numpy(dtype=bool), "ID Messung"].astype(str).tolist()
+    return ", ".join(ids) if ids else "keine"
+
+
+def protokoll_markdown(df300_new,
+                       infos_vis:list, 
+                       infos_height:list, 
+                       infos_k:list, 
+                       infos_sd:list, 
+                       visur:str, 
+                       data:list,
+                       zeitpunkt:str=None):
+    """
+    Erstellt den Markdown-Text des Protokolls einer Visur (Header, Messwerttabelle, Footer mit
+    Messparametern, Statistiken und Präanalyse). Parameter wie `export_protocol_md_pdf`;
+    `zeitpunkt` ist der Auswertungszeitpunkt im Header (Standard: jetzt).
+    """
+
+    import tabulate as tl
+
+    current_time = datetime.now().strftime("%d.%m.%Y / %H:%M") if zeitpunkt is None else zeitpunkt
+
+
+    # Markdown-kompatible Tabelle
+    tbl_str = tl.tabulate(
+        df300_new,
+        headers="keys",
+        tablefmt="github",
+        showindex=True,
+        floatfmt=(".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".2f")
+    )
+
+    header = [
+        f"# Trigonometrische Höhenbestimmung - Protokoll der Auswertung",
+        f"**Visur ID:** {visur}  ",
+        f"**Ausgewertet am:** {current_time}",
+        "---"
+    ]
+
+    footer = [
+        "---",
+        "## Angegebene Parameter der Messung",
+        f" - Instrumentenhöhe Station A: {data[0] - data[1]} m",
+        f" - Offset Station A: {data[1]} m",
+        f" - Signalhöhe Station A: {data[0]} m",
+        f" - Instrumentenhöhe Station B: {data[2] - data[3]} m",               
+        f" - Instrumentenoffset Station B: {data[3]} m",
+        f" - Signalhöhe Station B: {data[2]} m",
+        f" - Startpunkt (A): {infos_vis[0]} // Endpunkt (B): {infos_vis[1]}",
+        "---",
+        "## Höhenstatistiken",
+        f"- Höhendifferenz (Näherungskoordinaten): {infos_height[0]} m",
+        f"- Mittlere Höhendifferenz inkl. 1σ: {infos_height[1]} m ± {infos_height[2]} m",
+        f"- Mittlere Höhendifferenz (Lage 1) inkl. 1σ: {infos_height[3]} m ± {infos_height[4]} m",
+        f"- Mittlere Höhendifferenz (Lage 2) inkl. 1σ: {infos_height[5]} m ± {infos_height[6]} m",
+        f"- Als Ausreisser verworfen (nicht in den Kennwerten): {verworfene_ids(df300_new)}",
+        "---",
+        "## Schrägdistanzstatistik",
+        f"- Mittlere Schrägdistanz inkl. 1σ: {infos_sd[0]} m ± {infos_sd[1]} m",
+        f"- Mittlere Schrägdistanz (Lage 1) inkl. 1σ: {infos_sd[2]} m ± {infos_sd[3]} m",
+        f"- Mittlere Schrägdistanz (Lage 2) inkl. 1σ: {infos_sd[4]} m ± {infos_sd[5]} m",
+        "---",
+        "## Refraktionskoeffizienten",
+        f"- Mittlerer Refraktionskoeffizient inkl. 1σ: {infos_k[0]} ± {infos_k[1]}",
+        f"- Mittlerer Refraktionskoeffizient (Lage 1) inkl. 1σ: {infos_k[2]} ± {infos_k[3]}",
+        f"- Mittlerer Refraktionskoeffizient (Lage 2) inkl. 1σ: {infos_k[4]} ± {infos_k[5]}",
+        "---",
+        "## Präanalyse",
+        f"#### Genauigkeit der Höhenbestimmung (1σ): {infos_vis[2]:.2f} mm // {infos_vis[2]/1000:.4f} m ",
+        "#### Die Komponenten der Präanalyse in 1σ (in mm):",
+        f"- Distanzkomponente: {infos_vis[3][0]:.2f} mm",
+        f"- Zenitwinkelkomponente: {infos_vis[3][1]:.2f} mm",
+        f"- Refraktionskomponente: {infos_vis[3][2]:.2f} mm (bei gleichzeitiger Messung vernachlässigt)",
+        f"- Genauigkeit Instrumentenoffset: {infos_vis[3][3]:.2f} mm",
+        f"- Genauigkeit Signalhöhe: {infos_vis[3][4]:.2f} mm",
+        f"- Lotabweichungskomponente: {infos_vis[3][5]:.2f} mm",
+        "",
+        "_Modell: Fortpflanzung der a-priori-Genauigkeiten durch Lotabweichungs-, Kippachs- und "
+        "Höhenberechnung (frühere Protokolle: feste Formel ohne Lotabweichung, 1 mm Instrumentenhöhe; "
+        "Werte nicht direkt vergleichbar). Der Instrumentenoffset hebt sich bei gegenseitiger Messung "
+        "nahezu auf (≈ 0 mm)._"
+    ]
+
+    # Markdown zusammenbauen
+    full_md = "\n".join(header) + "\n\n" + tbl_str + "\n\n" + "\n".join(footer)
+
+    return full_md
+
+def plots_svg(df300_new, visur:str):
+    """
+    Rendert Boxplot und Scatterplot einer Visur im Speicher als SVG und liefert beide als data-URL
+    (Boxplot, Scatterplot), ohne Umweg über die Festplatte.
+    """
+
+    from utils.render import renderer
+
+    ## Wiederverwendete Figuren ohne pyplot, siehe utils.render
+    plot = renderer()
+
+    boxplot_src = bytes_to_data_url(plot.als_bytes(plot.boxplot(df300_new, visur), "vektor"), "image/svg+xml")
+    scatterplot_src = bytes_to_data_url(plot.als_bytes(plot.scatterplot(df300_new, visur), "vektor"), "image/svg+xml")
+
+    return boxplot_src, scatterplot_src
+
+
+def bilder_html(boxplot_src:str, scatterplot_src:str):
+    """
+    Liefert den HTML-Block des Protokolls mit Boxplot und Scatterplot nebeneinander.
+    """
+
+    return f"""
+    <div style='margin-top:30px;'>
+      <h2 style='text-align:center;'>Visualisierung der Messergebnisse</h2>
+      <div style='display: flex; justify-content: space-between; align-items: flex-start;'>
+        <div style='width:48%; text-align: center;'>
+          <img src="{boxplot_src}" style="max-width:100%; max-height:550px; object-fit: contain;" />
+        </div>
+        <div style='width:48%; text-align: center;'>
+          <img src="{scatterplot_src}" style="max-width:100%; max-height:550px; object-fit: contain;" />
+        </div>
+      </div>
+    </div>
+    """
+## <----------------------------------------------------------------------------------->
+
+
+def export_plots(df300_new, visur:str, file_path:str):
+    """
+    Speichert Boxplot und Scatterplot einer Visur als PNG-Dateien (300 dpi) im Ordner `file_path`.
+
+    Rückgabe:
+    ---------
+    tuple of pathlib.Path
+        Pfade der Bilder (Boxplot, Scatterplot).
+    """
+
+    from utils.render import renderer
+
+    plot = renderer()
+
+    boxplot_path = Path(os.path.join(file_path, visur + "_Boxplot_Höhendifferenz.png"))
+    scatterplot_path = Path(os.path.join(file_path, visur + "_Scatterplot_Verteilung_Winkel.png"))
+
+    plot.speichern(plot.boxplot(df300_new, visur), boxplot_path, "bericht")
+    plot.speichern(plot.scatterplot(df300_new, visur), scatterplot_path, "bericht")
+
+    return boxplot_path, scatterplot_path
+
+
+## <----------------------------------------------------------------------------------->
+## Exporter-Registry: jedes Format ist eine Funktion `exporter(kontext)`, die Daten teilen sich die
+## Exporter über den `ExportKontext` einer Visur.
+
+EXPORTER = {}
+
+def exporter(name:str):
+    """
+    Registriert eine Exportfunktion unter dem Formatnamen `name` (Dekorator).
+
+    Die Funktion erhält den `ExportKontext` einer Visur und schreibt ihre Datei(en) in dessen Ordner.
+    Eigene Formate können so ergänzt werden, ohne `exportieren` anzupassen.
+    """
+
+    def registrieren(funktion):
+        EXPORTER[name] = funktion
+        return funktion
+    return registrieren
+
+
+class ExportKontext:
+    """
+    Gemeinsame Daten aller Exporter einer Visur.
+
+    Aufwändige Zwischenergebnisse (Markdown-Protokoll, Grafiken, HTML) werden erst beim ersten Zugriff
+    und nur einmal pro Visur erstellt, auch wenn mehrere Formate sie verwenden (z.B. "md" und "pdf"
+    dasselbe Markdown, "png" und "pdf" dieselben Bilddateien). Alle Dateien erhalten denselben
+    Auswertungszeitpunkt.
+
+    Parameter:
+    ----------
+    df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data
+        Wie bei `export_protocol_md_pdf`.
+    formate : iterable of str, optional (Standard: ())
+        Gewählte Formate; bestimmt u.a., ob das PDF die PNG-Dateien referenziert ("png")
+        oder die Grafiken als SVG einbettet.
+    """
+
+    def __init__(self,
+                 df300_new,
+                 infos_vis:list, 
+                 infos_height:list, 
+                 infos_k:list, 
+                 infos_sd:list, 
+                 visur:str, 
+                 file_path:str, 
+                 data:list,
+                 formate=()):
+        self.df300 = df300_new
+        self.infos_vis = infos_vis
+        self.infos_height = infos_height
+        self.infos_k = infos_k
+        self.infos_sd = infos_sd
+        self.visur = visur
+        self.file_path = file_path
+        self.data = data
+        self.formate = list(formate)
+        self.zeitpunkt = datetime.now().strftime("%d.%m.%Y / %H:%M")
+        self.befunde = []
+
+    @classmethod
+    def aus_ergebnis(cls, ergebnis, formate=()):
+        """
+        Erstellt den Kontext aus einem `VisurErgebnis` (siehe `utils.auto`).
+        """
+        return cls(ergebnis.df300, ergebnis.infos_vis, ergebnis.infos_height, ergebnis.infos_k,
+                   ergebnis.infos_sd, ergebnis.visur, ergebnis.ordner, ergebnis.data, formate)
+
+    @property
+    def args(self):
+        return (self.df300, self.infos_vis, self.infos_height, self.infos_k,
+                self.infos_sd, self.visur, self.file_path, self.data)
+
+    def pfad(self, endung:str):
+        return os.path.join(self.file_path, self.visur + endung)
+
+    def melden(self, name:str, meldung:str):
+        """
+        Gibt die Fehlermeldung eines Exporters aus und hält sie als Befund "export_<name>" fest.
+        """
+        from utils.validierung import Befund
+
+        print(meldung)
+        self.befunde.append(Befund(self.visur, f"export_{name}", meldung, datei=self.file_path))
+
+    @cached_property
+    def markdown(self):
+        return protokoll_markdown(self.df300, self.infos_vis, self.infos_height, self.infos_k,
+                                  self.infos_sd, self.visur, self.data, self.zeitpunkt)
+
+    @cached_property
+    def plots_png(self):
+        with laufzeit.stufe("plots_png", len(self.df300), self.visur):
+            return export_plots(self.df300, self.visur, self.file_path)
+
+    @cached_property
+    def bilder_html(self):
+        if "png" in self.formate:
+            return bilder_html(*(path_to_file_url(p) for p in self.plots_png))
+        with laufzeit.stufe("plots_svg", len(self.df300), self.visur):
+            return bilder_html(*plots_svg(self.df300, self.visur))
+
+    @cached_property
+    def html(self):
+        import markdown
+
+        return f"""
+    <div class="dokument">{self.visur}_Protokoll.md</div>
+    {markdown.markdown(self.markdown, extensions=['tables'])}
+    {self.bilder_html}
+    """
+
+
+def exportieren(kontext:ExportKontext, formate=None, strikt:bool=False):
+    """
+    Schreibt die gewählten Formate einer Visur mit den registrierten Exportern.
+
+    Ein fehlgeschlagenes Format bricht die übrigen nicht ab; die Meldung wird ausgegeben und
+    als Befund in `kontext.befunde` festgehalten (siehe `ExportKontext.melden`).
+
+    Parameter:
+    ----------
+    kontext : ExportKontext
+        Daten der Visur.
+    formate : iterable of str, optional (Standard: None)
+        Namen der Formate (siehe `EXPORTER`); None verwendet `kontext.formate`.
+    strikt : bool, optional (Standard: False)
+        Nach dem ersten fehlgeschlagenen Format mit `utils.validierung.AbbruchFehler` abbrechen.
+
+    Rückgabe:
+    ---------
+    ExportKontext
+        Der Kontext mit allen berechneten Zwischenergebnissen.
+    """
+
+    formate = kontext.formate if formate is None else list(formate)
+
+    unbekannt = [f for f in formate if f not in EXPORTER]
+    if unbekannt:
+        raise ValueError(f"Unbekannte Exportformate {unbekannt}; verfügbar sind {list(EXPORTER)}.")
+
+    ## In Reihenfolge der Registrierung, damit z.B. die PNG-Dateien vor dem PDF entstehen.
+    ## Die Zeit der Grafiken wird zusätzlich als eigene Stufe im Laufbericht erfasst (siehe `utils.laufzeit`).
+    for name, funktion in EXPORTER.items():
+        if name in formate:
+            with laufzeit.stufe(f"export_{name}", len(kontext.df300), kontext.visur):
+                funktion(kontext)
+
+            if strikt and kontext.befunde:
+                from utils.validierung import AbbruchFehler
+                raise AbbruchFehler(kontext.befunde)
+
+    return kontext
+
+
+@exporter("txt")
+def _txt(k:ExportKontext):
+    import tabulate as tl
+
+    df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data = k.args
+
     try:
-        current_time = datetime.now().strftime("%d.%m.%Y / %H:%M")
+        current_time = k.zeitpunkt
 
         formatting = (".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ",.4f", ".4f", ".4f", ".4f", ".2f")
         colalign = ["right", "center", "center", "center", "center", "center", "center", "center", "center", "center"]
@@ -82,6 +505,7 @@ def export_protocol(df300_new,
                   f"Mittlere Höhendifferenz über Trig. Höhenbestimmung inkl. 1σ: {infos_height[1]} m ± {infos_height[2]} m",
                   f"Mittlere Höhendifferenz (Lage 1) inkl. 1σ: {infos_height[3]} m ± {infos_height[4]} m",
                   f"Mittlere Höhendifferenz (Lage 2) inkl. 1σ: {infos_height[5]} m ± {infos_height[6]} m",
+                  f"Als Ausreisser verworfen (nicht in den Kennwerten): {verworfene_ids(df300_new)}",
                   "<<---------------------------------------------------------------->>",
                   "Schrägdistanzstatistik der Auswertung:",
                   f"Mittlere Schrägdistanz inkl. 1σ: {infos_sd[0]} m ± {infos_sd[1]} m",
@@ -98,8 +522,12 @@ def export_protocol(df300_new,
                   f" - Distanzkomponente: {infos_vis[3][0]:.2f} mm",
                   f" - Zenitwinkelkomponente: {infos_vis[3][1]:.2f} mm",
                   f" - Refraktionskomponente: {infos_vis[3][2]:.2f} mm (wird bei gegenseitig gleichzeitiger Messung vernachlässigt)",
-                  f" - Genauigkeit Instrumentenhöhe: {infos_vis[3][3]:.2f} mm",
-                  f" - Genauigkeit Signalhöhe: {infos_vis[3][4]:.2f} mm",]
+                  f" - Genauigkeit Instrumentenoffset: {infos_vis[3][3]:.2f} mm",
+                  f" - Genauigkeit Signalhöhe: {infos_vis[3][4]:.2f} mm",
+                  f" - Lotabweichungskomponente: {infos_vis[3][5]:.2f} mm",
+                  "Modell: Fortpflanzung der a-priori-Genauigkeiten durch Lotabweichungs-, Kippachs- und Höhenberechnung",
+                  "(frühere Protokolle: feste Formel ohne Lotabweichung, 1 mm Instrumentenhöhe; Werte nicht direkt vergleichbar).",
+                  "Der Instrumentenoffset hebt sich bei gegenseitiger Messung nahezu auf (≈ 0 mm).",]
 
 
         full_text = "\n".join(header) + "\n"  + tbl_str + "\n" + "\n".join(footer)
@@ -110,52 +538,15 @@ def export_protocol(df300_new,
             f.write(full_text)
 
     except Exception as e:
-        print(f"Fehler beim Exportieren der Protokolldatei: {e}")
+        k.melden("txt", f"Fehler beim Exportieren der Protokolldatei: {e}")
 
 
-def export2csv(df300_new,
-               infos_vis:list, 
-               infos_height:list, 
-               infos_k:list, 
-               infos_sd:list, 
-               visur:str, 
-               file_path:str, 
-               data:list):
-    """
-    Exportiert ein DataFrame zusammen mit einem einleitenden Header-Text als CSV-Datei.
-
-    Die CSV-Datei enthält:
-    - Header-Zeile mit Visur-ID und Auswertungsdatum/-zeit
-    - Messergebnisse aus df300_new ohne Indexspalte, Semikolon-getrennt
-    - Bestehende Dateien mit gleichem Namen werden überschrieben
-
-    Parameter:
-    ----------
-    df300_new : pandas.DataFrame
-        DataFrame mit den Messergebnissen.
-    infos_vis : list
-        Liste mit zusätzlichen Informationen zur Auswertung.
-    infos_height : list
-        Statistische Kennwerte der Höhendifferenz.
-    infos_k : list
-        Statistische Kennwerte der Refraktionskoeffizienten.
-    infos_sd : list
-        Statistische Kennwerte der mittleren Schrägdistanz.
-    visur : str
-        Identifikationsstring der Visur; wird auch für die Dateibenennung verwendet.
-    file_path : str
-        Pfad zum Verzeichnis, in dem die CSV-Datei gespeichert wird.
-    data : list
-        Messparameter: [Signalhöhe A, Offset A, Signalhöhe B, Offset B].
-
-    Rückgabe:
-    ---------
-    None
-        Die CSV-Datei wird auf der Festplatte gespeichert; es erfolgt keine Rückgabe.
-    """
+@exporter("csv")
+def _csv(k:ExportKontext):
+    df300_new, visur, file_path = k.df300, k.visur, k.file_path
 
     try:
-        current_time = datetime.now().strftime("%d.%m.%Y / %H:%M")
+        current_time = k.zeitpunkt
         header = f"Trigonometrische Höhenbestimmung Madrisa - VisurID: {visur}, Ausgewertet am {current_time}"
 
         full_path = os.path.join(file_path, visur + "_Auswertung.csv")
@@ -167,9 +558,65 @@ def export2csv(df300_new,
         df300_new.to_csv(full_path, mode="a", index=False, sep=";")
 
     except Exception as e:
-        print(f"Fehler beim Exportieren der CSV-Datei: {e}")
+        k.melden("csv", f"Fehler beim Exportieren der CSV-Datei: {e}")
+
+
+@exporter("md")
+def _md(k:ExportKontext):
+    try:
+        with open(k.pfad("_Protokoll.md"), "w", encoding="utf-8") as f:
+            f.write(k.markdown)
+
+    except Exception as e:
+        k.melden("md", f"Fehler beim Exportieren der Markdown-Datei: {e}")
+
+
+@exporter("png")
+def _png(k:ExportKontext):
+    try:
+        k.plots_png
+
+    except Exception as e:
+        k.melden("png", f"Fehler beim Exportieren der Grafiken: {e}")
 
 
+@exporter("pdf")
+def _pdf(k:ExportKontext):
+    try:
+        from weasyprint import HTML
+
+        # HTML für WeasyPrint; Querformat, Schrift und Fusszeile kommen aus dem gemeinsamen Stylesheet
+        html_text = f"""
+        <html>
+        <body>
+        {k.html}
+        </body>
+        </html>
+        """
+
+        # PDF erzeugen
+        HTML(string=html_text).write_pdf(k.pfad("_Protokoll.pdf"), stylesheets=[protokoll_stylesheet()])
+
+    except Exception as e:
+        k.melden("pdf", f"Fehler beim Exportieren der Protokolldatei: {e}")
+## <----------------------------------------------------------------------------------->
+
+
+def export_protocol_md(df300_new,
+                       infos_vis:list, 
+                       infos_height:list, 
+                       infos_k:list, 
+                       infos_sd:list, 
+                       visur:str, 
+                       file_path:str, 
+                       data:list):
+    """
+    Exportiert das Protokoll nur als Markdown-Datei (ohne PDF und Grafiken).
+    Parameter wie `export_protocol_md_pdf`.
+    """
+
+    _md(ExportKontext(df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data))
+
 def export_protocol_md_pdf(df300_new,
                            infos_vis:list, 
                            infos_height:list, 
@@ -177,7 +624,9 @@ def export_protocol_md_pdf(df300_new,
                            infos_sd:list, 
                            visur:str, 
                            file_path:str, 
-                           data:list):
+                           data:list,
+                           bildformat:str="png",
+                           markdown_datei:bool=True):
     """
     Exportiert ein Trigonometrisches Höhenbestimmungsprotokoll als Markdown- und PDF-Datei.
 
@@ -187,6 +636,7 @@ def export_protocol_md_pdf(df300_new,
     - Footer mit Messparametern, statistischen Kennwerten und Präanalyse-Komponenten
     - PDF-Erstellung über WeasyPrint (Markdown -> HTML -> PDF)
     - PDF im Querformat (A4), saubere Schriftart (Arial) und Zeilenabstand
+    - Grafiken als PNG-Dateien (300 dpi) oder als Vektorgrafik (SVG) direkt im PDF eingebettet
 
     Parameter:
     ----------
@@ -207,6 +657,12 @@ def export_protocol_md_pdf(df300_new,
         Pfad zum Verzeichnis, in dem Markdown- und PDF-Dateien gespeichert werden.
     data : list
         Messparameter: [Signalhöhe A, Offset A, Signalhöhe B, Offset B].
+    bildformat : str, optional (Standard: "png")
+        "png": Grafiken werden als PNG im Ordner gespeichert und im PDF referenziert.
+        "svg": Grafiken werden im Speicher als SVG gerendert und als data-URL eingebettet
+        (keine Bilddateien, kleinere PDFs, schnelleres Rendering).
+    markdown_datei : bool, optional (Standard: True)
+        Ob das Protokoll zusätzlich als Markdown-Datei gespeichert wird.
 
     Rückgabe:
     ---------
@@ -214,144 +670,119 @@ def export_protocol_md_pdf(df300_new,
         Das Protokoll wird als Markdown- und PDF-Datei gespeichert; es erfolgt keine Rückgabe.
     """
 
+    formate = ["pdf"] + (["png"] if bildformat == "png" else []) + (["md"] if markdown_datei else [])
+    exportieren(ExportKontext(df300_new, infos_vis, infos_height, infos_k, infos_sd, visur, file_path, data, formate))
+
+def export_kampagne_pdf(ergebnisse,
+                        file_path:str,
+                        dateiname:str="Kampagne_Protokoll.pdf",
+                        bildformat:str="svg",
+                        strikt:bool=False):
+    """
+    Exportiert die Protokolle aller Visuren einer Kampagne als ein gemeinsames PDF.
+
+    Funktionen:
+    - Übersichtstabelle aller Visuren auf der ersten Seite
+    - pro Visur dasselbe Protokoll wie in `export_protocol_md_pdf`, jeweils auf einer neuen Seite
+    - ein einziges HTML-Dokument und ein einziger Layoutdurchgang von WeasyPrint
+    - das Stylesheet wird nur einmal geparst und für alle Seiten verwendet (`protokoll_stylesheet`)
+
+    Parameter:
+    ----------
+    ergebnisse : iterable
+        Ergebnisse der Visuren (z.B. `KampagnenErgebnis` oder Liste von `VisurErgebnis`) mit den
+        Attributen visur, ordner, df300, infos_vis, infos_height, infos_k, infos_sd, data und fehler.
+        Visuren mit Fehler werden übersprungen.
+    file_path : str
+        Pfad zum Verzeichnis, in dem das PDF gespeichert wird.
+    dateiname : str, optional (Standard: "Kampagne_Protokoll.pdf")
+        Name der PDF-Datei.
+    bildformat : str, optional (Standard: "svg")
+        "svg": Grafiken werden im Speicher gerendert und eingebettet.
+        "png": Grafiken werden im jeweiligen Visurordner gespeichert und referenziert.
+    strikt : bool, optional (Standard: False)
+        Fehler weiterreichen statt sie auszugeben und None zurückzugeben (siehe `auswertung_kampagne`).
+
+    Rückgabe:
+    ---------
+    str or None
+        Pfad der PDF-Datei, bei einem Fehler None.
+    """
+
     try:
-        current_time = datetime.now().strftime("%d.%m.%Y / %H:%M")
+        import markdown
+        import tabulate as tl
+        from weasyprint import HTML
 
+        current_time = datetime.now().strftime("%d.%m.%Y / %H:%M")
+        pdf_path = os.path.join(file_path, dateiname)
+
+        ergebnisse = [e for e in ergebnisse if getattr(e, "fehler", None) is None and e.df300 is not None]
+
+        ## <----------------------------------------------------------------------------------->
+        ## Übersichtstabelle der Kampagne
+        zeilen = [[e.visur,
+                   e.infos_vis[0],
+                   e.infos_vis[1],
+                   len(e.df300),
+                   e.infos_height[0],
+                   e.infos_height[1],
+                   e.infos_height[2],
+                   e.infos_sd[0],
+                   e.infos_k[0],
+                   e.infos_vis[2]] for e in ergebnisse]
 
-        # Markdown-kompatible Tabelle
         tbl_str = tl.tabulate(
-            df300_new,
-            headers="keys",
+            zeilen,
+            headers=["Visur", "Startpunkt (A)", "Endpunkt (B)", "Messungen",
+                     "Höhendiff. Näherung [m]", "Höhendiff. Mittel [m]", "1σ [m]",
+                     "Schrägdistanz Mittel [m]", "Refraktionskoeff. k", "Präanalyse 1σ [mm]"],
             tablefmt="github",
-            showindex=True,
-            floatfmt=(".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".4f", ".2f")
+            floatfmt=("", "", "", "", ".4f", ".4f", ".4f", ".4f", ".2f", ".2f")
         )
 
-        header = [
-            f"# Trigonometrische Höhenbestimmung - Protokoll der Auswertung",
-            f"**Visur ID:** {visur}  ",
+        uebersicht = [
+            f"# Trigonometrische Höhenbestimmung - Kampagnenprotokoll",
+            f"**Anzahl Visuren:** {len(ergebnisse)}  ",
             f"**Ausgewertet am:** {current_time}",
-            "---"
-        ]
-
-        footer = [
-            "---",
-            "## Angegebene Parameter der Messung",
-            f" - Instrumentenhöhe Station A: {data[0] - data[1]} m",
-            f" - Offset Station A: {data[1]} m",
-            f" - Signalhöhe Station A: {data[0]} m",
-            f" - Instrumentenhöhe Station B: {data[2] - data[3]} m",               
-            f" - Instrumentenoffset Station B: {data[3]} m",
-            f" - Signalhöhe Station B: {data[2]} m",
-            f" - Startpunkt (A): {infos_vis[0]} // Endpunkt (B): {infos_vis[1]}",
-            "---",
-            "## Höhenstatistiken",
-            f"- Höhendifferenz (Näherungskoordinaten): {infos_height[0]} m",
-            f"- Mittlere Höhendifferenz inkl. 1σ: {infos_height[1]} m ± {infos_height[2]} m",
-            f"- Mittlere Höhendifferenz (Lage 1) inkl. 1σ: {infos_height[3]} m ± {infos_height[4]} m",
-            f"- Mittlere Höhendifferenz (Lage 2) inkl. 1σ: {infos_height[5]} m ± {infos_height[6]} m",
             "---",
-            "## Schrägdistanzstatistik",
-            f"- Mittlere Schrägdistanz inkl. 1σ: {infos_sd[0]} m ± {infos_sd[1]} m",
-            f"- Mittlere Schrägdistanz (Lage 1) inkl. 1σ: {infos_sd[2]} m ± {infos_sd[3]} m",
-            f"- Mittlere Schrägdistanz (Lage 2) inkl. 1σ: {infos_sd[4]} m ± {infos_sd[5]} m",
-            "---",
-            "## Refraktionskoeffizienten",
-            f"- Mittlerer Refraktionskoeffizient inkl. 1σ: {infos_k[0]} ± {infos_k[1]}",
-            f"- Mittlerer Refraktionskoeffizient (Lage 1) inkl. 1σ: {infos_k[2]} ± {infos_k[3]}",
-            f"- Mittlerer Refraktionskoeffizient (Lage 2) inkl. 1σ: {infos_k[4]} ± {infos_k[5]}",
-            "---",
-            "## Präanalyse",
-            f"#### Genauigkeit der Höhenbestimmung (1σ): {infos_vis[2]:.2f} mm // {infos_vis[2]/1000:.4f} m ",
-            "#### Die Komponenten der Präanalyse in 1σ (in mm):",
-            f"- Distanzkomponente: {infos_vis[3][0]:.2f} mm",
-            f"- Zenitwinkelkomponente: {infos_vis[3][1]:.2f} mm",
-            f"- Refraktionskomponente: {infos_vis[3][2]:.2f} mm (bei gleichzeitiger Messung vernachlässigt)",
-            f"- Genauigkeit Instrumentenhöhe: {infos_vis[3][3]:.2f} mm",
-            f"- Genauigkeit Signalhöhe: {infos_vis[3][4]:.2f} mm"
+            "",
+            tbl_str
         ]
-
-        # Markdown zusammenbauen
-        full_md = "\n".join(header) + "\n\n" + tbl_str + "\n\n" + "\n".join(footer)
-
-        # Pfade für Markdown und PDF
-        md_path = os.path.join(file_path, visur + "_Protokoll.md")
-        pdf_path = os.path.join(file_path, visur + "_Protokoll.pdf")
-
-        ## Bilder für Protokoll erstellen
-        boxplot_path = Path(os.path.join(file_path, visur + "_Boxplot_Höhendifferenz.png"))
-        scatterplot_path = Path(os.path.join(file_path, visur + "_Scatterplot_Verteilung_Winkel.png"))
-
-        ax1 = boxplot_beaut(df300_new, visur)
-        ax1.figure.savefig(boxplot_path, bbox_inches='tight', dpi=300)
-
-        ax2 = scatterplot_vwinkel(df300_new, visur)
-        ax2.figure.savefig(scatterplot_path, bbox_inches='tight', dpi=300)
-
-        ## Bilder im HTML-String hinzufügen
-        img_html = f"""
-        <div style='margin-top:30px;'>
-          <h2 style='text-align:center;'>Visualisierung der Messergebnisse</h2>
-          <div style='display: flex; justify-content: space-between; align-items: flex-start;'>
-            <div style='width:48%; text-align: center;'>
-              <img src="{path_to_file_url(boxplot_path)}" style="max-width:100%; max-height:550px; object-fit: contain;" />
-            </div>
-            <div style='width:48%; text-align: center;'>
-              <img src="{path_to_file_url(scatterplot_path)}" style="max-width:100%; max-height:550px; object-fit: contain;" />
+        uebersicht_md = "\n".join(uebersicht)
+        ## <----------------------------------------------------------------------------------->
+
+        ## <----------------------------------------------------------------------------------->
+        ## Protokolle aller Visuren, jeweils auf einer neuen Seite
+        abschnitte = [f"""
+        <div class="dokument">{dateiname}</div>
+        {markdown.markdown(uebersicht_md, extensions=['tables'])}
+        """]
+
+        for e in ergebnisse:
+            kontext = ExportKontext.aus_ergebnis(e, ["png"] if bildformat == "png" else [])
+            abschnitte.append(f"""
+            <div class="visur">
+            {kontext.html}
             </div>
-          </div>
-        </div>
-        """
+            """)
+        ## <----------------------------------------------------------------------------------->
 
-        # Markdown speichern
-        with open(md_path, "w", encoding="utf-8") as f:
-            f.write(full_md)
-
-        # HTML für WeasyPrint mit Querformat und dynamischen Spalten
         html_text = f"""
         <html>
-        <head>
-        <style>
-        @page {{
-            size: A4 landscape;
-            margin: 20mm;
-            @bottom-left {{
-                content: "{visur}_Protokoll.md";
-                font-size: 8pt;
-            }}
-            @bottom-right {{
-                content: "Seite " counter(page) " / " counter(pages);
-                font-size: 8pt;
-            }}
-        }}
-        body {{
-            font-family: Arial, sans-serif;
-            font-size: 10pt;
-            line-height: 1.4;
-        }}
-        table {{
-            border-collapse: collapse;
-            font-size: 8pt; 
-        }}
-        th, td {{
-            padding: 4px 6px;
-            border: 1px solid #333;
-            text-align: center;
-        }}
-        th {{
-            background-color: #f2f2f2;
-        }}
-        </style>
-        </head>
         <body>
-        {markdown.markdown(full_md, extensions=['tables'])}
-        {img_html}
+        {"".join(abschnitte)}
         </body>
         </html>
         """
 
-        # PDF erzeugen
-        HTML(string=html_text).write_pdf(pdf_path)
+        # PDF in einem Durchgang erzeugen
+        HTML(string=html_text).write_pdf(pdf_path, stylesheets=[protokoll_stylesheet()])
+
+        return pdf_path
 
     except Exception as e:
-        print(f"Fehler beim Exportieren der Protokolldatei: {e}")
+        if strikt:
+            raise
+        print(f"Fehler beim Exportieren des Kampagnenprotokolls: {e}")
+        return None
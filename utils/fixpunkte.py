@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from utils.imports import import_fix
+
+
+class FixpunktRegister:
+    """
+    Register der Näherungskoordinaten mit Hash-Index auf der Punktnummer.
+
+    Das Register wird einmal aus dem Ergebnis von `import_fix` aufgebaut. Die Werte liegen
+    kompakt als float-Arrays vor (E, N, H, Geoid, Xi, Eta), der Zugriff über die Punktnummer
+    erfolgt in O(1) und für ganze Arrays von Punktnummern in einem Aufruf (`index`, `werte`).
+
+    Parameter:
+    ----------
+    df_aprox : pandas.DataFrame
+        Näherungskoordinaten mit den Spalten 'PktNr', 'E-Koord', 'N-Koord', 'Hoehe', 'Geoid', 'Xi', 'Eta'.
+        Bei doppelten Punktnummern gilt der erste Eintrag.
+    """
+
+    SPALTEN = ["E-Koord", "N-Koord", "Hoehe", "Geoid", "Xi", "Eta"]
+
+    def __init__(self, df_aprox):
+        df = df_aprox.drop_duplicates("PktNr", keep="first")
+
+        self.pktnr = pd.Index(df["PktNr"].astype(str).to_numpy(dtype=object), name="PktNr")
+        self.daten = np.ascontiguousarray(df[self.SPALTEN].to_numpy(dtype=float))
+
+        ## Spalten als Sichten auf das kompakte Array
+        self.E = self.daten[:, 0]
+        self.N = self.daten[:, 1]
+        self.H = self.daten[:, 2]
+        self.Geoid = self.daten[:, 3]
+        self.Xi = self.daten[:, 4]
+        self.Eta = self.daten[:, 5]
+
+    @classmethod
+    def aus_datei(cls, file_path:str):
+        """
+        Erstellt das Register direkt aus einer FP-Datei (siehe `import_fix`).
+        """
+        return cls(import_fix(file_path))
+
+    def __len__(self):
+        return len(self.pktnr)
+
+    def __contains__(self, pktnr):
+        return str(pktnr) in self.pktnr
+
+    def index(self, pktnr, strikt:bool=True):
+        """
+        Liefert die Positionen der Punktnummern im Register (vektorisiert).
+
+        Parameter:
+        ----------
+        pktnr : str or array-like
+            Eine oder mehrere Punktnummern.
+        strikt : bool, optional (Standard: True)
+            Bei True wird für unbekannte Punktnummern ein KeyError ausgelöst, sonst wird -1 geliefert.
+
+        Rückgabe:
+        ---------
+        int or numpy.ndarray
+            Position(en) im Register.
+        """
+
+        skalar = np.ndim(pktnr) == 0
+        ids = np.atleast_1d(np.asarray(pktnr, dtype=object)).astype(str)
+        pos = self.pktnr.get_indexer(ids)
+
+        if strikt and (pos < 0).any():
+            raise KeyError(f"Punkt(e) nicht in den Näherungskoordinaten: {sorted(set(ids[pos < 0]))}")
+
+        return int(pos[0]) if skalar else pos
+
+    def werte(self, spalte:str, pktnr):
+        """
+        Liefert die Werte einer Spalte für ein Array von Punktnummern; unbekannte Punkte ergeben NaN.
+
+        Parameter:
+        ----------
+        spalte : str
+            Eine der Spalten 'E-Koord', 'N-Koord', 'Hoehe', 'Geoid', 'Xi', 'Eta'.
+        pktnr : array-like
+            Punktnummern.
+
+        Rückgabe:
+        ---------
+        numpy.ndarray
+            Werte als float-Array.
+        """
+
+        pos = self.index(pktnr, strikt=False)
+        werte = self.daten[pos, self.SPALTEN.index(spalte)]
+
+        return np.where(pos >= 0, werte, np.nan)
+
+    def zu_dataframe(self):
+        """
+        Gibt das Register wieder im Aufbau von `import_fix` zurück.
+        """
+        df = pd.DataFrame(self.daten, columns=self.SPALTEN)
+        df.insert(0, "PktNr", self.pktnr.to_numpy())
+        return df
+
+
+def als_register(df_aprox):
+    """
+    Liefert ein `FixpunktRegister` zu den Näherungskoordinaten; ein bestehendes Register wird unverändert zurückgegeben.
+    """
+
+    if isinstance(df_aprox, FixpunktRegister):
+        return df_aprox
+    return FixpunktRegister(df_aprox)
@@ -1,11 +1,95 @@
+import codecs
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 
-def import_csv(file_path:str):
+## Version der Importfunktionen; bei Änderungen am Ergebnis der Importer erhöhen (macht den Cache ungültig)
+IMPORT_VERSION = 1
+
+## Benötigte Spalten der Messdateien mit ihren Datentypen (siehe `import_csv_fast` und `utils.validierung`)
+MESS_DTYPES = {"PunktNr": str, "Lage": str, "Punktklasse": str, "Datum": str, "Uhrzeit": str,
+               "Hz-Winkel": float, "V-Winkel": float, "Schrägdistanz": float, "Atmos PPM": float}
+
+## Format von "Datum" und "Uhrzeit" in den Leica-Exporten (siehe `messzeitpunkte`)
+ZEITFORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+def detect_encoding(file_path:str):
+    """
+    Erkennt das Encoding einer Text-/CSV-Datei und speichert das Ergebnis zwischen.
+
+    Die Erkennung prüft die ersten 64 kB der Datei: UTF-8 (mit oder ohne BOM), sonst cp1252
+    (Standard der Leica-Exporte unter Windows) und als Rückfall latin-1. Das Ergebnis wird
+    pro Datei (Pfad, Grösse, Änderungszeit) zwischengespeichert, sodass jede Datei nur
+    einmal geprüft wird. Ersetzt das nur unter Windows verfügbare "mbcs"-Encoding.
+
+    Parameters
+    ----------
+    file_path : str
+        Pfad zur Datei.
+
+    Returns
+    -------
+    str
+        Name des Encodings für `pd.read_csv`.
+    """
+
+    stat = os.stat(file_path)
+    return _detect_encoding(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=1024)
+def _detect_encoding(file_path:str, size:int, mtime:int):
+    with open(file_path, "rb") as f:
+        probe = f.read(64 * 1024)
+
+    if probe.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    try:
+        ## final=False: ein am Blockende abgeschnittenes Mehrbytezeichen ist kein Fehler
+        codecs.getincrementaldecoder("utf-8")().decode(probe, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        probe.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def messzeitpunkte(df):
+    """
+    Bildet die Messzeitpunkte aus den Spalten "Datum" und "Uhrzeit" (siehe `import_csv`).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Messdaten mit den Spalten "Datum" und "Uhrzeit" als Text.
+
+    Returns
+    -------
+    numpy.ndarray of datetime64[ns]
+        Zeitpunkt pro Zeile; NaT, falls die Spalten fehlen oder nicht dem `ZEITFORMAT` entsprechen.
+    """
+
+    if "Datum" not in df.columns or "Uhrzeit" not in df.columns:
+        return np.full(len(df), np.datetime64("NaT", "ns"))
+
+    text = df["Datum"].astype(str) + " " + df["Uhrzeit"].astype(str)
+    return pd.to_datetime(text, format=ZEITFORMAT, errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def import_csv(file_path:str, strikt:bool=False):
     """
     Importiert eine Vermessungs-CSV-Datei und bereitet die Daten für die trigonometrische Höhenbestimmung auf.
 
     Die Funktion:
-    - Liest die CSV-Datei ein (mit Semikolon als Trennzeichen und MBCS-Encoding)
+    - Liest die CSV-Datei ein (mit Semikolon als Trennzeichen, Encoding über `detect_encoding`)
     - Entfernt Referenzstationen ("REF") aus den Daten
     - Wandelt Spalten in die passenden Datentypen um
     - Führt Distanzkorrekturen durch (PPM-Atmos)
@@ -16,6 +100,8 @@ def import_csv(file_path:str):
     ----------
     file_path : str
         Pfad zur CSV-Datei, die importiert werden soll.
+    strikt : bool, optional
+        Fehler weiterreichen statt sie auszugeben und None zurückzugeben (siehe `utils.validierung`).
 
     Returns
     -------
@@ -30,7 +116,7 @@ def import_csv(file_path:str):
         - "Hz-Winkel" : Horizontalwinkel
         - "V-Winkel" : Vertikalwinkel
         - "Ds" : korrigierte Schrägdistanz
-        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben.
+        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben (ausser mit `strikt`).
     """
 
     col2drop = ["Station", "Station (R)", "Station (H)", "Station (oH)", "Rechtswert", 
@@ -47,7 +133,7 @@ def import_csv(file_path:str):
 
     try:
         ## Read csv file: Points_Protokoll_IGEO ohne Header
-        df = pd.read_csv(file_path, delimiter=";", encoding="mbcs")
+        df = pd.read_csv(file_path, delimiter=";", encoding=detect_encoding(file_path), engine="c")
 
         ## Löschung der Stationen
         df = df.astype({"Punktklasse": str})
@@ -82,16 +168,74 @@ def import_csv(file_path:str):
         return df
     
     except Exception as e:
+        if strikt:
+            raise
+        print(f"Error importing CSV file: {e}")
+        return None
+    
+
+def import_csv_fast(file_path:str, strikt:bool=False):
+    """
+    Schneller Import einer Vermessungs-CSV-Datei (Leica "Points_Protokoll_IGEO") mit demselben Ergebnis wie `import_csv`.
+
+    Im Unterschied zu `import_csv`:
+    - Es werden nur die benötigten Spalten mit festen Datentypen eingelesen
+      (PunktNr, Lage, Punktklasse, Datum, Uhrzeit, Hz-Winkel, V-Winkel, Schrägdistanz, Atmos PPM)
+    - Die Platzhalter "---" der Referenzstationen werden direkt beim Einlesen als NaN gelesen,
+      die Referenzstationen ("REF") anschliessend mit einer einzigen Maske entfernt
+    - Die Punktnummer wird in einem einzigen Durchgang in Startpunkt, Zielpunkt und ID aufgeteilt
+
+    Parameters
+    ----------
+    file_path : str
+        Pfad zur CSV-Datei, die importiert werden soll.
+    strikt : bool, optional
+        Fehler weiterreichen statt sie auszugeben und None zurückzugeben (siehe `utils.validierung`).
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        Aufbereitetes DataFrame mit denselben Spalten wie bei `import_csv`.
+        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben (ausser mit `strikt`).
+    """
+
+    try:
+        ## Read csv file: nur benötigte Spalten
+        df = pd.read_csv(file_path, delimiter=";", encoding=detect_encoding(file_path), engine="c",
+                         usecols=list(MESS_DTYPES), dtype=MESS_DTYPES, na_values=["---"])
+
+        ## Löschung der Stationen
+        df = df[df["Punktklasse"] != "REF"]
+
+        ## Distanzkorrektur und Splicen der Punktnummer (Positionen wie bei import_csv)
+        ds = df["Schrägdistanz"] + (((df["Schrägdistanz"]/1_000)*df["Atmos PPM"])/1_000)
+        pktnr = df["PunktNr"].str.extract(r"^(.{0,4}).?(.{0,4}).?(.{0,5})")
+
+        df = pd.DataFrame({"Datum": df["Datum"],
+                           "Uhrzeit": df["Uhrzeit"],
+                           "Standpkt": pktnr[0],
+                           "Zielpkt": pktnr[1],
+                           "Lage": df["Lage"],
+                           "ID": pktnr[2],
+                           "Hz-Winkel": df["Hz-Winkel"],
+                           "V-Winkel": df["V-Winkel"],
+                           "Ds": ds})
+
+        return df
+
+    except Exception as e:
+        if strikt:
+            raise
         print(f"Error importing CSV file: {e}")
         return None
     
 
-def import_fix(file_path:str):
+def import_fix(file_path:str, strikt:bool=False):
     """
     Importiert eine Fixpunkt-CSV-Datei (FP-Datei) und bereitet die Daten für die weitere Verarbeitung auf.
 
     Die Funktion:
-    - Liest die CSV-Datei ein (mit Semikolon als Trennzeichen und MBCS-Encoding)
+    - Liest die CSV-Datei ein (mit Semikolon als Trennzeichen, Encoding über `detect_encoding`)
     - Setzt die Datentypen für die relevanten Spalten
     - Füllt fehlende Werte (NaN) mit 0 auf
 
@@ -99,6 +243,8 @@ def import_fix(file_path:str):
     ----------
     file_path : str
         Pfad zur FP-CSV-Datei, die importiert werden soll.
+    strikt : bool, optional
+        Fehler weiterreichen statt sie auszugeben und None zurückzugeben.
 
     Returns
     -------
@@ -111,11 +257,11 @@ def import_fix(file_path:str):
         - "Geoid" : Geoid-Höhe (float)
         - "Xi" : xi-Korrektur (float)
         - "Eta" : eta-Korrektur (float)
-        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben.
+        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben (ausser mit `strikt`).
     """
 
     try:
-        df = pd.read_csv(file_path, delimiter=";", encoding="mbcs")
+        df = pd.read_csv(file_path, delimiter=";", encoding=detect_encoding(file_path), engine="c")
         df = df.astype({"PktNr": str, "E-Koord": float, "N-Koord": float, "Hoehe": float,
                         "Geoid": float, "Xi": float, "Eta": float})
         
@@ -124,5 +270,48 @@ def import_fix(file_path:str):
         return df
     
     except Exception as e:
+        if strikt:
+            raise
         print(f"Error importing FP-file: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def import_instr(file_path:str, strikt:bool=False):
+    """
+    Importiert die Datei mit den Instrumentenparametern (Signalhöhen und Offsets) aller Visuren.
+
+    Die Funktion:
+    - Liest die CSV-Datei ein (mit Semikolon als Trennzeichen, Encoding über `detect_encoding`)
+    - Setzt die Datentypen für die relevanten Spalten
+
+    Parameters
+    ----------
+    file_path : str
+        Pfad zur InstrHoehe-CSV-Datei, die importiert werden soll.
+    strikt : bool, optional
+        Fehler weiterreichen statt sie auszugeben und None zurückzugeben.
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        DataFrame mit den Spalten:
+        - "Nr" : Laufnummer der Visur (int)
+        - "ID" : ID der Visur, z.B. "Visur_1003-1009" (str)
+        - "signal_A" : Signalhöhe Station A (float)
+        - "offset_A" : Offset Station A (float)
+        - "signal_B" : Signalhöhe Station B (float)
+        - "offset_B" : Offset Station B (float)
+        Im Fehlerfall wird `None` zurückgegeben und eine Fehlermeldung ausgegeben (ausser mit `strikt`).
+    """
+
+    try:
+        df = pd.read_csv(file_path, delimiter=";", encoding=detect_encoding(file_path), engine="c")
+        df = df.astype({"Nr": int, "ID": str, "signal_A": float, "offset_A": float,
+                        "signal_B": float, "offset_B": float})
+
+        return df
+
+    except Exception as e:
+        if strikt:
+            raise
+        print(f"Error importing InstrHoehe-file: {e}")
+        return None
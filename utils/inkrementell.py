@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import asdict
+from pathlib import Path
+
+import pandas as pd
+
+from utils.ausreisser import KEINE
+from utils.auto import KampagnenErgebnis, _kampagnen_pdf, auswertung_kampagne, instr_parameter, visuren_finden
+from utils.cache import cached_import
+from utils.calculate import BERECHNUNG_VERSION
+from utils.fixpunkte import FixpunktRegister
+from utils.imports import IMPORT_VERSION, import_csv_fast, import_fix, import_instr
+from utils.unsicherheit import JACOBI, Genauigkeiten
+
+## Ablage des Manifests und der Zwischenergebnisse im Ordner "_all-data"
+MANIFEST = "manifest.json"
+ERGEBNIS_ORDNER = "visuren"
+
+## Versionen, unter denen Manifest und Zwischenergebnisse gültig sind
+VERSION = {"import": IMPORT_VERSION, "berechnung": BERECHNUNG_VERSION}
+
+
+def datei_hash(file_path:str):
+    """
+    Berechnet den SHA256-Hash des Inhalts einer Datei (blockweise gelesen).
+    """
+
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def visur_punkte(v, cache_dir:str=None):
+    """
+    Liefert die Punktnummern (Standpkt und Zielpkt) aus beiden Messdateien einer Visur,
+    also genau die Punkte, deren Näherungskoordinaten `master_thb` nachschlägt.
+    Kann eine Datei nicht importiert werden, wird None zurückgegeben.
+    """
+
+    punkte = set()
+    for file_path in (v.csv_A2B, v.csv_B2A):
+        try:
+            if cache_dir is None:
+                df = import_csv_fast(file_path, strikt=True)
+            else:
+                df = cached_import(file_path, import_csv_fast, cache_dir, strikt=True)
+        except Exception:
+            return None
+        punkte.update(df["Standpkt"].dropna().astype(str))
+        punkte.update(df["Zielpkt"].dropna().astype(str))
+
+    return sorted(punkte)
+
+
+def eingabe_hash(v, df_instr, fix:FixpunktRegister, einstellungen:dict=None, cache_dir:str=None):
+    """
+    Bildet den Hash aller Eingaben einer Visur.
+
+    Berücksichtigt werden der Inhalt beider Messdateien, die Zeile der Instrumentenparameter,
+    die Näherungskoordinaten der in den Messdateien referenzierten Punkte, die Einstellungen
+    der Auswertung sowie die Versionen von Import und Berechnung.
+
+    Parameter:
+    ----------
+    v : VisurOrdner
+        Visur aus `visuren_finden`.
+    df_instr : pandas.DataFrame
+        Instrumentenparameter (siehe `import_instr`).
+    fix : FixpunktRegister
+        Näherungskoordinaten.
+    einstellungen : dict, optional (Standard: None)
+        Einstellungen der Auswertung (Methode, Ausreisserverfahren, Genauigkeiten).
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`).
+
+    Rückgabe:
+    ---------
+    str
+        SHA256-Hash als Hex-String.
+    """
+
+    try:
+        data = [float(x) for x in instr_parameter(df_instr, v)]
+    except IndexError:
+        data = None
+
+    punkte = None
+    nummern = visur_punkte(v, cache_dir)
+    if nummern is not None:
+        punkte = {}
+        for pkt in nummern:
+            pos = fix.index(pkt, strikt=False)
+            punkte[pkt] = fix.daten[pos].tolist() if pos >= 0 else None
+
+    eingaben = {"csv_A2B": datei_hash(v.csv_A2B),
+                "csv_B2A": datei_hash(v.csv_B2A),
+                "instr": data,
+                "punkte": punkte,
+                "einstellungen": einstellungen,
+                "version": VERSION}
+
+    return hashlib.sha256(json.dumps(eingaben, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def auswertung_inkrementell(base_path,
+                            InstrHoehe:str,
+                            fix:str,
+                            exportieren:bool=True,
+                            n_jobs:int=1,
+                            cache_dir:str=None,
+                            erzwingen:bool=False,
+                            formate:tuple=None,
+                            kampagnen_pdf:bool=False,
+                            fail_fast:bool=False,
+                            methode:str=JACOBI,
+                            ausreisser:str=KEINE,
+                            genauigkeiten:Genauigkeiten=None):
+    """
+    Wertet nur die Visuren neu aus, deren Eingaben sich seit dem letzten Lauf geändert haben.
+
+    Im Ordner "_all-data" wird ein Manifest mit dem Eingabe-Hash pro Visur geführt (siehe `eingabe_hash`)
+    und das Ergebnis jeder Visur zwischengespeichert. Geänderte oder neue Visuren werden berechnet
+    und exportiert, für alle anderen wird das gespeicherte Ergebnis verwendet. Stimmen die Versionen
+    im Manifest nicht mit `VERSION` überein, werden Manifest und Zwischenergebnisse verworfen. Anschliessend werden
+    die Gesamtauswertungen der Kampagne aus allen Ergebnissen neu geschrieben
+    ("Kampagne_Auswertung.csv" und "Kampagne_Statistik.csv").
+
+    Parameter:
+    ----------
+    base_path : pathlib.Path
+        Basisordner mit einem Unterordner pro Visur.
+    InstrHoehe : str
+        Pfad zur Datei mit den Instrumentenparametern.
+    fix : str
+        Pfad zur Datei mit den Näherungskoordinaten.
+    exportieren : bool, optional (Standard: True)
+        Ob die Protokolle und CSV-Dateien der neu berechneten Visuren geschrieben werden.
+    n_jobs : int, optional (Standard: 1)
+        Anzahl Prozesse für die Auswertung der geänderten Visuren.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`).
+    erzwingen : bool, optional (Standard: False)
+        Alle Visuren unabhängig vom Manifest neu auswerten.
+    formate : tuple of str, optional (Standard: None)
+        Zu schreibende Dateien pro Visur (siehe `export_visur`); None schreibt alle.
+    kampagnen_pdf : bool, optional (Standard: False)
+        Ob zusätzlich ein gemeinsames PDF aller Visuren in "_all-data" geschrieben wird
+        (siehe `export_kampagne_pdf`).
+    fail_fast : bool, optional (Standard: False)
+        Bei der ersten ungültigen Visur abbrechen (siehe `auswertung_kampagne`).
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung für die Präanalyse (siehe `auswertung_kampagne`).
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung (siehe `auswertung_kampagne`).
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten für die Präanalyse; None verwendet die Standardwerte.
+
+    Rückgabe:
+    ---------
+    KampagnenErgebnis
+        Ergebnisse aller Visuren; `neu_berechnet` enthält die IDs der neu ausgewerteten Visuren.
+    """
+
+    ## <----------------------------------------------------------------------------------->
+    ## Manifest und Eingaben laden
+    all_data = Path(base_path) / "_all-data"
+    ergebnis_ordner = all_data / ERGEBNIS_ORDNER
+    ergebnis_ordner.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = all_data / MANIFEST
+    manifest = {}
+    if manifest_path.exists() and not erzwingen:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            gespeichert = json.load(f)
+
+        if gespeichert.get("version") == VERSION:
+            manifest = gespeichert["visuren"]
+        else:
+            ## Andere Version: alle Zwischenergebnisse verwerfen
+            for pkl in ergebnis_ordner.glob("*.pkl"):
+                pkl.unlink()
+
+    ordner = visuren_finden(base_path)
+    df_instr = import_instr(InstrHoehe)
+    register = FixpunktRegister(import_fix(fix))
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Geänderte Visuren bestimmen
+    einstellungen = {"methode": methode,
+                     "ausreisser": ausreisser,
+                     "genauigkeiten": asdict(genauigkeiten or Genauigkeiten())}
+    hashes = {v.visur: eingabe_hash(v, df_instr, register, einstellungen, cache_dir) for v in ordner}
+
+    geaendert = [v for v in ordner
+                 if manifest.get(v.visur) != hashes[v.visur]
+                 or not (ergebnis_ordner / f"{v.visur}.pkl").exists()]
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Neu berechnen, exportieren und Ergebnisse ablegen
+    neu = auswertung_kampagne(base_path, InstrHoehe, fix,
+                              exportieren=exportieren,
+                              n_jobs=n_jobs,
+                              cache_dir=cache_dir,
+                              visuren=geaendert,
+                              formate=formate,
+                              fail_fast=fail_fast,
+                              methode=methode,
+                              ausreisser=ausreisser,
+                              genauigkeiten=genauigkeiten)
+
+    for ergebnis in neu:
+        if ergebnis.fehler is not None:
+            manifest.pop(ergebnis.visur, None)
+            continue
+
+        with open(ergebnis_ordner / f"{ergebnis.visur}.pkl", "wb") as f:
+            pickle.dump((ergebnis, neu.df_stats.loc[[ergebnis.visur]]), f)
+
+        manifest[ergebnis.visur] = hashes[ergebnis.visur]
+
+    ## Nicht mehr vorhandene Visuren aus dem Manifest entfernen
+    manifest = {visur: h for visur, h in manifest.items() if visur in hashes}
+
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "visuren": manifest}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Gesamtauswertung aus allen gespeicherten Ergebnissen
+    fehler = {e.visur: e for e in neu if e.fehler is not None}
+    kampagne = KampagnenErgebnis(neu_berechnet=[v.visur for v in geaendert])
+    stats = []
+
+    for v in ordner:
+        if v.visur in fehler:
+            kampagne.visuren.append(fehler[v.visur])
+            continue
+
+        with open(ergebnis_ordner / f"{v.visur}.pkl", "rb") as f:
+            ergebnis, df_stats = pickle.load(f)
+
+        kampagne.visuren.append(ergebnis)
+        stats.append(df_stats)
+
+    if stats:
+        kampagne.df300 = pd.concat([e.df300 for e in kampagne if e.fehler is None], ignore_index=True)
+        kampagne.df_stats = pd.concat(stats)
+
+        kampagne.df300.to_csv(all_data / "Kampagne_Auswertung.csv", index=False, sep=";")
+        kampagne.df_stats.to_csv(all_data / "Kampagne_Statistik.csv", sep=";")
+
+    if kampagnen_pdf:
+        _kampagnen_pdf(base_path, kampagne, fail_fast)
+    ## <----------------------------------------------------------------------------------->
+
+    return kampagne
@@ -0,0 +1,231 @@
+import importlib.util
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+## Aktiver Laufbericht und aktuelle Visur; ohne aktiven Bericht sind alle Messfunktionen wirkungslos
+_bericht = ContextVar("laufbericht", default=None)
+_visur = ContextVar("visur", default=None)
+
+## Dateinamen im Ordner "_all-data"
+BERICHT = "Laufbericht.json"
+PROFIL_CPROFILE = "Laufbericht.prof"
+PROFIL_PYINSTRUMENT = "Laufbericht_Profil.html"
+
+
+@dataclass
+class Messung:
+    """
+    Eine gemessene Stufe: Wall- und CPU-Zeit in Sekunden und Anzahl verarbeiteter Zeilen.
+    """
+    stufe: str
+    visur: str = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    zeilen: int = None
+
+
+class Laufbericht:
+    """
+    Sammelt die Messungen eines Auswertungslaufes (pro Stufe und Visur) und optional ein Profil.
+
+    Parameter:
+    ----------
+    profil : str, optional (Standard: None)
+        "cprofile" oder "pyinstrument" (falls installiert) für ein Profil des ganzen Laufes.
+    """
+
+    def __init__(self, profil:str=None):
+        if profil not in (None, "cprofile", "pyinstrument"):
+            raise ValueError(f"Unbekannter Profiler '{profil}' (möglich: 'cprofile', 'pyinstrument').")
+        if profil == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+            raise ValueError("Der Profiler 'pyinstrument' ist nicht installiert.")
+
+        self.profil = profil
+        self.messungen = []
+        self.start = datetime.now()
+        self.dauer_s = None
+        self._profiler = None
+
+    def hinzufuegen(self, messung:Messung):
+        self.messungen.append(messung)
+
+    def zusammenfassung(self):
+        """
+        Summen pro Stufe: {Stufe: {"anzahl", "wall_s", "cpu_s", "zeilen"}}, sortiert nach Wall-Zeit.
+        """
+
+        stufen = {}
+        for m in self.messungen:
+            s = stufen.setdefault(m.stufe, {"anzahl": 0, "wall_s": 0.0, "cpu_s": 0.0, "zeilen": 0})
+            s["anzahl"] += 1
+            s["wall_s"] += m.wall_s
+            s["cpu_s"] += m.cpu_s
+            s["zeilen"] += m.zeilen or 0
+        return dict(sorted(stufen.items(), key=lambda s: -s[1]["wall_s"]))
+
+    def pro_visur(self):
+        """
+        Messungen pro Visur: {Visur: {Stufe: {"wall_s", "cpu_s", "zeilen"}}}.
+        Messungen über die ganze Kampagne (z.B. die Batch-Berechnung) stehen unter "Kampagne".
+        """
+
+        visuren = {}
+        for m in self.messungen:
+            s = visuren.setdefault(m.visur or "Kampagne", {}).setdefault(m.stufe, {"wall_s": 0.0, "cpu_s": 0.0, "zeilen": 0})
+            s["wall_s"] += m.wall_s
+            s["cpu_s"] += m.cpu_s
+            s["zeilen"] += m.zeilen or 0
+        return visuren
+
+    def als_dict(self):
+        return {"start": self.start.isoformat(timespec="seconds"),
+                "dauer_s": self.dauer_s,
+                "pid": os.getpid(),
+                "profil": self.profil,
+                "stufen": self.zusammenfassung(),
+                "visuren": self.pro_visur(),
+                "messungen": [asdict(m) for m in self.messungen]}
+
+    def speichern(self, ordner):
+        """
+        Schreibt den Bericht als JSON (und ein allfälliges Profil) in den Ordner `ordner`.
+
+        Rückgabe:
+        ---------
+        dict
+            Der gespeicherte Bericht.
+        """
+
+        ordner = Path(ordner)
+        ordner.mkdir(parents=True, exist_ok=True)
+        daten = self.als_dict()
+
+        if self.profil == "cprofile" and self._profiler is not None:
+            import io
+            import pstats
+
+            self._profiler.dump_stats(ordner / PROFIL_CPROFILE)
+            puffer = io.StringIO()
+            pstats.Stats(self._profiler, stream=puffer).sort_stats("cumulative").print_stats(30)
+            daten["profil_top"] = puffer.getvalue()
+        elif self.profil == "pyinstrument" and self._profiler is not None:
+            with open(ordner / PROFIL_PYINSTRUMENT, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+
+        with open(ordner / BERICHT, "w", encoding="utf-8") as f:
+            json.dump(daten, f, indent=2, ensure_ascii=False, default=str)
+
+        return daten
+
+
+@contextmanager
+def aufzeichnen(profil:str=None):
+    """
+    Aktiviert einen `Laufbericht` für alle Messungen innerhalb des with-Blocks.
+
+    Beispiel:
+        with aufzeichnen("cprofile") as lauf:
+            auswertung_kampagne(...)
+        lauf.speichern(base_path / "_all-data")
+    """
+
+    lauf = Laufbericht(profil)
+    token = _bericht.set(lauf)
+
+    if profil == "cprofile":
+        import cProfile
+        lauf._profiler = cProfile.Profile()
+        lauf._profiler.enable()
+    elif profil == "pyinstrument":
+        from pyinstrument import Profiler
+        lauf._profiler = Profiler()
+        lauf._profiler.start()
+
+    t0 = time.perf_counter()
+    try:
+        yield lauf
+    finally:
+        lauf.dauer_s = time.perf_counter() - t0
+        if profil == "cprofile":
+            lauf._profiler.disable()
+        elif profil == "pyinstrument":
+            lauf._profiler.stop()
+        _bericht.reset(token)
+
+
+def aktiv():
+    """
+    True, wenn ein Laufbericht aufgezeichnet wird.
+    """
+    return _bericht.get() is not None
+
+
+def uebernehmen(messungen:list):
+    """
+    Übernimmt Messungen aus einem anderen Prozess (z.B. eines Workers) in den aktiven Bericht.
+    """
+
+    lauf = _bericht.get()
+    if lauf is not None:
+        lauf.messungen.extend(messungen)
+
+
+@contextmanager
+def visur(visur_id:str):
+    """
+    Ordnet alle Messungen innerhalb des with-Blocks der Visur `visur_id` zu.
+    """
+
+    token = _visur.set(visur_id)
+    try:
+        yield
+    finally:
+        _visur.reset(token)
+
+
+@contextmanager
+def stufe(name:str, zeilen:int=None, visur:str=None):
+    """
+    Misst Wall- und CPU-Zeit des with-Blocks als Stufe `name`.
+
+    Liefert die `Messung` (ohne aktiven Bericht eine verworfene); die Anzahl Zeilen kann auch
+    nachträglich gesetzt werden (`m.zeilen = len(df)`).
+    """
+
+    lauf = _bericht.get()
+    if lauf is None:
+        yield Messung(name)
+        return
+
+    m = Messung(name, visur or _visur.get(), zeilen=zeilen)
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield m
+    finally:
+        m.wall_s = time.perf_counter() - t0
+        m.cpu_s = time.process_time() - c0
+        lauf.hinzufuegen(m)
+
+
+class Stoppuhr:
+    """
+    Rundenzeiten innerhalb einer Funktion: jede `runde` misst die Zeit seit der vorherigen Runde.
+    Damit lassen sich aufeinanderfolgende Abschnitte messen, ohne sie in with-Blöcke zu fassen.
+    """
+
+    def __init__(self):
+        self.lauf = _bericht.get()
+        self.t, self.c = time.perf_counter(), time.process_time()
+
+    def runde(self, name:str, zeilen:int=None):
+        if self.lauf is None:
+            return
+        t, c = time.perf_counter(), time.process_time()
+        self.lauf.hinzufuegen(Messung(name, _visur.get(), t - self.t, c - self.c, zeilen))
+        self.t, self.c = t, c
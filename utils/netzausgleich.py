@@ -0,0 +1,264 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+from utils.fixpunkte import als_register
+
+
+@dataclass
+class NetzErgebnis:
+    """
+    Ergebnis der Höhennetzausgleichung.
+
+    Attribute:
+    ----------
+    hoehen : pandas.DataFrame
+        Ausgeglichene Höhen pro Punkt (Index 'PktNr') mit den Spalten 'H [m]', 'σ H [mm]' und 'Fixpunkt'.
+    residuen : pandas.DataFrame
+        Beobachtungen mit Verbesserung 'v [mm]', ausgeglichener Höhendifferenz und normierter Verbesserung.
+    schleifen : pandas.DataFrame
+        Schleifenwidersprüche der unabhängigen Schleifen (Fundamentalzyklen des Netzes).
+    sigma0 : float
+        Empirische Standardabweichung der Gewichtseinheit (a posteriori, a priori = 1).
+    freiheitsgrade : int
+        Anzahl Überbestimmungen (Beobachtungen - Unbekannte).
+    """
+    hoehen: pd.DataFrame
+    residuen: pd.DataFrame
+    schleifen: pd.DataFrame
+    sigma0: float
+    freiheitsgrade: int
+
+
+def beobachtungen(df_stats, df_aprox):
+    """
+    Erstellt die Beobachtungstabelle für die Netzausgleichung aus den Ergebnissen pro Visur.
+
+    `master_thb` liefert die Höhendifferenz als Betrag; das Vorzeichen (Richtung A --> B)
+    wird aus den Näherungshöhen bestimmt. Die Standardabweichung stammt aus der Präanalyse.
+
+    Parameter:
+    ----------
+    df_stats : pandas.DataFrame
+        Statistiktabelle aus `master_thb_batch` bzw. `KampagnenErgebnis.df_stats`
+        (Spalten 'PktNr A', 'PktNr B', 'dH Mittel', 'Praeanalyse').
+    df_aprox : pandas.DataFrame or FixpunktRegister
+        Näherungskoordinaten der Messpunkte.
+
+    Rückgabe:
+    ---------
+    pandas.DataFrame
+        Eine Zeile pro Visur mit den Spalten 'ID Visur', 'von', 'nach', 'dH [m]' (H_nach - H_von) und 'σ [mm]'.
+    """
+
+    fix = als_register(df_aprox)
+
+    von = df_stats["PktNr A"].astype(str).to_numpy()
+    nach = df_stats["PktNr B"].astype(str).to_numpy()
+    vorzeichen = np.sign(fix.werte("Hoehe", nach) - fix.werte("Hoehe", von))
+    vorzeichen = np.where(vorzeichen == 0, 1, vorzeichen)
+
+    return pd.DataFrame({"ID Visur": df_stats.index.to_numpy(),
+                         "von": von,
+                         "nach": nach,
+                         "dH [m]": vorzeichen * df_stats["dH Mittel"].to_numpy(dtype=float),
+                         "σ [mm]": df_stats["Praeanalyse"].to_numpy(dtype=float)})
+
+
+def netzausgleich(df_beob, fixpunkte:dict, genauigkeiten:bool=True):
+    """
+    Gleicht ein Höhennetz aus gegenseitigen trigonometrischen Höhendifferenzen nach kleinsten Quadraten aus.
+
+    Beobachtungsgleichung pro Visur: H_nach - H_von = dH + v, Gewicht p = 1 / σ².
+    Die Normalgleichungen werden dünnbesetzt (scipy.sparse) aufgestellt und über eine
+    LU-Zerlegung gelöst, sodass auch Netze mit mehreren tausend Beobachtungen effizient bleiben.
+
+    Parameter:
+    ----------
+    df_beob : pandas.DataFrame
+        Beobachtungen (siehe `beobachtungen`) mit den Spalten 'von', 'nach', 'dH [m]', 'σ [mm]'.
+    fixpunkte : dict
+        Festgehaltene Punkte {PktNr: Höhe [m]}, z.B. {"NIV": 1183.000}.
+    genauigkeiten : bool, optional (Standard: True)
+        Ob die Standardabweichungen der ausgeglichenen Höhen berechnet werden
+        (Diagonale der inversen Normalgleichungsmatrix).
+
+    Rückgabe:
+    ---------
+    NetzErgebnis
+        Ausgeglichene Höhen, Residuen, Schleifenwidersprüche und σ0 a posteriori.
+    """
+
+    ## <----------------------------------------------------------------------------------->
+    ## Vorbereiten der Beobachtungen
+    df = df_beob.dropna(subset=["dH [m]", "σ [mm]"])
+    df = df[df["σ [mm]"] > 0].reset_index(drop=True)
+    if len(df) < len(df_beob):
+        print(f"Warnung: {len(df_beob) - len(df)} Beobachtung(en) ohne Höhendifferenz oder Genauigkeit ignoriert")
+
+    fixpunkte = {str(p): float(h) for p, h in fixpunkte.items()}
+
+    von = df["von"].astype(str).to_numpy()
+    nach = df["nach"].astype(str).to_numpy()
+    dh = df["dH [m]"].to_numpy(dtype=float)
+    sigma = df["σ [mm]"].to_numpy(dtype=float) / 1000
+    p = 1 / sigma**2
+
+    punkte = pd.Index(np.unique(np.concatenate([von, nach, list(fixpunkte)])))
+    i_von = punkte.get_indexer(von)
+    i_nach = punkte.get_indexer(nach)
+
+    ist_fix = punkte.isin(list(fixpunkte))
+    h_fix = np.array([fixpunkte.get(pkt, 0.0) for pkt in punkte])
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Prüfen der Lagerung: jede Netzkomponente braucht einen Fixpunkt
+    n_obs = len(df)
+    n_pkt = len(punkte)
+    graph = sp.coo_matrix((np.ones(n_obs), (i_von, i_nach)), shape=(n_pkt, n_pkt)).tocsr()
+    n_komp, komponente = connected_components(graph, directed=False)
+
+    ohne_fix = sorted(set(range(n_komp)) - set(komponente[ist_fix]))
+    if ohne_fix:
+        frei = punkte[np.isin(komponente, ohne_fix)].tolist()
+        raise ValueError(f"Netzteil ohne Fixpunkt, Höhen nicht bestimmbar: {frei}")
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Design-Matrix (nur Neupunkte als Unbekannte) und gekürzte Beobachtungen
+    neu = np.flatnonzero(~ist_fix)
+    spalte = np.full(n_pkt, -1)
+    spalte[neu] = np.arange(len(neu))
+
+    zeilen = np.concatenate([np.arange(n_obs), np.arange(n_obs)])
+    spalten = np.concatenate([spalte[i_nach], spalte[i_von]])
+    werte = np.concatenate([np.ones(n_obs), -np.ones(n_obs)])
+    frei = spalten >= 0
+
+    A = sp.csr_matrix((werte[frei], (zeilen[frei], spalten[frei])), shape=(n_obs, len(neu)))
+    l = dh - (h_fix[i_nach] - h_fix[i_von])
+
+    ## Normalgleichungen N x = n
+    P = sp.diags(p)
+    N = (A.T @ P @ A).tocsc()
+    n = A.T @ (p * l)
+
+    lu = splu(N)
+    x = lu.solve(n)
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Residuen und Genauigkeit
+    v = A @ x - l
+    freiheitsgrade = n_obs - len(neu)
+    sigma0 = float(np.sqrt(v @ (p * v) / freiheitsgrade)) if freiheitsgrade > 0 else np.nan
+
+    hoehe = h_fix.copy()
+    hoehe[neu] = x
+
+    sigma_h = np.zeros(n_pkt)
+    if genauigkeiten and len(neu):
+        ## Diagonale von N^-1 blockweise, damit der Speicherbedarf begrenzt bleibt
+        q_xx = np.empty(len(neu))
+        for j in range(0, len(neu), 256):
+            k = min(j + 256, len(neu))
+            einheit = np.zeros((len(neu), k - j))
+            einheit[np.arange(j, k), np.arange(k - j)] = 1
+            q_xx[j:k] = lu.solve(einheit)[np.arange(j, k), np.arange(k - j)]
+        s0 = sigma0 if freiheitsgrade > 0 else 1.0
+        sigma_h[neu] = s0 * np.sqrt(q_xx) * 1000
+    elif not genauigkeiten:
+        sigma_h[neu] = np.nan
+
+    df_hoehen = pd.DataFrame({"H [m]": hoehe,
+                              "σ H [mm]": sigma_h,
+                              "Fixpunkt": ist_fix},
+                             index=punkte)
+
+    df_res = df.copy()
+    df_res["dH ausgeglichen [m]"] = hoehe[i_nach] - hoehe[i_von]
+    df_res["v [mm]"] = v * 1000
+    df_res["v / σ"] = v / sigma
+    ## <----------------------------------------------------------------------------------->
+
+    return NetzErgebnis(hoehen=df_hoehen,
+                        residuen=df_res,
+                        schleifen=schleifenwidersprueche(df),
+                        sigma0=sigma0,
+                        freiheitsgrade=freiheitsgrade)
+
+
+def schleifenwidersprueche(df_beob):
+    """
+    Berechnet die Widersprüche aller unabhängigen Schleifen im Netz.
+
+    Über einen Spannbaum (Breitensuche) wird jedem Punkt eine vorläufige Höhe zugewiesen.
+    Jede Beobachtung ausserhalb des Baumes schliesst genau eine Schleife; ihr Widerspruch ist
+    die Differenz zwischen beobachteter Höhendifferenz und der Höhendifferenz entlang des Baumes.
+
+    Parameter:
+    ----------
+    df_beob : pandas.DataFrame
+        Beobachtungen mit den Spalten 'von', 'nach', 'dH [m]' und optional 'ID Visur'.
+
+    Rückgabe:
+    ---------
+    pandas.DataFrame
+        Eine Zeile pro Schleife mit den Spalten 'Schleife' (Punktfolge), 'Anzahl Visuren',
+        'Widerspruch [mm]' und 'ID Visur' (schliessende Beobachtung).
+    """
+
+    von = df_beob["von"].astype(str).to_numpy()
+    nach = df_beob["nach"].astype(str).to_numpy()
+    dh = df_beob["dH [m]"].to_numpy(dtype=float)
+    ids = df_beob["ID Visur"].to_numpy() if "ID Visur" in df_beob else np.arange(len(df_beob))
+
+    ## Nachbarschaftsliste (ungerichtet, Höhendifferenz mit Vorzeichen)
+    nachbarn = {}
+    for k, (a, b) in enumerate(zip(von, nach)):
+        nachbarn.setdefault(a, []).append((b, k, 1.0))
+        nachbarn.setdefault(b, []).append((a, k, -1.0))
+
+    ## Spannbaum über Breitensuche
+    hoehe = {}
+    eltern = {}
+    tiefe = {}
+    im_baum = np.zeros(len(dh), dtype=bool)
+
+    for wurzel in nachbarn:
+        if wurzel in hoehe:
+            continue
+        hoehe[wurzel], eltern[wurzel], tiefe[wurzel] = 0.0, None, 0
+        warteschlange = [wurzel]
+        for pkt in warteschlange:
+            for nb, k, vz in nachbarn[pkt]:
+                if nb not in hoehe:
+                    hoehe[nb] = hoehe[pkt] + vz * dh[k]
+                    eltern[nb] = pkt
+                    tiefe[nb] = tiefe[pkt] + 1
+                    im_baum[k] = True
+                    warteschlange.append(nb)
+
+    ## Schleifen aus den Beobachtungen ausserhalb des Baumes
+    zeilen = []
+    for k in np.flatnonzero(~im_baum):
+        a, b = von[k], nach[k]
+        widerspruch = (hoehe[a] + dh[k]) - hoehe[b]
+
+        ## Weg im Baum von b zurück nach a über den gemeinsamen Vorfahren
+        weg_a, weg_b = [a], [b]
+        while weg_a[-1] != weg_b[-1]:
+            if tiefe[weg_a[-1]] >= tiefe[weg_b[-1]]:
+                weg_a.append(eltern[weg_a[-1]])
+            else:
+                weg_b.append(eltern[weg_b[-1]])
+        schleife = weg_a + weg_b[-2::-1] + [a]
+
+        zeilen.append([" - ".join(schleife), len(schleife) - 1, widerspruch * 1000, ids[k]])
+
+    return pd.DataFrame(zeilen, columns=["Schleife", "Anzahl Visuren", "Widerspruch [mm]", "ID Visur"])
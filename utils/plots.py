@@ -3,6 +3,9 @@ import matplotlib.patches as mpatches
 import pandas as pd
 import numpy as np
 
+from utils.ausreisser import IQR, ausreisser_markieren
+from utils.statistik import VERWORFEN
+
 def boxplot(df300,infos_height, visur:str):
     """
     Erstellt einen Boxplot der Abweichungen der Höhendifferenzen vom Mittelwert mit Kennzeichnung von Ausreißern.
@@ -84,8 +87,9 @@ def boxplot_beaut(df300, visur: str):
     Erstellt einen ansprechenden Boxplot der Differenzen der Höhendaten zum Mittelwert in Zentimetern.
 
     Die Funktion berechnet die Abweichung der Höhendaten in `df300` zur mittleren Höhe aus `infos_height` in cm
-    und visualisiert diese als farblich angepassten Boxplot. Rote Punkte markieren starke Ausreißer (1,5*IQR-Regel),
-    blaue Punkte leichte Ausreißer (Werte außerhalb der Box, aber innerhalb 1,5*IQR). 
+    und visualisiert diese als farblich angepassten Boxplot. Rote Punkte markieren die in der Berechnung verworfenen
+    Ausreißer (Spalte "Verworfen", ohne diese Spalte nach der 1,5*IQR-Regel), blaue Punkte leichte Ausreißer
+    (übrige Werte außerhalb der Box). Box, Whisker und Mittelwert beziehen sich auf die nicht verworfenen Werte. 
     Unterhalb des Plots werden statistische Kennwerte (Median, Q1, Q3) und eine Tabelle mit IDs und Werten der Ausreißer 
     mit farblich codierter Schrift angezeigt. Dabei ist die Grafik vertikal ausgelegt und nutzt abgestimmte Achsenbeschriftungen.
 
@@ -111,17 +115,24 @@ def boxplot_beaut(df300, visur: str):
     ## <<------------------------------------------------------------------------->>
     ## Verbesserung = Differenz jeder Messung zum Mittelwert
     # mittelw = infos_height[1]
-    mittelw = df300["Höhendiff. [m]"].mean()
+    if VERWORFEN in df300.columns:
+        verworfen = df300[VERWORFEN].to_numpy(dtype=bool)
+    else:
+        verworfen = ausreisser_markieren(df300, IQR)
+
+    mittelw = df300.loc[~verworfen, "Höhendiff. [m]"].mean()
 
     verbesserung = (df300["Höhendiff. [m]"] - mittelw) * 100
     verb_df = pd.DataFrame({"Verbesserung [cm]": verbesserung})
+    behalten_df = verb_df[~verworfen]
 
     ## <<------------------------------------------------------------------------->>
     ## Grundgerüst des Plotes
     fig, ax = plt.subplots(figsize=(4, 8))
 
     bp = ax.boxplot(
-        verb_df["Verbesserung [cm]"],                                                    # Daten
+        behalten_df["Verbesserung [cm]"].dropna(),                                       # Daten ohne Ausreisser
+        whis=(0, 100),                                                                  # Whisker bis Min./Max.
         patch_artist=True,                                                              # Boxen gefuellt darstellen
         widths=0.6,                                                                     # Breite der Box
         medianprops=dict(color="black", linewidth=1.5),                                 # Medianlinie
@@ -149,25 +160,20 @@ def boxplot_beaut(df300, visur: str):
     ax.grid(axis="y", linestyle="--", alpha=0.5)
 
     ## <<------------------------------------------------------------------------->>
-    ## Daten auslesen für Ausreisser-Markierung
-    q1 = verb_df["Verbesserung [cm]"].quantile(0.25)
-    q3 = verb_df["Verbesserung [cm]"].quantile(0.75)
-    iqr = q3 - q1
+    ## Ausreisser-Markierung aus der Berechnung, Quartile der übrigen Werte für die Box
+    q1 = behalten_df["Verbesserung [cm]"].quantile(0.25)
+    q3 = behalten_df["Verbesserung [cm]"].quantile(0.75)
 
-    # "starke" Ausreisser ermitteln (1.5*IQR Regel)
-    outliers = verb_df[
-        (verb_df["Verbesserung [cm]"] < q1 - 1.5*iqr) |
-        (verb_df["Verbesserung [cm]"] > q3 + 1.5*iqr)
-    ]
+    # verworfene Ausreisser
+    outliers = verb_df[verworfen]
     outlier_ids = df300.loc[outliers.index, "ID Messung"].tolist()
 
     # "starke" Ausreiser rot markieren
     ax.scatter([1]*len(outliers), outliers["Verbesserung [cm]"], color="red", zorder=5)
 
-    # "leichte" Ausreisser (zwischen Whisker und 1.5*IQR)
-    outside_box = verb_df[
-        ((verb_df["Verbesserung [cm]"] < q1) & (verb_df["Verbesserung [cm]"] >= q1 - 1.5*iqr)) |
-        ((verb_df["Verbesserung [cm]"] > q3) & (verb_df["Verbesserung [cm]"] <= q3 + 1.5*iqr))
+    # "leichte" Ausreisser (nicht verworfen, aber ausserhalb der Box)
+    outside_box = behalten_df[
+        (behalten_df["Verbesserung [cm]"] < q1) | (behalten_df["Verbesserung [cm]"] > q3)
     ]
     outside_ids = df300.loc[outside_box.index, "ID Messung"].tolist()
 
@@ -177,8 +183,8 @@ def boxplot_beaut(df300, visur: str):
     
     ## <<------------------------------------------------------------------------->>
     ## Daten auslesen für Statistik-Tabelle
-    median = verb_df["Verbesserung [cm]"].median()
-    mean = verb_df["Verbesserung [cm]"].mean()
+    median = behalten_df["Verbesserung [cm]"].median()
+    mean = behalten_df["Verbesserung [cm]"].mean()
     stats_data = [[
         f"Median: {median:.1f} cm",
         f"Q1: {q1:.1f} cm",
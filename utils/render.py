@@ -0,0 +1,313 @@
+from io import BytesIO
+
+import numpy as np
+from matplotlib import cbook
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from matplotlib.path import Path
+from matplotlib.ticker import MultipleLocator
+
+from utils.ausreisser import IQR, ausreisser_markieren
+from utils.statistik import VERWORFEN
+
+## Ausgabeziele: Auflösung und Format pro Verwendungszweck
+ZIELE = {"vorschau": {"dpi": 96, "format": "png"},
+         "bericht": {"dpi": 300, "format": "png"},
+         "vektor": {"dpi": 72, "format": "svg"}}
+
+
+class PlotRenderer:
+    """
+    Zeichnet die Grafiken des Protokolls (Boxplot und Scatterplot) ohne pyplot direkt auf einer Agg-Canvas.
+
+    Figuren und Achsen werden nur einmal als Vorlage aufgebaut und für jede Visur wiederverwendet;
+    pro Visur werden nur die Daten der Artists (Box, Whisker, Punkte, Linien, Beschriftungen)
+    aktualisiert. Die Darstellung entspricht `boxplot_beaut` und `scatterplot_vwinkel` aus `utils.plots`.
+
+    Parameter:
+    ----------
+    ziele : dict, optional
+        Ausgabeziele {Name: {"dpi": ..., "format": ...}}; Standard ist `ZIELE`.
+    """
+
+    def __init__(self, ziele:dict=None):
+        self.ziele = dict(ZIELE if ziele is None else ziele)
+        self._box = None
+        self._scatter = None
+        self._max_streuung = None
+
+    ## <<------------------------------------------------------------------------->>
+    ## Boxplot
+
+    def _box_vorlage(self):
+        fig = Figure(figsize=(4, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        bp = ax.boxplot(
+            [0.0, 0.0],                                                                     # Platzhalter
+            patch_artist=True,                                                              # Boxen gefuellt darstellen
+            widths=0.6,                                                                     # Breite der Box
+            medianprops=dict(color="black", linewidth=1.5),                                 # Medianlinie
+            whiskerprops=dict(color="gray", linewidth=1.2),                                 # Whisker
+            capprops=dict(color="gray", linewidth=1.2),                                     # Caps
+            boxprops=dict(color="gray", linewidth=1.2),                                     # Boxrahmen
+            flierprops=dict(marker="o", markersize=5, markerfacecolor="gray", alpha=0.5))   # Standard-Ausreisserpunkte
+
+        for patch in bp["boxes"]:
+            patch.set_facecolor("#a6cee3")
+            patch.set_alpha(0.8)
+
+        ax.axhline(0, color="gray", linestyle="--", linewidth=1)
+
+        ax.set_title("Diff. zum Mittelwert", fontsize=14, pad=20)
+        ax.set_ylabel("Δ Höhe [cm]", fontsize=12)
+        ax.set_xticks([1])
+        ax.set_xticklabels([""], fontsize=12)
+        ax.set_ylim(-10, 10)
+        ax.yaxis.set_major_locator(MultipleLocator(1))
+        ax.grid(axis="y", linestyle="--", alpha=0.5)
+
+        rot = ax.scatter([], [], color="red", zorder=5)
+        blau = ax.scatter([], [], color="blue", zorder=4)
+
+        fig.tight_layout()
+
+        ## Achsen für Kennwerte und Ausreissertabelle unterhalb der Grafik
+        stats_ax = fig.add_axes([0.15, -0.06, 0.8, 0.1])
+        stats_ax.axis("off")
+        tab_ax = fig.add_axes([0.15, -0.13, 0.8, 0.1])
+        tab_ax.axis("off")
+
+        return {"fig": fig, "ax": ax, "bp": bp, "rot": rot, "blau": blau,
+                "stats_ax": stats_ax, "tab_ax": tab_ax}
+
+    def boxplot(self, df300, visur:str):
+        """
+        Aktualisiert den Boxplot der Differenzen zum Mittelwert für eine Visur (siehe `boxplot_beaut`).
+
+        Die roten Punkte sind die in der Spalte "Verworfen" markierten Ausreisser (siehe
+        `utils.ausreisser`); Box, Whisker und Mittelwert beziehen sich auf die übrigen Messungen.
+        Fehlt die Spalte, werden die Ausreisser nach der 1.5*IQR-Regel bestimmt.
+
+        Rückgabe:
+        ---------
+        matplotlib.figure.Figure
+            Die (wiederverwendete) Figur; sie bleibt bis zum nächsten Aufruf gültig.
+        """
+
+        if self._box is None:
+            self._box = self._box_vorlage()
+        t = self._box
+
+        ## Ausreisser aus der Berechnung übernehmen
+        if VERWORFEN in df300.columns:
+            verworfen = df300[VERWORFEN].to_numpy(dtype=bool)
+        else:
+            verworfen = ausreisser_markieren(df300, IQR)
+
+        ## Verbesserung = Differenz jeder Messung zum Mittelwert (ohne Ausreisser)
+        hoehe = df300["Höhendiff. [m]"].to_numpy(dtype=float)
+        gueltig = ~np.isnan(hoehe)
+        hoehe, ids, stark = hoehe[gueltig], df300["ID Messung"].to_numpy()[gueltig], verworfen[gueltig]
+        verb = (hoehe - hoehe[~stark].mean()) * 100
+
+        ## Box, Whisker (Minimum/Maximum der übrigen Messungen), Caps und Median aktualisieren
+        s = cbook.boxplot_stats(verb[~stark], whis=(0, 100))[0]
+        pos, breite = 1, 0.6
+        links, rechts = pos - breite / 2, pos + breite / 2
+        cap = breite / 4
+
+        bp = t["bp"]
+        bp["boxes"][0].set_path(Path(np.column_stack([[links, rechts, rechts, links, links],
+                                                      [s["q1"], s["q1"], s["q3"], s["q3"], s["q1"]]]),
+                                     closed=True))
+        bp["whiskers"][0].set_data([pos, pos], [s["q1"], s["whislo"]])
+        bp["whiskers"][1].set_data([pos, pos], [s["q3"], s["whishi"]])
+        bp["caps"][0].set_data([pos - cap, pos + cap], [s["whislo"], s["whislo"]])
+        bp["caps"][1].set_data([pos - cap, pos + cap], [s["whishi"], s["whishi"]])
+        bp["medians"][0].set_data([links, rechts], [s["med"], s["med"]])
+        bp["fliers"][0].set_data(np.full(len(s["fliers"]), pos), s["fliers"])
+
+        t["ax"].set_xticklabels([f"{visur}"], fontsize=12)
+
+        ## Verworfene (rot) und "leichte" Ausreisser ausserhalb der Box (blau)
+        q1, q3 = s["q1"], s["q3"]
+        leicht = ~stark & ((verb < q1) | (verb > q3))
+
+        t["rot"].set_offsets(np.column_stack([np.ones(stark.sum()), verb[stark]]))
+        t["blau"].set_offsets(np.column_stack([np.ones(leicht.sum()), verb[leicht]]))
+
+        ## Tabellen unter dem Boxplot neu aufbauen
+        for ax in (t["stats_ax"], t["tab_ax"]):
+            for table in list(ax.tables):
+                table.remove()
+
+        stats_data = [[f"Median: {s['med']:.1f} cm", f"Q1: {q1:.1f} cm", f"Q3: {q3:.1f} cm"]]
+        t["stats_ax"].table(cellText=stats_data, loc="center", cellLoc="center").scale(1, 1.2)
+
+        eintraege = ([(f"{i} ({v:.1f} cm)", "red") for v, i in zip(verb[stark], ids[stark])] +
+                     [(f"{i} ({v:.1f} cm)", "blue") for v, i in zip(verb[leicht], ids[leicht])])
+        table_data, cell_colors = _tabelle(eintraege, ncols=4)
+
+        if table_data:
+            table = t["tab_ax"].table(cellText=table_data, loc="center", cellLoc="center")
+            for (row, col), cell in table.get_celld().items():
+                if row < len(table_data) and col < 4:
+                    cell.get_text().set_color(cell_colors[row][col])
+                    cell.set_fontsize(9)
+
+        return t["fig"]
+
+    ## <<------------------------------------------------------------------------->>
+    ## Scatterplot
+
+    def _scatter_vorlage(self, max_streuung:float):
+        fig = Figure(figsize=(8, 8))
+        FigureCanvasAgg(fig)
+        ax1 = fig.add_subplot()
+        ax2 = ax1.twinx()
+
+        stil = dict(marker="o", s=80, alpha=0.6, edgecolors="black", zorder=3)
+        scatter1 = ax1.scatter([], [], **stil)
+        scatter2 = ax2.scatter([], [], **stil)
+
+        mittel1 = ax1.axhline(0, color="red", lw=1.8, ls="--", zorder=2)
+        mittel2 = ax2.axhline(0, color="red", lw=1.8, ls="--", zorder=2)
+
+        ## Raster als eine LineCollection (x in Achsenkoordinaten, y in Daten)
+        raster = LineCollection([], colors="green", linewidths=0.8, linestyles="--", alpha=0.7, zorder=1,
+                                transform=ax1.get_yaxis_transform())
+        ax1.add_collection(raster)
+
+        ax1.set_xlim(0, 1)
+        ax1.set_xticks([(1 / 3), (2 / 3)])
+        ax1.set_xticklabels(["A → B", "B → A"], fontsize=14)
+        ax1.set_xlabel("")
+        ax1.set_ylabel("V-Winkel A → B [gon]", fontsize=13)
+        ax2.set_ylabel("V-Winkel B → A [gon]", fontsize=13)
+        ax1.axvline(0.5, color="grey", lw=1.2, ls=":", alpha=0.5)
+
+        ax2.legend(handles=[Patch(color="blue", label="Lage 1"), Patch(color="orange", label="Lage 2")],
+                   loc="upper left")
+
+        fig.suptitle(f"Winkel zentriert um den jeweiligen Mittelwert. \nPro Rastereinheit entsteht ein Abstand vom 0.1 mgon (Streuung: ±{max_streuung*100} mgon)", fontsize=12, y=-0.01)
+        titel = ax2.set_title(" ", fontsize=16, pad=16)
+
+        ## Layout einmal mit repräsentativen Beschriftungen berechnen
+        for ax, rotation in ((ax1, 45), (ax2, -45)):
+            ax.set_yticks([0, 1])
+            ax.set_yticklabels(["100.00000 gon"] * 2, rotation=rotation)
+        fig.tight_layout()
+
+        return {"fig": fig, "ax1": ax1, "ax2": ax2, "scatter1": scatter1, "scatter2": scatter2,
+                "mittel1": mittel1, "mittel2": mittel2, "raster": raster, "titel": titel}
+
+    def scatterplot(self, df300, visur:str, max_streuung:float=0.004):
+        """
+        Aktualisiert den Scatterplot der Vertikalwinkel für eine Visur (siehe `scatterplot_vwinkel`).
+
+        Rückgabe:
+        ---------
+        matplotlib.figure.Figure
+            Die (wiederverwendete) Figur; sie bleibt bis zum nächsten Aufruf gültig.
+        """
+
+        if self._scatter is None or self._max_streuung != max_streuung:
+            self._scatter = self._scatter_vorlage(max_streuung)
+            self._max_streuung = max_streuung
+        t = self._scatter
+
+        value_ab = df300["V-Winkel A-->B [gon]"].to_numpy(dtype=float)
+        value_ba = df300["V-Winkel B-->A [gon]"].to_numpy(dtype=float)
+        mean_ab = np.nanmean(value_ab)
+        mean_ba = np.nanmean(value_ba)
+
+        ## Farbzuteilung nach Fernrohrlage
+        colors = df300["Lage"].map({"1": "blue", "2": "orange"}).fillna("black").tolist()
+
+        t["scatter1"].set_offsets(np.column_stack([np.full(len(value_ab), 1 / 3), value_ab]))
+        t["scatter2"].set_offsets(np.column_stack([np.full(len(value_ba), 2 / 3), value_ba]))
+        t["scatter1"].set_facecolors(colors)
+        t["scatter2"].set_facecolors(colors)
+
+        t["mittel1"].set_ydata([mean_ab, mean_ab])
+        t["mittel2"].set_ydata([mean_ba, mean_ba])
+
+        ## Y-Ticks um den Mittelwert +/- Streuung
+        ab_ticks = np.round(np.arange(mean_ab - max_streuung, mean_ab + max_streuung, 0.001), 5)
+        ba_ticks = np.round(np.arange(mean_ba - max_streuung, mean_ba + max_streuung, 0.001), 5)
+
+        ax1, ax2 = t["ax1"], t["ax2"]
+        ax1.set_ylim(ab_ticks[0], ab_ticks[-1])
+        ax1.set_yticks(ab_ticks)
+        ax2.set_ylim(ba_ticks[0], ba_ticks[-1])
+        ax2.set_yticks(ba_ticks)
+        ax1.set_yticklabels([f"{y:.5f} gon" for y in ab_ticks], rotation=45)
+        ax2.set_yticklabels([f"{y:.5f} gon" for y in ba_ticks], rotation=-45)
+
+        t["raster"].set_segments([[(0, y), (1, y)] for y in ab_ticks])
+        t["titel"].set_text(f"Streuung der Vertikalwinkel -- {visur}")
+
+        return t["fig"]
+
+    ## <<------------------------------------------------------------------------->>
+    ## Ausgabe
+
+    def speichern(self, fig, ziel_datei, ziel:str="bericht"):
+        """
+        Speichert eine Figur mit Auflösung und Format des Ausgabeziels.
+
+        Parameter:
+        ----------
+        fig : matplotlib.figure.Figure
+            Figur aus `boxplot` oder `scatterplot`.
+        ziel_datei : str, pathlib.Path or file-like
+            Zieldatei oder Puffer (z.B. io.BytesIO).
+        ziel : str, optional (Standard: "bericht")
+            Name des Ausgabeziels in `ziele`.
+        """
+
+        einstellungen = self.ziele[ziel]
+        fig.savefig(ziel_datei, dpi=einstellungen["dpi"], format=einstellungen["format"], bbox_inches="tight")
+
+    def als_bytes(self, fig, ziel:str="bericht"):
+        """
+        Rendert eine Figur in den Speicher und gibt die Bytes im Format des Ausgabeziels zurück.
+        """
+
+        puffer = BytesIO()
+        self.speichern(fig, puffer, ziel)
+        return puffer.getvalue()
+
+
+def _tabelle(eintraege:list, ncols:int=4):
+    """
+    Verteilt (Text, Farbe)-Einträge zeilenweise auf eine Tabelle mit `ncols` Spalten; rote Einträge zuerst.
+    """
+
+    table_data, cell_colors = [], []
+    for farbe in ["red", "blue"]:
+        texte = [txt for txt, f in eintraege if f == farbe]
+        for start in range(0, len(texte), ncols):
+            zeile = texte[start:start + ncols]
+            table_data.append(zeile + [""] * (ncols - len(zeile)))
+            cell_colors.append([farbe] * len(zeile) + ["black"] * (ncols - len(zeile)))
+
+    return table_data, cell_colors
+
+
+## Ein Renderer pro Prozess (z.B. pro Worker im Prozesspool)
+_renderer = None
+
+def renderer():
+    """
+    Liefert den Renderer des aktuellen Prozesses (wird beim ersten Aufruf erstellt).
+    """
+
+    global _renderer
+    if _renderer is None:
+        _renderer = PlotRenderer()
+    return _renderer
@@ -0,0 +1,308 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+## Ausgewertete Grössen: Kurzname -> (Spalte in df300, Nachkommastellen der Ausgabe)
+GROESSEN = {"dH": ("Höhendiff. [m]", 4),
+            "k": ("Refraktionskoeff. k", 2),
+            "sd": ("d' (mittel, schräg) [m]", 4)}
+
+## Kennwerte pro Gruppe (Spaltennamen in der Statistiktabelle, z.B. "dH Mittel" oder "k MAD L1")
+KENNWERTE = ["n", "Mittel", "Std", "Median", "MAD", "Getrimmt"]
+
+## Standardanteil, der beim getrimmten Mittel an beiden Enden verworfen wird
+ANTEIL_GETRIMMT = 0.1
+
+## Spalte in df300 mit den als Ausreisser verworfenen Messungen (siehe `utils.ausreisser`)
+VERWORFEN = "Verworfen"
+
+
+@dataclass(frozen=True)
+class Kennwerte:
+    """
+    Kennwerte einer Grösse in einer Gruppe (Visur, Lage oder Kampagne).
+
+    Attribute:
+    ----------
+    n : int
+        Anzahl gültiger Werte (ohne NaN).
+    mittel, std : float
+        Mittelwert und empirische Standardabweichung (ddof=1, NaN bei n < 2).
+    median : float
+        Median.
+    mad : float
+        Median der absoluten Abweichungen vom Median (ohne Skalierung; 1.4826 * mad schätzt σ).
+    getrimmt : float
+        Getrimmtes Mittel (siehe `ANTEIL_GETRIMMT`).
+    """
+    n: int
+    mittel: float
+    std: float
+    median: float
+    mad: float
+    getrimmt: float
+
+
+@dataclass(frozen=True)
+class Lagen:
+    """
+    Kennwerte einer Grösse über alle Messungen und getrennt nach Lage 1 und Lage 2.
+    """
+    alle: Kennwerte
+    lage1: Kennwerte
+    lage2: Kennwerte
+
+    def als_liste(self):
+        """
+        Liste [Mittel, Std, Mittel L1, Std L1, Mittel L2, Std L2] im Aufbau von `master_thb`.
+        """
+        return [self.alle.mittel, self.alle.std, self.lage1.mittel, self.lage1.std, self.lage2.mittel, self.lage2.std]
+
+
+@dataclass(frozen=True)
+class Statistik:
+    """
+    Statistische Kennwerte einer Visur (oder einer ganzen Kampagne) für Höhendifferenz,
+    Refraktionskoeffizient und mittlere Schrägdistanz.
+
+    Die Werte sind wie im Protokoll gerundet (siehe `GROESSEN`). Die Eigenschaften `infos_height`,
+    `infos_k` und `infos_sd` liefern die bisherigen Listen von `master_thb`.
+
+    Attribute:
+    ----------
+    visur : str
+        ID der Visur bzw. "Kampagne".
+    dH, k, sd : Lagen
+        Kennwerte der Höhendifferenz [m], des Refraktionskoeffizienten und der Schrägdistanz [m].
+    dH_naeherung : float
+        Höhendifferenz aus den Näherungskoordinaten [m], falls bekannt.
+    """
+    visur: str
+    dH: Lagen
+    k: Lagen
+    sd: Lagen
+    dH_naeherung: float = None
+
+    @property
+    def infos_height(self):
+        return [self.dH_naeherung] + self.dH.als_liste()
+
+    @property
+    def infos_k(self):
+        return self.k.als_liste()
+
+    @property
+    def infos_sd(self):
+        return self.sd.als_liste()
+
+    @classmethod
+    def aus_zeile(cls, visur:str, s):
+        """
+        Erstellt die Statistik aus einer Zeile der Statistiktabelle (Series oder dict mit Spalten
+        wie "dH Mittel", "dH Std L1", ...); fehlende Kennwerte ergeben NaN.
+        """
+
+        def kennwerte(name, suffix):
+            werte = [s.get(f"{name} {kennwert}{suffix}", np.nan) for kennwert in KENNWERTE]
+            n = 0 if pd.isna(werte[0]) else int(werte[0])
+            return Kennwerte(n, *(float(w) for w in werte[1:]))
+
+        lagen = {name: Lagen(kennwerte(name, ""), kennwerte(name, " L1"), kennwerte(name, " L2")) for name in GROESSEN}
+        naeherung = s.get("dH Naeherung")
+
+        return cls(visur, **lagen, dH_naeherung=None if naeherung is None else float(naeherung))
+
+    @classmethod
+    def aus_tabelle(cls, df_stats, visur:str):
+        """
+        Liest die Kennwerte einer Visur aus der Statistiktabelle (siehe `master_thb_batch`).
+        """
+        return cls.aus_zeile(visur, df_stats.loc[visur])
+
+
+## <----------------------------------------------------------------------------------->
+## Gruppierte Kennwerte in einem NumPy-Durchgang
+
+def kennwerte_gruppiert(x, gruppe, n_gruppen:int, anteil:float=ANTEIL_GETRIMMT):
+    """
+    Berechnet alle Kennwerte (siehe `KENNWERTE`) einer Grösse für alle Gruppen gleichzeitig.
+
+    Die Werte werden einmal nach Gruppe und Wert sortiert (`np.lexsort`); Summen entstehen mit
+    `np.bincount`, Median und getrimmtes Mittel über Positionen bzw. kumulierte Summen in den
+    sortierten Gruppen. Die Varianz wird zweistufig (Abweichungen vom Gruppenmittel) berechnet.
+    NaN-Werte werden ignoriert.
+
+    Parameter:
+    ----------
+    x : numpy.ndarray
+        Werte (float).
+    gruppe : numpy.ndarray
+        Gruppennummer 0..n_gruppen-1 pro Wert.
+    n_gruppen : int
+        Anzahl Gruppen.
+    anteil : float, optional (Standard: 0.1)
+        Anteil, der beim getrimmten Mittel an jedem Ende verworfen wird (abgerundet wie `scipy.stats.trim_mean`).
+
+    Rückgabe:
+    ---------
+    dict of numpy.ndarray
+        Ein Array der Länge `n_gruppen` pro Kennwert; leere Gruppen ergeben NaN (n = 0).
+    """
+
+    x = np.asarray(x, dtype=float)
+    gruppe = np.asarray(gruppe)
+    ok = ~np.isnan(x) & (gruppe >= 0)
+    x, gruppe = x[ok], gruppe[ok]
+
+    ## Sortieren nach Gruppe, innerhalb der Gruppe nach Wert
+    ordnung = np.lexsort((x, gruppe))
+    xs, gs = x[ordnung], gruppe[ordnung]
+
+    n = np.bincount(gs, minlength=n_gruppen)
+    start = np.cumsum(n) - n
+    leer = n == 0
+    n_div = np.where(leer, 1, n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mittel = np.where(leer, np.nan, np.bincount(gs, weights=xs, minlength=n_gruppen) / n_div)
+        quadrate = np.bincount(gs, weights=(xs - mittel[gs])**2, minlength=n_gruppen)
+        std = np.where(n > 1, np.sqrt(quadrate / np.maximum(n - 1, 1)), np.nan)
+
+    median = _median_sortiert(xs, start, n)
+
+    ## MAD: Median der absoluten Abweichungen (erneut innerhalb der Gruppen sortiert)
+    abw = np.abs(xs - median[gs])
+    mad = _median_sortiert(abw[np.lexsort((abw, gs))], start, n)
+
+    ## Getrimmtes Mittel über kumulierte Summen der sortierten Werte
+    k = np.floor(anteil * n).astype(np.int64)
+    kumuliert = np.concatenate(([0.0], np.cumsum(xs)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        getrimmt = (kumuliert[start + n - k] - kumuliert[start + k]) / (n - 2 * k)
+    getrimmt = np.where(leer, np.nan, getrimmt)
+
+    return {"n": n, "Mittel": mittel, "Std": std, "Median": median, "MAD": mad, "Getrimmt": getrimmt}
+
+
+def _median_sortiert(xs, start, n):
+    ## Median aus innerhalb der Gruppen sortierten Werten (Mittel der beiden mittleren Positionen)
+    if len(xs) == 0:
+        return np.full(len(n), np.nan)
+    unten = np.minimum(start + (n - 1) // 2, len(xs) - 1)
+    oben = np.minimum(start + n // 2, len(xs) - 1)
+    return np.where(n == 0, np.nan, 0.5 * (xs[unten] + xs[oben]))
+
+
+def _gruppen(df, schluessel:list):
+    ## Gruppennummern und Gruppenindex für eine Liste von Schlüsselspalten ([] = eine Gruppe).
+    ## Zeilen mit fehlendem Schlüssel erhalten die Gruppe -1 und werden nicht ausgewertet.
+    if not schluessel:
+        return np.zeros(len(df), dtype=np.int64), None
+
+    codes, werte = zip(*(pd.factorize(df[s], sort=True) for s in schluessel))
+    gueltig = np.logical_and.reduce([c >= 0 for c in codes])
+    kombiniert = np.ravel_multi_index([c[gueltig] for c in codes], [max(len(w), 1) for w in werte])
+    eindeutig, inverse = np.unique(kombiniert, return_inverse=True)
+
+    gruppe = np.full(len(df), -1, dtype=np.int64)
+    gruppe[gueltig] = inverse
+
+    positionen = np.unravel_index(eindeutig, [max(len(w), 1) for w in werte])
+    if len(schluessel) == 1:
+        index = pd.Index(werte[0][positionen[0]], name=schluessel[0])
+    else:
+        index = pd.MultiIndex.from_arrays([w[p] for w, p in zip(werte, positionen)], names=schluessel)
+
+    return gruppe, index
+## <----------------------------------------------------------------------------------->
+
+
+def gruppen_statistik(df300, ebenen=(["ID Visur"], ["ID Visur", "Lage"]), anteil:float=ANTEIL_GETRIMMT):
+    """
+    Berechnet die Kennwerte von Höhendifferenz, Refraktionskoeffizient und Schrägdistanz für
+    mehrere Gruppierungen in einem gemeinsamen NumPy-Durchgang.
+
+    Die Zeilen aller Ebenen werden mit fortlaufenden Gruppennummern aneinandergehängt und pro
+    Grösse einmal mit `kennwerte_gruppiert` reduziert. Enthält `df300` die Spalte "Verworfen",
+    werden die markierten Messungen nicht berücksichtigt.
+
+    Parameter:
+    ----------
+    df300 : pandas.DataFrame
+        Messergebnisse (siehe `master_thb` bzw. `master_thb_batch`).
+    ebenen : sequence of list, optional (Standard: Visur und Visur/Lage)
+        Schlüsselspalten pro Ebene; eine leere Liste fasst alle Zeilen zusammen (z.B. ganze Kampagne).
+    anteil : float, optional (Standard: 0.1)
+        Anteil für das getrimmte Mittel.
+
+    Rückgabe:
+    ---------
+    list of pandas.DataFrame
+        Eine Tabelle pro Ebene (Index = Schlüssel, bei leerem Schlüssel ein Eintrag "Kampagne")
+        mit den Spalten "<Grösse> <Kennwert>", z.B. "dH Mittel", "k MAD", gerundet wie im Protokoll.
+    """
+
+    if VERWORFEN in df300.columns:
+        df300 = df300[~df300[VERWORFEN].to_numpy(dtype=bool)]
+
+    gruppen, indizes, versatz = [], [], 0
+    for schluessel in ebenen:
+        gruppe, index = _gruppen(df300, list(schluessel))
+        if index is None:
+            index = pd.Index(["Kampagne"], name="ID Visur")
+        gruppen.append(np.where(gruppe >= 0, gruppe + versatz, -1))
+        indizes.append(index)
+        versatz += len(index)
+
+    gruppe = np.concatenate(gruppen) if gruppen else np.zeros(0, dtype=np.int64)
+    n_ebenen = len(ebenen)
+
+    spalten = {}
+    for name, (spalte, stellen) in GROESSEN.items():
+        x = np.tile(df300[spalte].to_numpy(dtype=float), n_ebenen)
+        for kennwert, werte in kennwerte_gruppiert(x, gruppe, versatz, anteil).items():
+            spalten[f"{name} {kennwert}"] = werte if kennwert == "n" else np.round(werte, stellen)
+
+    tabelle = pd.DataFrame(spalten)
+    tabellen, start = [], 0
+    for index in indizes:
+        teil = tabelle.iloc[start:start + len(index)]
+        tabellen.append(teil.set_axis(index, axis=0))
+        start += len(index)
+
+    return tabellen
+
+
+def lagen_spalten(df_lage, index):
+    """
+    Überführt eine Tabelle pro (Visur, Lage) in Spalten pro Visur mit den Suffixen " L1" und " L2",
+    ausgerichtet auf `index` (fehlende Lagen ergeben NaN).
+    """
+
+    teile = []
+    for lage in ["1", "2"]:
+        teil = df_lage[df_lage.index.get_level_values(-1) == lage]
+        teil = teil.droplevel(-1) if teil.index.nlevels > 1 else teil.set_axis(index[:len(teil)])
+        teile.append(teil.reindex(index).add_suffix(f" L{lage}"))
+
+    return pd.concat(teile, axis=1)
+
+
+def visur_statistik(df300, visur:str="Kampagne", dH_naeherung:float=None, anteil:float=ANTEIL_GETRIMMT):
+    """
+    Kennwerte einer einzelnen Visur (bzw. aller Zeilen von `df300`) als `Statistik`.
+    """
+
+    alle, lagen = gruppen_statistik(df300, ebenen=([], ["Lage"]), anteil=anteil)
+    zeile = pd.concat([alle, lagen_spalten(lagen, alle.index)], axis=1).iloc[0].to_dict()
+    zeile["dH Naeherung"] = dH_naeherung
+
+    return Statistik.aus_zeile(visur, zeile)
+
+
+def kampagnen_statistik(df300, anteil:float=ANTEIL_GETRIMMT):
+    """
+    Kennwerte über alle Messungen einer Kampagne (gesamt und pro Lage) als `Statistik`.
+    """
+    return visur_statistik(df300, "Kampagne", anteil=anteil)
@@ -0,0 +1,378 @@
+import zlib
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+import pandas as pd
+
+## Methoden der Fortpflanzung
+JACOBI = "jacobi"
+MONTECARLO = "montecarlo"
+
+## Standardwerte der Monte-Carlo-Simulation: Stichproben pro Visur und Blockgrösse (begrenzt den Speicher)
+STICHPROBEN = 200_000
+BLOCK = 50_000
+
+## Umrechnung gon -> rad und cc -> gon
+RHO = np.pi / 200
+CC = 1 / 10_000
+
+## Unsichere Eingangsgrössen pro Komponente der Präanalyse (Spalten in der Statistiktabelle)
+KOMPONENTEN = {"d_komp": ["ds_ab", "ds_ba"],
+               "z_komp": ["z_ab", "z_ba"],
+               "i_komp": ["offset_a", "offset_b"],
+               "s_komp": ["signal_a", "signal_b"],
+               "l_komp": ["xi_a", "eta_a", "xi_b", "eta_b"]}
+
+
+@dataclass(frozen=True)
+class Genauigkeiten:
+    """
+    A-priori-Standardabweichungen (1σ) der Eingangsgrössen.
+
+    Attribute:
+    ----------
+    ds_mm, ds_ppm : float
+        Distanzmessung: konstanter [mm] und distanzproportionaler Anteil [ppm].
+    zenit_mgon : float
+        Zenitwinkel pro Richtung [mgon].
+    lotabw_cc : float
+        Lotabweichungskomponenten Xi und Eta [cc].
+    offset_mm : float
+        Instrumentenoffset (Prismamount) [mm].
+    signal_mm : float
+        Signalhöhe [mm].
+    """
+    ds_mm: float = 0.6
+    ds_ppm: float = 1.0
+    zenit_mgon: float = 0.15
+    lotabw_cc: float = 1.5
+    offset_mm: float = 1.0
+    signal_mm: float = 1.0
+
+    def sigmas(self, e):
+        """
+        Standardabweichungen der unsicheren Eingangsgrössen von `e` in deren Einheiten (m, gon, cc).
+        """
+        return {"ds_ab": (self.ds_mm + self.ds_ppm * e.ds_ab / 1000) / 1000,
+                "ds_ba": (self.ds_mm + self.ds_ppm * e.ds_ba / 1000) / 1000,
+                "z_ab": self.zenit_mgon / 1000,
+                "z_ba": self.zenit_mgon / 1000,
+                "xi_a": self.lotabw_cc,
+                "eta_a": self.lotabw_cc,
+                "xi_b": self.lotabw_cc,
+                "eta_b": self.lotabw_cc,
+                "offset_a": self.offset_mm / 1000,
+                "offset_b": self.offset_mm / 1000,
+                "signal_a": self.signal_mm / 1000,
+                "signal_b": self.signal_mm / 1000}
+
+
+@dataclass(frozen=True)
+class Eingaben:
+    """
+    Nominelle Eingangsgrössen der Höhenbestimmung, als float (eine Visur) oder Arrays (mehrere Visuren).
+
+    Die Distanzen und Zenitwinkel (Lage 2 bereits auf Lage 1 umgerechnet) sind die Mittel pro
+    Richtung; die Azimute stammen aus den Näherungskoordinaten und gelten als fehlerfrei.
+    """
+    ds_ab: float
+    ds_ba: float
+    z_ab: float
+    z_ba: float
+    xi_a: float
+    eta_a: float
+    xi_b: float
+    eta_b: float
+    azi_ab: float
+    azi_ba: float
+    offset_a: float
+    offset_b: float
+    signal_a: float
+    signal_b: float
+
+
+## <----------------------------------------------------------------------------------->
+## Modell und Fortpflanzung
+
+def hoehendifferenz(e:Eingaben):
+    """
+    Höhendifferenz [m] aus den Eingangsgrössen über `korr_lotabw`, `korr_kippachse` und `delta_h`
+    (dieselbe Kette wie in `master_thb`).
+    """
+
+    from utils.calculate import delta_h, korr_kippachse, korr_lotabw
+
+    v_ab = korr_lotabw(e.xi_a, e.eta_a, e.azi_ab, e.z_ab)
+    v_ba = korr_lotabw(e.xi_b, e.eta_b, e.azi_ba, e.z_ba)
+
+    ## Der Prismamount sitzt jeweils auf der Zielstation
+    d_ab, v_ab = korr_kippachse(e.ds_ab, e.offset_b, v_ab)
+    d_ba, v_ba = korr_kippachse(e.ds_ba, e.offset_a, v_ba)
+
+    return delta_h(0.5 * (d_ab + d_ba), v_ab, v_ba,
+                   e.signal_a - e.offset_a, e.signal_b - e.offset_b,
+                   e.signal_a, e.signal_b)
+
+
+def _kippachse_ableitungen(d, o, v):
+    """
+    Partielle Ableitungen von `korr_kippachse` nach Distanz d [m], Offset o [m] und Vertikalwinkel v [gon].
+
+    Mit z = v*ρ, l = d - o*cos(z), q = |o*sin(z)|, D = hypot(l, q) und β = atan2(q, l) gilt
+    ∂D = (l*∂l + q*∂q) / D und ∂β = (l*∂q - q*∂l) / D², der korrigierte Winkel ist v + β/ρ.
+
+    Rückgabe:
+    ---------
+    tuple
+        ((D, v_korr), (∂D/∂d, ∂D/∂o, ∂D/∂v), (∂v_korr/∂d, ∂v_korr/∂o, ∂v_korr/∂v))
+    """
+
+    z = v * RHO
+    sin_z, cos_z = np.sin(z), np.cos(z)
+    vz = np.sign(o * sin_z)
+
+    l, q = d - o * cos_z, np.abs(o * sin_z)
+    D2 = l**2 + q**2
+    D = np.sqrt(D2)
+    v_korr = v + np.arctan2(q, l) / RHO
+
+    ## Ableitungen von l und q nach d, o und z
+    dl = (1.0, -cos_z, o * sin_z)
+    dq = (0.0, vz * sin_z, vz * o * cos_z)
+
+    dD = [(l * a + q * b) / D for a, b in zip(dl, dq)]
+    dbeta = [(l * b - q * a) / D2 for a, b in zip(dl, dq)]
+
+    ## Nach v [gon]: ∂z/∂v = ρ; v_korr = v + β/ρ
+    dD[2] = dD[2] * RHO
+    dv = (dbeta[0] / RHO, dbeta[1] / RHO, 1 + dbeta[2])
+
+    return (D, v_korr), tuple(dD), dv
+
+
+def jacobi(e:Eingaben, genauigkeiten:Genauigkeiten=None):
+    """
+    Lineare Fortpflanzung der Standardabweichungen auf die Höhendifferenz.
+
+    Die partiellen Ableitungen der Kette aus `hoehendifferenz` werden analytisch am nominellen Punkt
+    gebildet (Kettenregel über `korr_lotabw`, `korr_kippachse` und `delta_h`) und über alle Visuren
+    von `e` vektorisiert ausgewertet.
+
+    Modell (v in gon, ρ = π/200):
+    - Lotabweichung: v = z + (ξ*cos(azi) + η*sin(azi)) / 10'000
+    - Kippachse: siehe `_kippachse_ableitungen`; der Prismamount sitzt auf der Zielstation
+    - Höhendifferenz: dH = |H| mit H = 0.5 * (D_m * (cos(v_AB*ρ) - cos(v_BA*ρ)) + (s_A - o_A) - (s_B - o_B) + s_A - s_B)
+      und D_m = (D_AB + D_BA) / 2
+
+    Parameter:
+    ----------
+    e : Eingaben
+        Nominelle Eingangsgrössen (float oder Arrays).
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten; None verwendet die Standardwerte.
+
+    Rückgabe:
+    ---------
+    tuple
+        (σ der Höhendifferenz [m], {Eingangsgrösse: Beitrag |∂dH/∂x| * σx [m]})
+    """
+
+    from utils.calculate import korr_lotabw
+
+    sigmas = (genauigkeiten or Genauigkeiten()).sigmas(e)
+
+    ## <----------------------------------------------------------------------------------->
+    ## Nominelle Kette
+    v_ab = korr_lotabw(e.xi_a, e.eta_a, e.azi_ab, e.z_ab)
+    v_ba = korr_lotabw(e.xi_b, e.eta_b, e.azi_ba, e.z_ba)
+
+    (d_ab, v_ab), dD_ab, dv_ab = _kippachse_ableitungen(e.ds_ab, e.offset_b, v_ab)
+    (d_ba, v_ba), dD_ba, dv_ba = _kippachse_ableitungen(e.ds_ba, e.offset_a, v_ba)
+
+    d_m = 0.5 * (d_ab + d_ba)
+    ## <----------------------------------------------------------------------------------->
+
+    ## <----------------------------------------------------------------------------------->
+    ## Ableitungen von H nach D_m und den korrigierten Winkeln, dann Kettenregel
+    dH_dm = 0.5 * (np.cos(v_ab * RHO) - np.cos(v_ba * RHO))
+    dH_vab = -0.5 * d_m * np.sin(v_ab * RHO) * RHO
+    dH_vba = 0.5 * d_m * np.sin(v_ba * RHO) * RHO
+
+    ## Beitrag einer Grösse über Distanz (Index 0), Offset (1) bzw. Winkel (2) einer Richtung
+    def ueber_ab(i):
+        return dH_dm * 0.5 * dD_ab[i] + dH_vab * dv_ab[i]
+
+    def ueber_ba(i):
+        return dH_dm * 0.5 * dD_ba[i] + dH_vba * dv_ba[i]
+
+    ableitungen = {"ds_ab": ueber_ab(0),
+                   "ds_ba": ueber_ba(0),
+                   "z_ab": ueber_ab(2),
+                   "z_ba": ueber_ba(2),
+                   "xi_a": ueber_ab(2) * np.cos(e.azi_ab * RHO) * CC,
+                   "eta_a": ueber_ab(2) * np.sin(e.azi_ab * RHO) * CC,
+                   "xi_b": ueber_ba(2) * np.cos(e.azi_ba * RHO) * CC,
+                   "eta_b": ueber_ba(2) * np.sin(e.azi_ba * RHO) * CC,
+                   "offset_a": ueber_ba(1) - 0.5,
+                   "offset_b": ueber_ab(1) + 0.5,
+                   "signal_a": 1.0,
+                   "signal_b": -1.0}
+
+    ## dH = |H|: das Vorzeichen von H fällt in den Beiträgen |∂dH/∂x| * σx weg
+    beitraege = {name: np.abs(ableitungen[name]) * sigma for name, sigma in sigmas.items()}
+    ## <----------------------------------------------------------------------------------->
+
+    sigma_dH = np.sqrt(sum(b**2 for b in beitraege.values()))
+    return sigma_dH, beitraege
+
+
+def monte_carlo(e:Eingaben,
+                genauigkeiten:Genauigkeiten=None,
+                stichproben:int=STICHPROBEN,
+                block:int=BLOCK,
+                seed=0):
+    """
+    Monte-Carlo-Fortpflanzung der Standardabweichungen auf die Höhendifferenz einer Visur.
+
+    Die Eingangsgrössen werden normalverteilt gezogen und das Modell vektorisiert über einen Block
+    von Stichproben ausgewertet; Mittel und Varianz werden blockweise zusammengeführt, sodass der
+    Speicherbedarf nur von `block` abhängt.
+
+    Parameter:
+    ----------
+    e : Eingaben
+        Nominelle Eingangsgrössen einer Visur (float).
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten; None verwendet die Standardwerte.
+    stichproben : int, optional (Standard: STICHPROBEN)
+        Anzahl Stichproben (üblich 10^5 bis 10^6).
+    block : int, optional (Standard: BLOCK)
+        Stichproben pro Block.
+    seed : int or sequence of int, optional (Standard: 0)
+        Startwert des Zufallsgenerators (gleicher Startwert und Block -> gleiches Ergebnis).
+
+    Rückgabe:
+    ---------
+    tuple
+        (Mittel der Höhendifferenz [m], σ der Höhendifferenz [m])
+    """
+
+    sigmas = (genauigkeiten or Genauigkeiten()).sigmas(e)
+    rng = np.random.default_rng(seed)
+    n, mittel, m2 = 0, 0.0, 0.0
+
+    for start in range(0, stichproben, block):
+        m = min(block, stichproben - start)
+        z = rng.standard_normal((len(sigmas), m))
+        stichprobe = replace(e, **{name: getattr(e, name) + sigma * z[i]
+                                   for i, (name, sigma) in enumerate(sigmas.items())})
+        dH = hoehendifferenz(stichprobe)
+
+        ## Zusammenführen von Mittel und Quadratsumme (Chan et al.)
+        mittel_b, m2_b = dH.mean(), ((dH - dH.mean())**2).sum()
+        delta = mittel_b - mittel
+        mittel += delta * m / (n + m)
+        m2 += m2_b + delta**2 * n * m / (n + m)
+        n += m
+
+    return mittel, np.sqrt(m2 / (n - 1))
+
+## <----------------------------------------------------------------------------------->
+
+
+def eingaben_aus_messungen(visur, a2b, ds, zenit, xi, eta, azi, df_param):
+    """
+    Bildet die nominellen Eingangsgrössen pro Visur aus den Messungen beider Richtungen.
+
+    Parameter:
+    ----------
+    visur : array_like
+        ID der Visur pro Messung.
+    a2b : array_like of bool
+        True für Messungen A-->B, False für B-->A.
+    ds, zenit : array_like
+        Gemessene Schrägdistanz [m] und Zenitwinkel [gon] (Lage 2 auf Lage 1 umgerechnet).
+    xi, eta, azi : array_like
+        Lotabweichung [cc] am Standpunkt und Azimut [gon] pro Messung.
+    df_param : pandas.DataFrame
+        Instrumentenparameter pro Visur (Spalten 'ID', 'signal_A', 'offset_A', 'signal_B', 'offset_B').
+
+    Rückgabe:
+    ---------
+    tuple
+        (Index der Visuren, Eingaben mit einem Array-Eintrag pro Visur)
+    """
+
+    df = pd.DataFrame({"ID Visur": visur, "A2B": a2b, "ds": ds, "z": zenit, "xi": xi, "eta": eta, "azi": azi})
+    mittel = df.groupby(["ID Visur", "A2B"], sort=False).mean()
+
+    ab = mittel.xs(True, level="A2B")
+    ba = mittel.xs(False, level="A2B").reindex(ab.index)
+    param = df_param.set_index("ID").reindex(ab.index)
+
+    e = Eingaben(ds_ab=ab["ds"].to_numpy(), ds_ba=ba["ds"].to_numpy(),
+                 z_ab=ab["z"].to_numpy(), z_ba=ba["z"].to_numpy(),
+                 xi_a=ab["xi"].to_numpy(), eta_a=ab["eta"].to_numpy(),
+                 xi_b=ba["xi"].to_numpy(), eta_b=ba["eta"].to_numpy(),
+                 azi_ab=ab["azi"].to_numpy(), azi_ba=ba["azi"].to_numpy(),
+                 offset_a=param["offset_A"].to_numpy(dtype=float), offset_b=param["offset_B"].to_numpy(dtype=float),
+                 signal_a=param["signal_A"].to_numpy(dtype=float), signal_b=param["signal_B"].to_numpy(dtype=float))
+
+    return ab.index, e
+
+
+def praeanalyse(index, e:Eingaben,
+                methode:str=JACOBI,
+                genauigkeiten:Genauigkeiten=None,
+                stichproben:int=STICHPROBEN,
+                block:int=BLOCK,
+                seed:int=0):
+    """
+    Genauigkeit der Höhendifferenz (1σ einer gegenseitigen Messung) pro Visur und ihre Komponenten.
+
+    Parameter:
+    ----------
+    index : pandas.Index
+        IDs der Visuren (siehe `eingaben_aus_messungen`).
+    e : Eingaben
+        Nominelle Eingangsgrössen mit einem Array-Eintrag pro Visur.
+    methode : str, optional (Standard: "jacobi")
+        `JACOBI` (lineare Fortpflanzung) oder `MONTECARLO`.
+    genauigkeiten : Genauigkeiten, optional (Standard: None)
+        A-priori-Genauigkeiten; None verwendet die Standardwerte.
+    stichproben, block : int, optional
+        Nur für `MONTECARLO` (siehe `monte_carlo`).
+    seed : int, optional (Standard: 0)
+        Nur für `MONTECARLO`; der Zufallsgenerator jeder Visur wird aus `seed` und der ID der
+        Visur abgeleitet, das Ergebnis hängt also nicht von der Reihenfolge der Visuren ab.
+
+    Rückgabe:
+    ---------
+    pandas.DataFrame
+        Eine Zeile pro Visur mit den Komponenten 'd_komp', 'z_komp', 'k_komp', 'i_komp', 's_komp'
+        und 'l_komp' (Lotabweichung) sowie der Genauigkeit 'Praeanalyse', alles in mm.
+        Die Komponenten stammen immer aus der linearen Fortpflanzung.
+    """
+
+    if methode not in (JACOBI, MONTECARLO):
+        raise ValueError(f"Unbekannte Methode '{methode}' (möglich: '{JACOBI}', '{MONTECARLO}').")
+
+    sigma_dH, beitraege = jacobi(e, genauigkeiten)
+
+    df = pd.DataFrame(index=index)
+    for komponente, namen in KOMPONENTEN.items():
+        df[komponente] = np.sqrt(sum(beitraege[name]**2 for name in namen)) * 1000
+
+    ## Refraktion: wird bei gegenseitig gleichzeitiger Messung vernachlässigt und nur ausgewiesen
+    dist_h_m = e.ds_ab * np.sin(e.z_ab * np.pi / 200)
+    df["k_komp"] = (-1 * ( (dist_h_m)**2 / (2 * 6_370_000) ) * 0.06 ) * 1000
+
+    if methode == JACOBI:
+        df["Praeanalyse"] = np.round(sigma_dH * 1000, 2)
+    else:
+        sigma_mc = [monte_carlo(Eingaben(**{f.name: getattr(e, f.name)[i] for f in fields(e)}),
+                                genauigkeiten, stichproben, block, [seed, zlib.crc32(str(visur).encode())])[1]
+                    for i, visur in enumerate(index)]
+        df["Praeanalyse"] = np.round(np.asarray(sigma_mc) * 1000, 2)
+
+    return df.loc[:, ["d_komp", "z_komp", "k_komp", "i_komp", "s_komp", "l_komp", "Praeanalyse"]]
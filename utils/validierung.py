@@ -0,0 +1,256 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from utils import laufzeit
+from utils.cache import cached_import
+from utils.fixpunkte import als_register
+from utils.imports import MESS_DTYPES, detect_encoding, import_csv_fast
+
+## Schweregrade der Befunde: Fehler schliessen die Visur von Berechnung und Export aus, Warnungen nicht
+FEHLER = "fehler"
+WARNUNG = "warnung"
+
+
+@dataclass
+class Befund:
+    """
+    Ein Befund der Validierung oder des Exports einer Visur.
+
+    Attribute:
+    ----------
+    visur : str
+        ID der Visur.
+    pruefung : str
+        Art der Prüfung, z.B. "datei", "schema", "ref", "import", "werte", "punkte", "fixpunkt",
+        "instr", "ids" oder "export_<format>".
+    meldung : str
+        Beschreibung des Problems.
+    schwere : str
+        `FEHLER` oder `WARNUNG`.
+    datei : str
+        Betroffene Datei, falls bekannt.
+    """
+    visur: str
+    pruefung: str
+    meldung: str
+    schwere: str = FEHLER
+    datei: str = None
+
+    def __str__(self):
+        datei = f" [{Path(self.datei).name}]" if self.datei else ""
+        return f"{self.visur}: {self.pruefung}{datei}: {self.meldung}"
+
+
+class AbbruchFehler(Exception):
+    """
+    Abbruch der Auswertung mit `fail_fast` beim ersten Fehler; `befunde` enthält die Befunde der Visur.
+    """
+
+    def __init__(self, befunde:list):
+        self.befunde = list(befunde)
+        super().__init__("; ".join(str(b) for b in self.befunde))
+
+
+@dataclass
+class Validierung:
+    """
+    Ergebnis der Validierung einer Visur.
+
+    Die importierten Messdaten werden für die Berechnung weiterverwendet, sodass jede Datei
+    nur einmal gelesen wird.
+    """
+    visur: str
+    befunde: list = field(default_factory=list)
+    messungen: tuple = None
+    data: list = None
+
+    @property
+    def gueltig(self):
+        return not any(b.schwere == FEHLER for b in self.befunde)
+
+    @property
+    def fehler(self):
+        """
+        Fehlermeldungen als ein String (Aufbau von `VisurErgebnis.fehler`), None für gültige Visuren.
+        """
+        meldungen = [f"{b.pruefung}: {b.meldung}" for b in self.befunde if b.schwere == FEHLER]
+        return "; ".join(meldungen) if meldungen else None
+
+
+## <----------------------------------------------------------------------------------->
+## Prüfungen einer Messdatei
+
+def _datei_pruefen(visur:str, file_path:str, cache_dir:str):
+    """
+    Prüft Schema und REF-Zeilen einer Messdatei und importiert sie.
+
+    Rückgabe:
+    ---------
+    tuple
+        (Liste der Befunde, DataFrame oder None)
+    """
+
+    befunde = []
+
+    ## Schema aus der Kopfzeile, REF-Zeilen aus der einzelnen Spalte "Punktklasse"
+    try:
+        encoding = detect_encoding(file_path)
+        spalten = pd.read_csv(file_path, delimiter=";", encoding=encoding, nrows=0).columns
+    except Exception as e:
+        return [Befund(visur, "datei", f"{type(e).__name__}: {e}", datei=file_path)], None
+
+    fehlend = [s for s in MESS_DTYPES if s not in spalten]
+    if fehlend:
+        return [Befund(visur, "schema", f"Spalten fehlen: {fehlend}", datei=file_path)], None
+
+    punktklasse = pd.read_csv(file_path, delimiter=";", encoding=encoding, usecols=["Punktklasse"],
+                              dtype=str)["Punktklasse"]
+    if not (punktklasse == "REF").any():
+        befunde.append(Befund(visur, "ref", "keine REF-Zeile (Stationierung) gefunden", WARNUNG, file_path))
+    if (punktklasse != "REF").sum() == 0:
+        befunde.append(Befund(visur, "ref", "keine Messungen ausser REF-Zeilen", datei=file_path))
+        return befunde, None
+
+    ## Import (über den Cache, falls angegeben); Fehler werden einmal als Befund festgehalten
+    try:
+        with laufzeit.stufe("import") as m:
+            if cache_dir:
+                df = cached_import(file_path, import_csv_fast, cache_dir, strikt=True)
+            else:
+                df = import_csv_fast(file_path, strikt=True)
+            m.zeilen = len(df)
+    except Exception as e:
+        befunde.append(Befund(visur, "import", f"{type(e).__name__}: {e}", datei=file_path))
+        return befunde, None
+
+    ## Werte, die die Berechnung benötigt
+    leer = [s for s in ("Lage", "ID", "V-Winkel", "Ds") if df[s].isna().any()]
+    if leer:
+        befunde.append(Befund(visur, "werte", f"fehlende Werte in {leer}", datei=file_path))
+
+    lagen = sorted(set(df["Lage"].dropna()) - {"1", "2"})
+    if lagen:
+        befunde.append(Befund(visur, "werte", f"unbekannte Lage(n) {lagen}", datei=file_path))
+
+    doppelt = sorted(set(df.loc[df["ID"].duplicated(), "ID"].dropna()))
+    if doppelt:
+        befunde.append(Befund(visur, "ids", f"doppelte Mess-IDs {doppelt}", datei=file_path))
+
+    for spalte in ("Standpkt", "Zielpkt"):
+        if df[spalte].nunique(dropna=False) != 1:
+            befunde.append(Befund(visur, "punkte", f"mehrere Werte in '{spalte}': {sorted(df[spalte].astype(str).unique())}",
+                                  datei=file_path))
+
+    return befunde, df
+## <----------------------------------------------------------------------------------->
+
+
+def visur_pruefen(v, df_instr, df_aprox, cache_dir:str=None):
+    """
+    Validiert die Eingaben einer Visur in einem günstigen Durchgang vor der Berechnung.
+
+    Geprüft werden pro Messdatei Lesbarkeit, Schema (benötigte Spalten), REF-Zeilen, fehlende Werte,
+    Lagen und doppelte Mess-IDs, anschliessend über beide Dateien die Richtungen (A-->B und B-->A
+    mit vertauschten Punkten), die Punkte in den Näherungskoordinaten, die Instrumentenparameter
+    und ob jede Mess-ID in beiden Richtungen vorkommt.
+
+    Parameter:
+    ----------
+    v : VisurOrdner
+        Visur aus `visuren_finden`.
+    df_instr : pandas.DataFrame
+        Instrumentenparameter (siehe `import_instr`).
+    df_aprox : pandas.DataFrame or FixpunktRegister
+        Näherungskoordinaten.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`).
+
+    Rückgabe:
+    ---------
+    Validierung
+        Befunde der Visur und, falls beide Dateien importiert werden konnten, die Messdaten
+        (df100, df200) und Instrumentenparameter für die Berechnung.
+    """
+
+    from utils.auto import instr_parameter
+
+    with laufzeit.visur(v.visur), laufzeit.stufe("validierung") as m:
+        pruefung = Validierung(v.visur)
+
+        befunde_A2B, df100 = _datei_pruefen(v.visur, v.csv_A2B, cache_dir)
+        befunde_B2A, df200 = _datei_pruefen(v.visur, v.csv_B2A, cache_dir)
+        pruefung.befunde += befunde_A2B + befunde_B2A
+
+        try:
+            pruefung.data = instr_parameter(df_instr, v)
+        except Exception:
+            pruefung.befunde.append(Befund(v.visur, "instr", "keine Instrumentenparameter (weder ID noch Nr gefunden)"))
+
+        if df100 is None or df200 is None:
+            return pruefung
+
+        ## Richtungen: die zweite Messung muss von B nach A gehen
+        A, B = df100["Standpkt"].iloc[0], df100["Zielpkt"].iloc[0]
+        if (df200["Standpkt"].iloc[0], df200["Zielpkt"].iloc[0]) != (B, A):
+            pruefung.befunde.append(Befund(v.visur, "punkte",
+                                           f"Messungen passen nicht zusammen: {A}-->{B} und "
+                                           f"{df200['Standpkt'].iloc[0]}-->{df200['Zielpkt'].iloc[0]}"))
+
+        ## Punkte in den Näherungskoordinaten
+        fix = als_register(df_aprox)
+        fehlend = [p for p in dict.fromkeys([A, B]) if p not in fix]
+        if fehlend:
+            pruefung.befunde.append(Befund(v.visur, "fixpunkt", f"Punkt(e) fehlen in den Näherungskoordinaten: {fehlend}"))
+
+        ## Mess-IDs ohne Gegenmessung: einzelne ergeben nur NaN-Zeilen in df300 (Warnung),
+        ## ohne jede gemeinsame ID ist keine Höhendifferenz berechenbar (Fehler)
+        ids_A2B, ids_B2A = set(df100["ID"].dropna()), set(df200["ID"].dropna())
+        nur_A2B, nur_B2A = sorted(ids_A2B - ids_B2A), sorted(ids_B2A - ids_A2B)
+        if not ids_A2B & ids_B2A:
+            pruefung.befunde.append(Befund(v.visur, "ids", "keine gemeinsamen Mess-IDs in A-->B und B-->A"))
+        elif nur_A2B or nur_B2A:
+            pruefung.befunde.append(Befund(v.visur, "ids",
+                                           f"Mess-IDs ohne Gegenmessung: nur A-->B {nur_A2B}, nur B-->A {nur_B2A}",
+                                           schwere=WARNUNG))
+
+        pruefung.messungen = (df100, df200)
+        m.zeilen = len(df100) + len(df200)
+
+    return pruefung
+
+
+def kampagne_pruefen(ordner:list, df_instr, df_aprox, cache_dir:str=None, fail_fast:bool=False):
+    """
+    Validiert alle Visuren einer Kampagne (siehe `visur_pruefen`).
+
+    Parameter:
+    ----------
+    ordner : list of VisurOrdner
+        Zu prüfende Visuren.
+    df_instr : pandas.DataFrame
+        Instrumentenparameter (siehe `import_instr`).
+    df_aprox : pandas.DataFrame or FixpunktRegister
+        Näherungskoordinaten.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache.
+    fail_fast : bool, optional (Standard: False)
+        Bei der ersten ungültigen Visur mit `AbbruchFehler` abbrechen.
+
+    Rückgabe:
+    ---------
+    list of Validierung
+        Ein Ergebnis pro Visur, in der Reihenfolge von `ordner`.
+    """
+
+    fix = als_register(df_aprox)
+    pruefungen = []
+
+    for v in ordner:
+        pruefung = visur_pruefen(v, df_instr, fix, cache_dir)
+        if fail_fast and not pruefung.gueltig:
+            raise AbbruchFehler(pruefung.befunde)
+        pruefungen.append(pruefung)
+
+    return pruefungen
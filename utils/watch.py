@@ -0,0 +1,192 @@
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from utils.ausreisser import KEINE
+from utils.inkrementell import auswertung_inkrementell
+from utils.unsicherheit import JACOBI
+from utils.validierung import AbbruchFehler
+
+
+def _zeit():
+    return datetime.now().strftime("%H:%M:%S")
+
+
+def schnappschuss(base_path, InstrHoehe:str, fix:str):
+    """
+    Erfasst Grösse und Änderungszeit aller Messdateien der Visurordner sowie der Projektdateien.
+
+    Exportierte Auswertungen ("*_Auswertung.csv") und der Ordner "_all-data" werden ignoriert.
+
+    Rückgabe:
+    ---------
+    dict
+        {Pfad: (Grösse, Änderungszeit in ns)}
+    """
+
+    zustand = {}
+    dateien = [Path(InstrHoehe), Path(fix)]
+
+    for folder in Path(base_path).iterdir():
+        if not folder.is_dir() or folder.name == "_all-data":
+            continue
+        dateien.extend(f for f in folder.glob("*.csv") if not f.name.endswith("_Auswertung.csv"))
+
+    for f in dateien:
+        try:
+            stat = f.stat()
+            zustand[str(f)] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            continue
+
+    return zustand
+
+
+def _beobachter(base_path, ereignis:threading.Event):
+    """
+    Startet, falls das Paket watchdog installiert ist, einen Beobachter (inotify & Co.), der bei jeder
+    Dateiänderung das Ereignis setzt. Ohne watchdog wird None zurückgegeben (reines Polling).
+    """
+
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            ereignis.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), str(base_path), recursive=True)
+    observer.daemon = True
+    observer.start()
+
+    return observer
+
+
+def ueberwachen(base_path,
+                InstrHoehe:str,
+                fix:str,
+                intervall:float=2.0,
+                entprellen:float=3.0,
+                n_jobs:int=2,
+                cache_dir:str=None,
+                formate:tuple=None,
+                kampagnen_pdf:bool=False,
+                fail_fast:bool=False,
+                methode:str=JACOBI,
+                ausreisser:str=KEINE,
+                epochen=None,
+                max_laeufe:int=None):
+    """
+    Überwacht den Basisordner und wertet neue oder geänderte Visuren automatisch aus.
+
+    Der Dienst vergleicht regelmässig den Zustand aller Messdateien (siehe `schnappschuss`).
+    Ist das Paket watchdog installiert, wird er zusätzlich bei jeder Dateiänderung sofort geweckt,
+    sonst wird alle `intervall` Sekunden abgefragt. Eine Auswertung startet erst, wenn sich seit
+    `entprellen` Sekunden nichts mehr geändert hat (z.B. eine Messdatei noch geschrieben wird).
+    Die Auswertung läuft über `auswertung_inkrementell`, sodass nur Visuren mit geänderten
+    Eingaben (z.B. sobald die zweite CSV-Datei eines Ordners vorhanden ist) berechnet und
+    exportiert werden. Mit `epochen` werden die Ergebnisse jedes Laufes im Epochenspeicher abgelegt;
+    bereits gespeicherte Epochen werden dabei übersprungen.
+
+    Parameter:
+    ----------
+    base_path : pathlib.Path
+        Basisordner mit einem Unterordner pro Visur.
+    InstrHoehe : str
+        Pfad zur Datei mit den Instrumentenparametern.
+    fix : str
+        Pfad zur Datei mit den Näherungskoordinaten.
+    intervall : float, optional (Standard: 2.0)
+        Abfrageintervall in Sekunden.
+    entprellen : float, optional (Standard: 3.0)
+        Ruhezeit in Sekunden nach der letzten Änderung, bevor ausgewertet wird.
+    n_jobs : int, optional (Standard: 2)
+        Anzahl Prozesse für die Auswertung.
+    cache_dir : str, optional (Standard: None)
+        Ordner für den Import-Cache (siehe `cached_import`).
+    formate : tuple of str, optional (Standard: None)
+        Zu schreibende Dateien pro Visur (siehe `export_visur`); None schreibt alle.
+    kampagnen_pdf : bool, optional (Standard: False)
+        Ob nach jedem Lauf das gemeinsame PDF aller Visuren in "_all-data" geschrieben wird.
+    fail_fast : bool, optional (Standard: False)
+        Einen Lauf bei der ersten ungültigen Visur abbrechen; die Überwachung läuft weiter.
+    methode : str, optional (Standard: "jacobi")
+        Fortpflanzung für die Präanalyse (siehe `auswertung_kampagne`).
+    ausreisser : str, optional (Standard: "keine")
+        Verfahren der Ausreissererkennung (siehe `auswertung_kampagne`).
+    epochen : str or pathlib.Path, optional (Standard: None)
+        Ordner des Epochenspeichers (siehe `utils.epochen.Epochenspeicher`).
+    max_laeufe : int, optional (Standard: None)
+        Beendet den Dienst nach so vielen Auswertungen (None: läuft bis Ctrl+C).
+    """
+
+    speicher = None
+    if epochen is not None:
+        from utils.epochen import Epochenspeicher
+        speicher = Epochenspeicher(epochen)
+
+    ereignis = threading.Event()
+    observer = _beobachter(base_path, ereignis)
+    modus = "watchdog" if observer is not None else f"Polling alle {intervall} s"
+    print(f"[{_zeit()}] Überwache {base_path} ({modus}), Abbruch mit Ctrl+C")
+
+    ausgewertet = None              # Zustand beim letzten Lauf
+    letzter = None                  # zuletzt gesehener Zustand
+    letzte_aenderung = 0.0
+    laeufe = 0
+
+    try:
+        while max_laeufe is None or laeufe < max_laeufe:
+            zustand = schnappschuss(base_path, InstrHoehe, fix)
+
+            if zustand != letzter:
+                letzter = zustand
+                letzte_aenderung = time.monotonic()
+
+            ruhig = time.monotonic() - letzte_aenderung >= entprellen
+
+            if zustand != ausgewertet and ruhig:
+                start = time.monotonic()
+                try:
+                    kampagne = auswertung_inkrementell(base_path, InstrHoehe, fix,
+                                                       n_jobs=n_jobs,
+                                                       cache_dir=cache_dir,
+                                                       formate=formate,
+                                                       kampagnen_pdf=kampagnen_pdf,
+                                                       fail_fast=fail_fast,
+                                                       methode=methode,
+                                                       ausreisser=ausreisser)
+                    neu = ", ".join(kampagne.neu_berechnet) or "keine"
+                    print(f"[{_zeit()}] Ausgewertet in {time.monotonic() - start:.1f} s, neu berechnet: {neu}")
+
+                    if speicher is not None:
+                        abgelegt = speicher.anhaengen(kampagne)
+                        print(f"[{_zeit()}] {len(abgelegt)} neue Epoche(n) in {speicher.pfad} abgelegt")
+                except AbbruchFehler as e:
+                    print(f"[{_zeit()}] Abbruch (--fail-fast):")
+                    for b in e.befunde:
+                        print(f"  {b}")
+                except Exception as e:
+                    print(f"[{_zeit()}] Fehler bei der Auswertung: {e}")
+
+                ausgewertet = zustand
+                laeufe += 1
+                continue
+
+            ## Warten auf das nächste Intervall, die Entprellzeit oder ein Dateiereignis
+            warten = intervall if ruhig else min(intervall, entprellen)
+            ereignis.wait(warten)
+            ereignis.clear()
+
+    except KeyboardInterrupt:
+        print(f"[{_zeit()}] Überwachung beendet")
+
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()